@@ -0,0 +1,768 @@
+"""
+Date: 10/18/2026
+Description: asyncio version of the Slack bot (run with BOT_MODE=async python bot.py,
+    or python async_bot.py).
+    Same order flow as bot.py, but every handler runs on one event loop:
+    Slack calls go through AsyncWebClient, the database through an aiomysql
+    pool and Gemini through generate_content_async, so a slow API call only
+    suspends its own handler instead of holding a thread. Message blocks,
+    stages and formatting helpers are shared with bot.py through bot_common
+    (importing bot.py would connect to Slack and start the sync bot's workers).
+"""
+import os
+import re
+import time
+import asyncio
+import hashlib
+from datetime import datetime
+from pathlib import Path
+from dotenv import load_dotenv
+import aiohttp
+import aiomysql
+from slack_sdk import WebClient
+from slack_sdk.web.async_client import AsyncWebClient
+from slack_sdk.errors import SlackApiError
+from slack_bolt.async_app import AsyncApp
+from slack_bolt.adapter.socket_mode.async_handler import AsyncSocketModeHandler
+
+env_path = Path(__file__).parent.parent / '.env'
+load_dotenv(env_path)
+
+import helper_functions
+import schema_registry
+import migrations
+import file_dedup
+import extraction_cache
+import order_stats
+import messenger
+from gemini import gemini_process_image_async
+from order_cache import OrderCache
+from channel_pool import ChannelPool, new_channel_name
+from user_directory import UserDirectory
+from bot_common import (MESSAGE_BLOCKS, ORDER_STAGES, IMAGE_STORAGE_DIR, DOWNLOAD_CHUNK_SIZE,
+                        get_current_unix_time, parse_human_time_to_unix,
+                        get_next_unverified_field, format_field_for_display, input_prompt_blocks, create_button)
+
+### ### SETTINGS ### ###
+DB_NAME = os.environ.get('DB_NAME')
+SLACK_BOT_TOKEN = os.environ.get('SLACK_BOT_TOKEN')
+SLACK_API_URL = os.environ.get('SLACK_API_URL', WebClient.BASE_URL)   # e.g. benchmark_bot_modes.py's fake Slack
+WELCOME_CONCURRENCY = int(os.environ.get('WELCOME_CONCURRENCY', 4))  # welcome DMs in flight at the same time
+
+APP_DISPLAY_NAMES = {
+    "uber": "Uber Eats",
+    "doordash": "DoorDash",
+    "grubhub": "Grubhub"
+}
+
+app = AsyncApp(
+    signing_secret=os.environ.get('TASK_BOT_SIGNING_SECRET'),
+    client=AsyncWebClient(token=SLACK_BOT_TOKEN, base_url=SLACK_API_URL)
+)
+client = app.client
+BOT_ID = None          # set from auth.test in run()
+
+# The channel pool's refill thread and the user directory's sync thread call Slack synchronously
+sync_client = WebClient(token=SLACK_BOT_TOKEN, base_url=SLACK_API_URL)
+user_directory = UserDirectory(sync_client)
+
+def create_private_channel(name):
+    return sync_client.conversations_create(name=name, is_private=True)["channel"]["id"]
+
+channel_pool = ChannelPool(create_private_channel)
+
+order_cache = OrderCache()
+_db_pool = None        # aiomysql pool, created in run()
+_http_session = None   # aiohttp session for screenshot downloads, created in run()
+
+
+### ### DATABASE ### ###
+async def create_db_pool():
+    """Opens the aiomysql pool, sized with the same DB_POOL_* settings as helper_functions"""
+    return await aiomysql.create_pool(
+        host='localhost',
+        user='root',
+        password=os.environ.get('SQL_PASS'),
+        db=DB_NAME,
+        minsize=helper_functions.DB_POOL_MIN_SIZE,
+        maxsize=helper_functions.DB_POOL_MAX_SIZE,
+        pool_recycle=int(helper_functions.DB_POOL_MAX_IDLE),
+        autocommit=False
+    )
+
+async def db_operation(query, params=None, fetch_one=False, fetch_all=False):
+    """Generic database operation handler (async version of bot.db_operation)"""
+    try:
+        async with _db_pool.acquire() as conn:
+            try:
+                async with conn.cursor(aiomysql.DictCursor) as cursor:
+                    await cursor.execute(query, params or ())
+                    if fetch_one:
+                        result = await cursor.fetchone()
+                    elif fetch_all:
+                        result = await cursor.fetchall()
+                    else:
+                        result = None
+                await conn.commit()
+                return result
+            except Exception:
+                await conn.rollback()
+                raise
+    except Exception as e:
+        print(f"Database error: {e}")
+        return None
+
+async def get_order_info(channel_id):
+    """Get order information by channel ID (served from order_cache when possible)"""
+    order = order_cache.peek(channel_id)
+    if order is None:
+        generation = order_cache.generation()
+        order = await db_operation("SELECT * FROM orders WHERE channel_id = %s", (channel_id,), fetch_one=True)
+        order_cache.store(channel_id, order, generation)
+    return order
+
+async def update_order(channel_id, updates):
+    """Update order fields with column existence check"""
+    if not updates:
+        return False
+    try:
+        valid_updates = schema_registry.filter_columns('orders', updates)
+        if not valid_updates:
+            return False
+
+        query = schema_registry.update_statement('orders', tuple(valid_updates), 'channel_id')
+        params = list(valid_updates.values()) + [channel_id]
+        async with _db_pool.acquire() as conn:
+            async with conn.cursor() as cursor:
+                if 'status' in valid_updates:
+                    await cursor.execute(order_stats.STATUS_CHANGE_SQL,
+                                         order_stats.status_change_params(channel_id, valid_updates['status']))
+                await cursor.execute(query, params)
+                await conn.commit()
+                order_cache.apply_update(channel_id, valid_updates)
+                return cursor.rowcount > 0
+    except Exception as e:
+        print(f"Database error in update_order: {e}")
+        return False
+
+async def create_order(user_id, channel_id):
+    """Create a new order record with Unix timestamps"""
+    try:
+        async with _db_pool.acquire() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(
+                    """INSERT INTO orders
+                       (user_id, channel_id, status, channel_creation_time)
+                       VALUES (%s, %s, 'awaiting_app_selection', %s)""",
+                    (user_id, channel_id, get_current_unix_time())
+                )
+                order_id = cursor.lastrowid
+                await cursor.execute(order_stats.NEW_ORDER_SQL, (user_id,))
+                await conn.commit()
+                order_cache.invalidate(channel_id)
+                return order_id
+    except Exception as e:
+        print(f"Database error in create_order: {e}")
+        return None
+
+async def get_account_summary(user_id):
+    """Async version of bot.get_account_summary. Returns (user_data, recent_orders)."""
+    async with _db_pool.acquire() as conn:
+        try:
+            async with conn.cursor(aiomysql.DictCursor) as cursor:
+                await cursor.execute(
+                    """SELECT users.*,
+                              COALESCE(user_order_stats.total_orders, 0) AS total_orders,
+                              COALESCE(user_order_stats.completed_orders, 0) AS completed_orders,
+                              COALESCE(user_order_stats.rejected_orders, 0) AS rejected_orders,
+                              COALESCE(user_order_stats.pending_orders, 0) AS pending_orders
+                       FROM users LEFT JOIN user_order_stats ON user_order_stats.user_id = users.id
+                       WHERE users.id = %s""",
+                    (user_id,)
+                )
+                user_data = await cursor.fetchone()
+                if not user_data:
+                    return None, None
+                await cursor.execute(
+                    """SELECT order_id, restaurant_name, status, channel_creation_time
+                       FROM orders WHERE user_id = %s
+                       ORDER BY channel_creation_time DESC LIMIT 5""",
+                    (user_id,)
+                )
+                recent_orders = await cursor.fetchall()
+            return user_data, recent_orders
+        finally:
+            # The pool isn't autocommit: end the read transaction, otherwise release() closes the connection
+            await conn.rollback()
+
+
+### ### SLACK HELPERS ### ###
+async def create_channel(user_id):
+    """Create a new private channel for an order (claimed from channel_pool when one is ready)"""
+    try:
+        start = time.perf_counter()
+        channel_id = await asyncio.to_thread(channel_pool.claim, user_id)
+        kind = 'claim' if channel_id else 'cold'
+        if not channel_id:
+            response = await client.conversations_create(name=new_channel_name(), is_private=True)
+            channel_id = response["channel"]["id"]
+
+        order_id = await create_order(user_id, channel_id)
+        if not order_id:
+            raise Exception("Failed to create order record")
+
+        await client.conversations_invite(channel=channel_id, users=[user_id])
+        channel_pool.record(kind, time.perf_counter() - start)
+        return order_id, channel_id
+
+    except SlackApiError as e:
+        print(f"Error creating channel: {e.response['error']}")
+        return None, None
+
+async def post_input_prompt(channel_id, field, is_missing=False):
+    """Posts the blocks built by input_prompt_blocks (async version of bot.send_input_prompt)"""
+    await client.chat_postMessage(channel=channel_id, text='Input prompt',
+                                  blocks=input_prompt_blocks(field, is_missing))
+
+async def update_message_after_action(channel_id, ts, original_blocks, decision_text):
+    """Update message to show decision and remove buttons"""
+    new_blocks = [block for block in original_blocks if block.get("type") != "actions"]
+    new_blocks.append({
+        "type": "section",
+        "text": {
+            "type": "mrkdwn",
+            "text": f"*Decision:* {decision_text}"
+        }
+    })
+    await client.chat_update(channel=channel_id, ts=ts, blocks=new_blocks)
+
+async def send_welcome_message(users_list):
+    """Sends the welcome message to every active user in users_list, WELCOME_CONCURRENCY DMs at a time"""
+    active_users = set(await asyncio.to_thread(messenger.get_active_users_list))
+    recipients = [user_id for user_id in dict.fromkeys(users_list) if BOT_ID != user_id and user_id in active_users]
+    semaphore = asyncio.Semaphore(WELCOME_CONCURRENCY)
+
+    async def welcome(user_id):
+        async with semaphore:
+            try:
+                # Posting to a user id opens (or reuses) the DM with that user
+                await client.chat_postMessage(channel=user_id, text="Welcome to Snack N Go!",
+                                              blocks=MESSAGE_BLOCKS["main_channel_welcome_message"]['blocks'])
+                return True
+            except SlackApiError as e:
+                print(f"Error sending welcome message to {user_id}: {e.response['error']}")
+                return False
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(welcome(user_id) for user_id in recipients))
+    print(f"[WELCOME] Sent {sum(results)}, failed {len(results) - sum(results)} in {time.perf_counter() - start:.1f}s", datetime.now())
+
+
+### ### IMAGES ### ###
+async def download_slack_file(url, filepath):
+    """
+    Streams a private Slack file to disk in chunks, hashing it on the way.
+    Returns the sha256 hex digest of the file contents.
+    """
+    digest = hashlib.sha256()
+    partial_path = filepath + '.part'
+    async with _http_session.get(url) as response:
+        if response.status != 200:
+            raise Exception("Failed to download file from Slack")
+        with open(partial_path, 'wb') as f:
+            async for chunk in response.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+                digest.update(chunk)
+                f.write(chunk)
+    os.replace(partial_path, filepath)
+    return digest.hexdigest()
+
+async def process_image(channel_id, file):
+    """Process uploaded image based on order stage"""
+    print(f"[IMAGE PROCESSING] Processing image in channel {channel_id}, File: {file['name']}", datetime.now())
+    allowed_mimetypes = ["image/png", "image/jpeg", "image/jpg"]
+    max_size_mb = 5
+
+    if file["mimetype"] not in allowed_mimetypes:
+        await client.chat_postMessage(channel=channel_id, text="Only PNG/JPEG images under 5MB are allowed.")
+        return
+    if file["size"] > max_size_mb * 1024 * 1024:
+        await client.chat_postMessage(channel=channel_id, text=f"Image too large. Max size: {max_size_mb}MB.")
+        return
+
+    order = await get_order_info(channel_id)
+    if not order:
+        await client.chat_postMessage(channel=channel_id, text="Order not found")
+        return
+
+    await client.chat_postMessage(
+        channel=channel_id,
+        text="📸 Got your screenshot! Processing it now, this usually takes a few seconds..."
+    )
+    try:
+        file_info = file if 'url_private_download' in file else (await client.files_info(file=file['id']))['file']
+
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        file_ext = file['name'].split('.')[-1] if '.' in file['name'] else 'jpg'
+        if order['status'] == 'awaiting_initial_screenshot':
+            stage, image_stage = 'placement', "awaiting_placement_time"
+        elif order['status'] == 'awaiting_completion_screenshot':
+            stage, image_stage = 'completion', "awaiting_arrival_time"
+        else:
+            stage, image_stage = 'other', "awaiting_placement_time"
+
+        filename = f"order_{order['order_id']}_{stage}_{timestamp}.{file_ext}"
+        filepath = os.path.join(IMAGE_STORAGE_DIR, filename)
+        image_digest = await download_slack_file(file_info['url_private_download'], filepath)
+        extracted = await gemini_process_image_async(filepath, image_stage, image_digest=image_digest)
+        print(extracted)
+
+        updates = {
+            'status': 'verifying_initial_data' if stage == 'placement' else 'verifying_completion_data'
+        }
+        if stage == 'placement':
+            updates.update({
+                'placement_screenshot_path': filepath,
+                'restaurant_name': extracted.get('restaurant_name'),
+                'order_placement_time': extracted.get('order_placement_time'),
+                'earliest_estimated_arrival_time': extracted.get('earliest_estimated_arrival_time'),
+                'latest_estimated_arrival_time': extracted.get('latest_estimated_arrival_time')
+            })
+        else:
+            updates.update({
+                'completion_screenshot_path': filepath,
+                'order_completion_time': extracted.get('order_completion_time')
+            })
+
+        if await update_order(channel_id, updates):
+            await start_field_verification(channel_id)
+        else:
+            raise Exception("Failed to update order in database")
+
+    except Exception as e:
+        # Let a re-delivery of the same file try again
+        await asyncio.to_thread(file_dedup.release, file['id'])
+        error_msg = f"Error processing image: {str(e)}"
+        print(error_msg)
+        await client.chat_postMessage(channel=channel_id, text=error_msg)
+
+
+### ### VERIFICATION FLOW ### ###
+async def start_field_verification(channel_id):
+    """Starts or continues the verification process for order fields (see bot.start_field_verification)"""
+    order = await get_order_info(channel_id)
+    if not order:
+        await client.chat_postMessage(
+            channel=channel_id,
+            text="No active order",
+            blocks=[{
+                "type": "section",
+                "text": {
+                    "type": "mrkdwn",
+                    "text": (
+                        "⚠️ *No active order found in this channel*\n"
+                        "To start a new order submission, please go to the main channel and click 'Submit New Order'."
+                    )
+                }
+            }]
+        )
+        return
+
+    field, verification_flag = get_next_unverified_field(order)
+    if not field:
+        await handle_stage_completion(order)
+        return
+
+    blocks = [
+        {
+            "type": "section",
+            "text": {
+                "type": "mrkdwn",
+                "text": (
+                    f"*{field.replace('_', ' ').title()}*: "
+                    f"{format_field_for_display(field, order.get(field))}\n"
+                    "Is this correct?"
+                )
+            }
+        },
+        {
+            "type": "actions",
+            "elements": [
+                create_button("✅ Yes", "verify_field_yes", f"{field}|{verification_flag}"),
+                create_button("✏️ No", "verify_field_no", field)
+            ]
+        }
+    ]
+    await client.chat_postMessage(channel=channel_id, text='Field verification prompt', blocks=blocks)
+
+async def handle_stage_completion(order):
+    """Moves the order to its next stage once every field of the current one is verified"""
+    channel_id = order['channel_id']
+    current_stage = order['status']
+    next_stage = ORDER_STAGES.get(current_stage, {}).get('next')
+
+    print(f"[STAGE CHANGE] Channel {channel_id} moving from {current_stage} to {next_stage}", datetime.now())
+
+    if not next_stage:
+        await client.chat_postMessage(
+            channel=channel_id,
+            text="Thank you! Submission complete. ",
+            blocks=[{
+                "type": "section",
+                "text": {
+                    "type": "mrkdwn",
+                    "text": "🎉 *Thank you!* Your order submission is complete.\n\nFor future reference, you can review the instructions here:\n<https://docs.google.com/document/d/1JOXu2Qwi_I5X__FwH6g0dlyMh-QxqCFeLo3s5l5ImjI/edit?usp=sharing | order submission instructions document>"
+                }
+            }]
+        )
+        return
+
+    if await update_order(channel_id, {'status': next_stage}):
+        next_prompt = ORDER_STAGES.get(next_stage, {}).get('prompt')
+        if next_prompt:
+            await client.chat_postMessage(
+                channel=channel_id,
+                text='Next step',
+                blocks=[{"type": "section", "text": {"type": "mrkdwn", "text": f"{next_prompt}"}}]
+            )
+        if next_stage == 'collecting_missing_info':
+            await check_for_missing_info(channel_id)
+
+async def check_for_missing_info(channel_id):
+    """Check if any required fields are missing and prompt for them"""
+    order = await get_order_info(channel_id)
+    if not order:
+        await client.chat_postMessage(channel=channel_id, text="Order not found")
+        return
+
+    required_fields = [
+        ('restaurant_name', 'is_restaurant_name_verified'),
+        ('order_placement_time', 'is_order_placement_time_verified'),
+        ('earliest_estimated_arrival_time', 'is_earliest_estimated_arrival_time_verified'),
+        ('latest_estimated_arrival_time', 'is_latest_estimated_arrival_time_verified'),
+        ('order_completion_time', 'is_order_completion_time_verified')
+    ]
+    missing_fields = [field for field, flag in required_fields
+                      if not order.get(field) and not order.get(flag)]
+
+    if missing_fields:
+        await client.chat_postMessage(channel=channel_id, text="We're missing some information:")
+        for field in missing_fields:
+            await post_input_prompt(channel_id, field, is_missing=True)
+    elif await update_order(channel_id, {'status': 'completed'}):
+        await client.chat_postMessage(
+            channel=channel_id,
+            text="Thank you! Your order submission is complete.",
+            blocks=[
+                {
+                    "type": "section",
+                    "text": {
+                        "type": "mrkdwn",
+                        "text": "Thank you for submitting your screenshots and verifying the times on those screenshots! Your order submission is now complete. You\'ve finished everything required on your end, and we\'ll take it from here."
+                    }
+                },
+                {
+                    "type": "section",
+                    "text": {
+                        "type": "mrkdwn",
+                        "text": "If you encounter a bug, typo, or other error at any point in the order submission process or other issues, feel free to fill out this <https://docs.google.com/forms/d/e/1FAIpQLSe7U05qgO7AUrkEcH4brPSnPAsvjgfcE3kEhOrg1b8ZoNPWdA/viewform?usp=sharing | form>!"
+                    }
+                }
+            ]
+        )
+
+
+### ### HANDLERS ### ###
+@app.event("file_created")
+async def handle_file_created_events(body, logger):
+    logger.info(body)
+
+@app.event("message")
+async def handle_message(payload, say):
+    """Handle text messages and messages with files"""
+    channel_id = payload.get('channel')
+    user_id = payload.get('user')
+    text = payload.get('text', '').strip().lower()
+
+    if user_id == BOT_ID:
+        return
+
+    print(f"[USER MESSAGE] Message from {user_id}: {text}", datetime.now())
+    if text in ["help", "?"]:
+        await say(text="Here's how I can help you!",
+                  blocks=MESSAGE_BLOCKS["main_channel_welcome_message"]['blocks'])
+        return
+    if 'files' in payload:
+        if len(payload['files']) > 1:
+            await say("Please upload only one file at a time.")
+            return
+        file = payload['files'][0]
+        # The same upload also arrives as a file_shared event
+        if not await asyncio.to_thread(file_dedup.claim, file['id']):
+            return
+        if "image" not in file['mimetype']:
+            await say(text="Please upload an image file. ",
+                      blocks=[{
+                          "type": "section",
+                          "text": {
+                              "type": "mrkdwn",
+                              "text": "⚠️ *Please upload an image file*\nWe need a screenshot to process your order. Only JPG, JPEG, or PNG files are accepted."
+                          }
+                      }])
+            return
+        await process_image(channel_id, file)
+
+@app.event("file_shared")
+async def handle_file_shared_events(body, logger):
+    """Handle file uploads without text"""
+    file_id = body["event"]["file_id"]
+    channel_id = body["event"]["channel_id"]
+    user_id = body["event"]["user"]["id"]
+
+    print(f"[FILE SHARED] User {user_id} shared file in channel {channel_id}", datetime.now())
+
+    if not await asyncio.to_thread(file_dedup.claim, file_id, body.get("event_id")):
+        return
+
+    try:
+        file_info = (await client.files_info(file=file_id))["file"]
+        if "image" in file_info["mimetype"]:
+            await process_image(channel_id, file_info)
+        else:
+            await client.chat_postMessage(
+                channel=channel_id,
+                text="Please upload an image file (JPG, JPEG, or PNG).",
+                blocks=[{
+                    "type": "section",
+                    "text": {
+                        "type": "mrkdwn",
+                        "text": "⚠️ *Please upload an image file*\nWe need a screenshot to process your order. Only JPG, JPEG, or PNG files are accepted."
+                    }
+                }]
+            )
+    except SlackApiError as e:
+        logger.error(f"Error fetching file info: {e.response['error']}")
+        await client.chat_postMessage(
+            channel=channel_id,
+            text="Sorry, I couldn't process your file.",
+            blocks=[{
+                "type": "section",
+                "text": {
+                    "type": "mrkdwn",
+                    "text": "⚠️ *Unable to process your file*\nPlease try again with a clear screenshot of your order. If the problem persists, try uploading a smaller file size (under 5MB)."
+                }
+            }]
+        )
+
+@app.event("team_join")
+async def handle_team_join(body, logger):
+    await asyncio.to_thread(user_directory.apply_user, body["event"]["user"])
+    user_id = body["event"]["user"]["id"]
+    print(f"[NEW USER] User {user_id} joined the workspace", datetime.now())
+    await send_welcome_message([user_id])
+
+@app.event("user_change")
+async def handle_user_change(body, logger):
+    await asyncio.to_thread(user_directory.apply_user, body["event"]["user"])
+
+@app.action("start_order_submission")
+async def handle_start_order_submission(ack, body, say):
+    """Start new order submission flow"""
+    await ack()
+    user_id = body["user"]["id"]
+    order_id, channel_id = await create_channel(user_id)
+    print(f"[ORDER STARTED] User {user_id} started new order submission at {datetime.now()}")
+
+    if order_id and channel_id:
+        await client.chat_postMessage(
+            channel=channel_id,
+            text='Which of the following delivery apps do you use?',
+            blocks=[{
+                "type": "section",
+                "text": {
+                    "type": "mrkdwn",
+                    "text": f"*Order #{order_id} Started*\nWhich of the following delivery apps do you use?"
+                }
+            }, {
+                "type": "actions",
+                "elements": [create_button(name, f"select_app_{app_used}", app_used)
+                             for app_used, name in APP_DISPLAY_NAMES.items()]
+            }]
+        )
+        await say(f"Created private channel for your order: <#{channel_id}>")
+    else:
+        await say("Failed to create order channel.")
+
+@app.action(re.compile(r"^select_app_(uber|doordash|grubhub)$"))
+async def handle_app_selection(ack, body):
+    """Handle delivery app selection"""
+    await ack()
+    channel_id = body["container"]["channel_id"]
+    app_used = body["actions"][0]["action_id"].replace("select_app_", "")
+    ts = body["container"]["message_ts"]
+    app_display_name = APP_DISPLAY_NAMES.get(app_used, app_used.capitalize())
+
+    blocks = [{
+        "type": "section",
+        "text": {
+            "type": "mrkdwn",
+            "text": f"*Order App Selected*\nYou selected: *{app_display_name}*"
+        }
+    }]
+    if app_used == "uber":
+        blocks = [
+            {
+                "type": "section",
+                "text": {
+                    "type": "mrkdwn",
+                    "text": f"*Order App Selected*\nGreat! You picked *{app_display_name}*. Now, we will move on to submitting your screenshots!"
+                }
+            },
+            {
+                "type": "section",
+                "text": {
+                    "type": "mrkdwn",
+                    "text": f"The first screenshot you need to upload is the *order submission* screenshot. This is usually taken right after you make an order through {app_display_name} and includes information about the *current time*⏱︎ , *restaurant name*🍽️, and *estimated delivery time/window*🪟. Please give snack\'n\'go a few seconds to process your image before we proceed to the next step 🙂"
+                }
+            }
+        ]
+    await client.chat_update(channel=channel_id, ts=ts, blocks=blocks, text=f"You selected {app_display_name}")
+
+    if await update_order(channel_id, {"app_used": app_used, "status": "awaiting_initial_screenshot"}):
+        prompt = ORDER_STAGES['awaiting_initial_screenshot']['prompt']
+        await client.chat_postMessage(
+            channel=channel_id,
+            text=prompt,
+            blocks=[{"type": "section", "text": {"type": "mrkdwn", "text": prompt}}]
+        )
+
+@app.action("verify_field_yes")
+async def handle_verification_yes(ack, body):
+    await ack()
+    channel_id = body["container"]["channel_id"]
+    ts = body["container"]["message_ts"]
+    field, verification_flag = body["actions"][0]["value"].split("|")
+
+    print(f"[VERIFICATION] User {body['user']['id']} confirmed field {field} in channel {channel_id}", datetime.now())
+    await update_message_after_action(channel_id, ts, body["message"]["blocks"],
+                                      f"✅ Confirmed {field.replace('_', ' ')}")
+    if await update_order(channel_id, {verification_flag: True}):
+        await start_field_verification(channel_id)
+
+@app.action("verify_field_no")
+async def handle_verification_no(ack, body):
+    """Handle when user indicates a field is incorrect"""
+    await ack()
+    channel_id = body["container"]["channel_id"]
+    ts = body["container"]["message_ts"]
+    await update_message_after_action(channel_id, ts, body["message"]["blocks"], "Information Incorrect")
+    await post_input_prompt(channel_id, body["actions"][0]["value"], is_missing=False)
+
+@app.action("process_input")
+async def handle_user_input(ack, body, say):
+    await ack()
+    channel_id = body["container"]["channel_id"]
+    user_id = body["user"]["id"]
+
+    for block_id, block_content in body["state"]["values"].items():
+        if "text_input" in block_content:
+            value = block_content["text_input"]["value"]
+            field = block_id.replace("correct_", "").replace("missing_", "")
+            break
+    else:
+        await say("⚠️ We couldn't process your input. Please try again.")
+        return
+    print(f"[USER INPUT] User {user_id} provided input for {field}: {value}", datetime.now())
+
+    updates = {}
+    if field.endswith('_time'):
+        timestamp = parse_human_time_to_unix(value)
+        if not timestamp:
+            await say("⚠️ Invalid time format. Please use HH:MM (24-hour format)")
+            return
+        updates[field] = timestamp
+    else:
+        updates[field] = value
+    if "missing_" in block_id:
+        updates[f"is_{field}_verified"] = True
+
+    if await update_order(channel_id, updates):
+        if "missing_" in block_id:
+            await check_for_missing_info(channel_id)
+        else:
+            await start_field_verification(channel_id)
+    else:
+        await say("⚠️ Failed to update your information. Please try again.")
+
+@app.action("check_account_status")
+async def handle_check_account_status(ack, body, say):
+    """Show user their account status and history"""
+    await ack()
+    try:
+        user_data, recent_orders = await get_account_summary(body["user"]["id"])
+        if not user_data:
+            await say("No account information found. ")
+            return
+
+        orders_history = "\n".join(
+            [f"- Order #{o['order_id']}: {o['restaurant_name']} ({o['status']})" for o in recent_orders]
+        ) if recent_orders else "No recent orders"
+
+        compensation_type = user_data['compensation_category']
+        if compensation_type == 'staged_raffle':
+            explanation_link = "<https://docs.google.com/document/d/1sip1ct22LFrP4dXjwdH0j_A7hBjtvsFUCwKPhRTvS8w/edit?usp=sharing | What does this mean?>"
+        elif compensation_type == 'submission_count':
+            explanation_link = "<https://docs.google.com/document/d/1Cri52reeZ2jFT0YkGvPEu04LvAQYYFd8dNCzD2tvNnc/edit?usp=sharing | What does this mean?>"
+        else:
+            explanation_link = ""
+
+        message = f"""
+*Your Account Status:*
+- Username: {user_data['username']}
+- Account Status: {user_data['status'].capitalize()}
+- Compensation Type: {compensation_type.replace('_', ' ').title()} {explanation_link}
+
+*Order Statistics:*
+- Total orders submitted: {int(user_data['total_orders'])}
+- Completed orders: {int(user_data['completed_orders'])}
+- Rejected orders: {int(user_data['rejected_orders'])}
+- Pending orders: {int(user_data['pending_orders'])}
+
+*Recent Order History:*
+{orders_history}
+        """
+        await say(message.strip())
+
+    except Exception as e:
+        await say("Sorry, I couldn't retrieve your account information. ")
+        print(f"Error getting account status: {e}")
+
+
+### ### ENTRY POINT ### ###
+async def run():
+    global _db_pool, _http_session, BOT_ID
+    BOT_ID = (await client.auth_test())['user_id']
+    os.makedirs(IMAGE_STORAGE_DIR, exist_ok=True)
+    await asyncio.to_thread(migrations.apply_migrations)
+    await asyncio.to_thread(schema_registry.load)
+    await asyncio.to_thread(channel_pool.start)
+    file_dedup.start()
+    extraction_cache.start()
+    _db_pool = await create_db_pool()
+    _http_session = aiohttp.ClientSession(headers={'Authorization': f'Bearer {SLACK_BOT_TOKEN}'},
+                                          timeout=aiohttp.ClientTimeout(total=30))
+    try:
+        user_store = await asyncio.to_thread(user_directory.full_sync)
+        user_directory.start()
+        await send_welcome_message(user_store.keys())
+        handler = AsyncSocketModeHandler(app, os.environ.get("SLACK_APP_TOKEN"))
+        await handler.start_async()
+    finally:
+        await _http_session.close()
+        _db_pool.close()
+        await _db_pool.wait_closed()
+
+def main():
+    asyncio.run(run())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Date: 10/18/2026
+Description: Load benchmark for the sync (bot.app) and async (async_bot.app)
+    bot modes. Both bots are imported with SLACK_API_URL pointing at a local
+    fake Slack Web API that answers every call after FAKE_API_LATENCY seconds.
+    Each "help" message event goes through the bot's real `message` handler
+    (which replies with the welcome blocks); its latency runs from dispatch
+    until that reply reaches the fake server. Reports events/sec and p99
+    latency per mode. Needs no Slack workspace or database; the Gemini key is
+    only read, never used.
+
+Usage: python benchmark_bot_modes.py [events] [api latency in seconds]
+"""
+import os
+import io
+import sys
+import time
+import asyncio
+import threading
+import contextlib
+from aiohttp import web
+from slack_bolt import BoltRequest
+from slack_bolt.async_app import AsyncBoltRequest
+
+FAKE_API_LATENCY = 0.05   # seconds per Slack API call
+FAKE_PORT = 8765
+FAKE_TOKEN = 'xoxb-benchmark'
+REPLY_TIMEOUT = 120       # seconds to wait for every handler's reply
+
+
+### ### FAKE SLACK SERVER ### ###
+class FakeSlack:
+    """
+    The fake Slack Web API, served on a background thread. Records when the
+    chat.postMessage for each channel arrived (time.perf_counter()).
+    """
+    def __init__(self, latency, port=FAKE_PORT):
+        self.latency = latency
+        self.base_url = f"http://127.0.0.1:{port}/api/"
+        self.replies = {}   # channel -> arrival time
+        self._replied = threading.Condition()
+        ready = threading.Event()
+        threading.Thread(target=self._serve, args=(port, ready), daemon=True).start()
+        ready.wait()
+
+    async def _api(self, request):
+        await asyncio.sleep(self.latency)
+        method = request.match_info['method']
+        if method == 'auth.test':
+            return web.json_response({'ok': True, 'user_id': 'UBOT', 'bot_id': 'BBOT', 'team_id': 'T0'})
+        if method == 'chat.postMessage':
+            body = await request.json() if request.content_type == 'application/json' else await request.post()
+            with self._replied:
+                self.replies[body.get('channel')] = time.perf_counter()
+                self._replied.notify_all()
+        return web.json_response({'ok': True, 'channel': 'C0', 'ts': str(time.time())})
+
+    def _serve(self, port, ready):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        server = web.Application()
+        server.router.add_route('*', '/api/{method}', self._api)   # the async client sends some methods as GET
+        runner = web.AppRunner(server)
+        loop.run_until_complete(runner.setup())
+        loop.run_until_complete(web.TCPSite(runner, '127.0.0.1', port).start())
+        ready.set()
+        loop.run_forever()
+
+    def reset(self):
+        with self._replied:
+            self.replies.clear()
+
+    def wait_for_replies(self, count, timeout=REPLY_TIMEOUT):
+        """Blocks until `count` channels got a reply. Returns False on timeout."""
+        with self._replied:
+            return self._replied.wait_for(lambda: len(self.replies) >= count, timeout)
+
+def message_event(i):
+    """Takes an event number. Returns a "help" message event body (one channel per event) as Slack would send it."""
+    return {
+        'type': 'event_callback', 'team_id': 'T0', 'api_app_id': 'A0', 'event_id': f'Ev{i}',
+        'event': {'type': 'message', 'channel': f'C{i}', 'user': f'U{i}',
+                  'text': 'help', 'ts': f'{time.time():.6f}'}
+    }
+
+
+### ### MODES ### ###
+def run_sync(events):
+    """Dispatches every event to bot.app. Returns {channel: dispatch time}."""
+    import bot
+    dispatched = {}
+    for body in events:
+        dispatched[body['event']['channel']] = time.perf_counter()
+        bot.app.dispatch(BoltRequest(body=body, mode='socket_mode'))
+    return dispatched
+
+def run_async(events):
+    """Dispatches every event to async_bot.app on one event loop. Returns {channel: dispatch time}."""
+    import async_bot
+
+    async def run():
+        dispatched = {}
+        for body in events:
+            dispatched[body['event']['channel']] = time.perf_counter()
+            await async_bot.app.async_dispatch(AsyncBoltRequest(body=body, mode='socket_mode'))
+        # Keep the loop running until the handlers' tasks have replied
+        while len(fake_slack.replies) < len(events):
+            await asyncio.sleep(0.01)
+        return dispatched
+    return asyncio.run(asyncio.wait_for(run(), REPLY_TIMEOUT))
+
+fake_slack = None
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+def benchmark_modes(n_events=500, latency=FAKE_API_LATENCY):
+    """
+    Runs n_events "help" message events through both bots against the fake server.
+    Returns {mode: {'events', 'seconds', 'events_per_sec', 'p50', 'p99'}}.
+    """
+    global fake_slack
+    fake_slack = FakeSlack(latency)
+    # Read by bot.py / async_bot.py when they are imported
+    os.environ.update({'SLACK_API_URL': fake_slack.base_url, 'SLACK_BOT_TOKEN': FAKE_TOKEN,
+                       'TASK_BOT_SIGNING_SECRET': 'benchmark'})
+    os.environ.setdefault('GOOGLE_API_KEY', 'benchmark')
+
+    report = {}
+    for mode, runner in (('sync', run_sync), ('async', run_async)):
+        events = [message_event(i) for i in range(n_events)]
+        fake_slack.reset()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):   # the handlers log every message
+            dispatched = runner(events)
+            if not fake_slack.wait_for_replies(len(events)):
+                raise SystemExit(f"{mode}: only {len(fake_slack.replies)} of {len(events)} handlers replied")
+        seconds = time.perf_counter() - start
+        latencies = [fake_slack.replies[channel] - sent for channel, sent in dispatched.items()]
+        report[mode] = {'events': len(latencies), 'seconds': seconds, 'events_per_sec': len(latencies) / seconds,
+                        'p50': percentile(latencies, 0.50), 'p99': percentile(latencies, 0.99)}
+    return report
+
+if __name__ == "__main__":
+    n_events = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else FAKE_API_LATENCY
+    report = benchmark_modes(n_events, latency)
+
+    print(f"{n_events} events, {latency * 1000:.0f}ms per Slack API call")
+    print(f"{'mode':<8}{'events/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for mode, row in report.items():
+        print(f"{mode:<8}{row['events_per_sec']:>10.1f}{row['p50'] * 1000:>10.0f}{row['p99'] * 1000:>10.0f}")
@@ -0,0 +1,72 @@
+"""
+Date: 10/18/2026
+Description: Benchmarks writing one cycle of generated tasks: the old path
+    (one INSERT + commit per row) against task.insert_tasks (chunked
+    multi-row INSERTs, one transaction), at 100, 1k and 10k tasks.
+
+Runs against a scratch database with the snackngo schema (tasks table); the
+rows it inserts are deleted after every run. Never point it at production.
+
+Usage: python benchmark_bulk_inserts.py <scratch db name> [chunk size]
+"""
+import sys
+import json
+import time
+
+import helper_functions
+import schema_registry
+import task
+
+SIZES = (100, 1000, 10000)
+
+
+def insert_row_by_row(db, tasks_list, start_times):
+    """The pre-batching insert_tasks: one statement and one commit per task."""
+    cursor = db.cursor()
+    columns = [col for col in task.TASK_COLUMNS if col in schema_registry.get_columns('tasks')]
+    query = schema_registry.insert_statement('tasks', tuple(columns))
+    for i, one_task in enumerate(tasks_list):
+        row = dict(one_task, start_time=start_times[i])
+        cursor.execute(query, [row[col] for col in columns])
+        db.commit()
+
+def make_tasks(n):
+    with open(task.TASK_LOCATION_FILE, 'r') as infile:
+        locations = json.load(infile)
+    with open(task.TASK_DESCRIPTION_FILE, 'r') as infile:
+        descriptions = json.load(infile)
+    return [task.create_task(locations, descriptions) for _ in range(n)], task.random_datetime(n)
+
+def time_insert(db, insert_func, tasks_list, start_times, **kwargs):
+    """Returns the seconds insert_func took, then removes the rows it added."""
+    cursor = db.cursor()
+    cursor.execute("SELECT COALESCE(MAX(id), 0) FROM tasks")
+    last_id = cursor.fetchone()[0]
+    start = time.perf_counter()
+    insert_func(db, tasks_list, start_times, **kwargs)
+    seconds = time.perf_counter() - start
+    cursor.execute("DELETE FROM tasks WHERE id > %s", (last_id,))
+    db.commit()
+    return seconds
+
+def benchmark_inserts(db_name, sizes=SIZES, chunk_size=None):
+    """Returns [{'tasks', 'row_by_row', 'batched'}] with rows/sec for both paths."""
+    schema_registry.load(('tasks',), db_name)
+    report = []
+    with helper_functions.connectDB(db_name) as db:
+        for n in sizes:
+            tasks_list, start_times = make_tasks(n)
+            slow = time_insert(db, insert_row_by_row, tasks_list, start_times)
+            fast = time_insert(db, task.insert_tasks, tasks_list, start_times, chunk_size=chunk_size)
+            report.append({'tasks': n, 'row_by_row': n / slow, 'batched': n / fast})
+    return report
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(2)
+    chunk_size = int(sys.argv[2]) if len(sys.argv) > 2 else task.INSERT_CHUNK_SIZE
+    print(f"chunk size {chunk_size}")
+    print(f"{'tasks':>8}{'row-by-row rows/s':>20}{'batched rows/s':>18}{'speedup':>10}")
+    for row in benchmark_inserts(sys.argv[1], chunk_size=chunk_size):
+        print(f"{row['tasks']:>8}{row['row_by_row']:>20.0f}{row['batched']:>18.0f}{row['batched'] / row['row_by_row']:>9.1f}x")
@@ -0,0 +1,101 @@
+"""
+Date: 10/18/2026
+Description: Scaling benchmark for the matching algorithms on synthetic data
+    (no database needed): the original per-task algorithm_random /
+    algorithm_weighted against their NumPy versions, from 1k tasks x 100
+    users up to 100k tasks x 10k users. Every task gets EXCLUSIONS_PER_TASK
+    previously-assigned users. Also checks that no match repeats an excluded
+    user. The original algorithms are skipped on the largest sizes, where a
+    single run takes minutes.
+    Then compares load balance (max tasks per user) and runtime of
+    algorithm_capacity (capacity-constrained optimal matching) against
+    algorithm_weighted_np at CAPACITY_SIZES.
+
+Usage: python benchmark_matching.py [max tasks]
+"""
+import sys
+import time
+import random
+from collections import Counter
+
+import matching_assignments as ma
+
+SIZES = [(1000, 100), (10000, 1000), (100000, 1000), (100000, 10000)]   # (tasks, users)
+EXCLUSIONS_PER_TASK = 3
+ORIGINAL_MAX_WORK = 10 ** 8   # tasks * users above which the original algorithms are skipped
+CAPACITY_SIZES = [(1000, 100), (10000, 1000), (20000, 5000)]
+CANDIDATES_PER_TASK = 32
+RELIABILITY_LEVELS = 10
+
+PAIRS = [('random', ma.algorithm_random, ma.algorithm_random_np),
+         ('weighted', ma.algorithm_weighted, ma.algorithm_weighted_np)]
+
+
+def make_data(n_tasks, n_users):
+    """Returns (assignment_data, task_data, user_data) shaped like match_users_and_tasks() passes them."""
+    user_data = {'id': [f"U{i:06d}" for i in range(n_users)],
+                 'reliability': [round(random.uniform(0.1, 1.0), 2) for _ in range(n_users)]}
+    task_data = set(range(n_tasks))
+    assignment_data = {'task_id': [], 'user_id': []}
+    for task_id in task_data:
+        for user_id in random.sample(user_data['id'], EXCLUSIONS_PER_TASK):
+            assignment_data['task_id'].append(task_id)
+            assignment_data['user_id'].append(user_id)
+    return assignment_data, task_data, user_data
+
+def count_violations(matchings, assignment_data):
+    excluded = set(zip(assignment_data['task_id'], assignment_data['user_id']))
+    return sum(1 for task_id, user_id in matchings if (task_id, user_id) in excluded)
+
+def benchmark_matching(sizes=SIZES):
+    """Returns [{'tasks', 'users', 'algorithm', 'original', 'numpy', 'violations'}] (seconds, None if skipped)."""
+    report = []
+    for n_tasks, n_users in sizes:
+        data = make_data(n_tasks, n_users)
+        for name, original, vectorized in PAIRS:
+            row = {'tasks': n_tasks, 'users': n_users, 'algorithm': name, 'original': None}
+            if n_tasks * n_users <= ORIGINAL_MAX_WORK:
+                start = time.perf_counter()
+                original(*data)
+                row['original'] = time.perf_counter() - start
+            start = time.perf_counter()
+            matchings = vectorized(*data)
+            row['numpy'] = time.perf_counter() - start
+            row['violations'] = count_violations(matchings, data[0])
+            report.append(row)
+    return report
+
+def benchmark_capacity(sizes=CAPACITY_SIZES):
+    """Returns [{'tasks', 'users', 'algorithm', 'seconds', 'matched', 'max_load', 'idle_users', 'violations'}]."""
+    report = []
+    for n_tasks, n_users in sizes:
+        data = make_data(n_tasks, n_users)
+        capacity = -(-n_tasks // n_users)
+        runs = [('weighted_np', lambda: ma.algorithm_weighted_np(*data)),
+                ('capacity', lambda: ma.algorithm_capacity(*data, capacity=capacity, candidates_per_task=CANDIDATES_PER_TASK,
+                                                           reliability_levels=RELIABILITY_LEVELS))]
+        for name, run in runs:
+            start = time.perf_counter()
+            matchings = run()
+            seconds = time.perf_counter() - start
+            load = Counter(user_id for _, user_id in matchings)
+            report.append({'tasks': n_tasks, 'users': n_users, 'algorithm': name, 'seconds': seconds,
+                           'matched': len(matchings), 'max_load': max(load.values(), default=0),
+                           'idle_users': n_users - len(load), 'violations': count_violations(matchings, data[0])})
+    return report
+
+if __name__ == "__main__":
+    max_tasks = int(sys.argv[1]) if len(sys.argv) > 1 else None
+    sizes = [size for size in SIZES if max_tasks is None or size[0] <= max_tasks]
+    print(f"{'tasks':>8}{'users':>8}  {'algorithm':<10}{'original s':>12}{'numpy s':>10}{'speedup':>10}{'violations':>12}")
+    for row in benchmark_matching(sizes):
+        original = f"{row['original']:.3f}" if row['original'] is not None else 'skipped'
+        speedup = f"{row['original'] / row['numpy']:.0f}x" if row['original'] is not None else '-'
+        print(f"{row['tasks']:>8}{row['users']:>8}  {row['algorithm']:<10}{original:>12}{row['numpy']:>10.3f}"
+              f"{speedup:>10}{row['violations']:>12}")
+
+    capacity_sizes = [size for size in CAPACITY_SIZES if max_tasks is None or size[0] <= max_tasks]
+    print(f"\n{'tasks':>8}{'users':>8}  {'algorithm':<13}{'seconds':>9}{'matched':>9}{'max load':>10}{'idle users':>12}{'violations':>12}")
+    for row in benchmark_capacity(capacity_sizes):
+        print(f"{row['tasks']:>8}{row['users']:>8}  {row['algorithm']:<13}{row['seconds']:>9.3f}{row['matched']:>9}"
+              f"{row['max_load']:>10}{row['idle_users']:>12}{row['violations']:>12}")
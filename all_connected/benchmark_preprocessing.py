@@ -0,0 +1,93 @@
+"""
+Date: 10/18/2026
+Description: Benchmarks Gemini extraction latency, upload size and field accuracy
+    for every preprocessing preset in gemini.PREPROCESS_PRESETS on a local set
+    of labelled screenshots.
+
+Fixture set: a folder of screenshots plus an expected.json like
+    {
+        "uber-orderplacement.PNG": {
+            "image_stage": "awaiting_placement_time",
+            "expected": {"restaurant_name": "Chipotle", "order_placement_time": "12:41 PM", ...}
+        },
+        ...
+    }
+Times are written as they appear on screen ('12:41 PM') and count as correct
+when within TIME_TOLERANCE seconds of the extracted timestamp. Only the
+fields listed under "expected" are scored.
+
+Usage: python benchmark_preprocessing.py [fixture_dir] [mode]
+"""
+import os
+import sys
+import json
+import time
+from PIL import Image
+
+import gemini
+
+DEFAULT_FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'extraction_fixtures')
+TIME_TOLERANCE = 60  # seconds
+
+
+def field_matches(field, expected, extracted):
+    """Takes a field name, the expected value and the extracted value. Returns True if they agree."""
+    if expected is None or extracted is None:
+        return expected is None and extracted is None
+    if field.endswith('_time'):
+        expected_unix = gemini.convert_to_unix(expected)
+        return expected_unix is not None and abs(expected_unix - extracted) <= TIME_TOLERANCE
+    return str(expected).strip().lower() == str(extracted).strip().lower()
+
+
+def benchmark_presets(fixture_dir=DEFAULT_FIXTURE_DIR, mode=None, presets=None):
+    """
+    Takes the fixture folder, an extraction mode and the presets to compare.
+    Runs every fixture through every preset (cache disabled).
+    Returns {preset: {'images', 'avg_seconds', 'avg_payload_kb', 'correct_fields', 'scored_fields', 'accuracy'}}
+        (avg_payload_kb is the size of the bytes actually uploaded)
+    """
+    expected_file = os.path.join(fixture_dir, 'expected.json')
+    if not os.path.isfile(expected_file):
+        raise SystemExit(f"No fixture set at {fixture_dir} (expected {expected_file}). "
+                         f"Pass a folder of labelled screenshots, see the module docstring.")
+    with open(expected_file, 'r') as infile:
+        fixtures = json.load(infile)
+
+    report = {}
+    for preset in presets or gemini.PREPROCESS_PRESETS:
+        seconds, payloads, correct, scored = [], [], 0, 0
+        for filename, fixture in fixtures.items():
+            path = os.path.join(fixture_dir, filename)
+            _, payload_size = gemini.preprocess_image(Image.open(path), preset)
+            payloads.append(payload_size)
+
+            start = time.perf_counter()
+            extracted = gemini.gemini_process_image(path, fixture['image_stage'], mode=mode,
+                                                    use_cache=False, preset=preset)
+            seconds.append(time.perf_counter() - start)
+
+            for field, expected in fixture['expected'].items():
+                scored += 1
+                correct += field_matches(field, expected, extracted.get(field))
+
+        report[preset] = {
+            'images': len(fixtures),
+            'avg_seconds': sum(seconds) / len(seconds) if seconds else 0.0,
+            'avg_payload_kb': sum(payloads) / len(payloads) / 1024 if payloads else 0.0,
+            'correct_fields': correct,
+            'scored_fields': scored,
+            'accuracy': correct / scored if scored else 0.0,
+        }
+    return report
+
+
+if __name__ == "__main__":
+    fixture_dir = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_FIXTURE_DIR
+    mode = sys.argv[2] if len(sys.argv) > 2 else None
+    report = benchmark_presets(fixture_dir, mode)
+
+    print(f"{'preset':<10}{'images':>8}{'avg s':>10}{'avg KB':>10}{'accuracy':>10}")
+    for preset, row in report.items():
+        print(f"{preset:<10}{row['images']:>8}{row['avg_seconds']:>10.2f}{row['avg_payload_kb']:>10.0f}"
+              f"{row['accuracy']:>9.0%} ({row['correct_fields']}/{row['scored_fields']})")
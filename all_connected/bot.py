@@ -8,7 +8,9 @@ import os
 from pathlib import Path
 from dotenv import load_dotenv
 import json
+import hashlib
 import requests
+from requests.adapters import HTTPAdapter
 from slack_sdk import WebClient
 from slack_sdk.errors import SlackApiError
 from slack_bolt import App
@@ -16,132 +18,85 @@ from slack_bolt.adapter.socket_mode import SocketModeHandler
 from datetime import datetime
 from helper_functions import *
 from gemini import *
+from image_queue import ImageJobQueue
+from channel_pool import ChannelPool, new_channel_name
+from slack_dispatcher import SlackDispatcher, BROADCAST
+from user_directory import UserDirectory
+import file_dedup
+import extraction_cache
+from order_cache import OrderCache
+import schema_registry
+import migrations
+import order_stats
 import messenger
 import re
+import time
+# Paths, message blocks, order stages & formatting helpers shared with async_bot.py
+from bot_common import (IMAGE_STORAGE_DIR, MESSAGE_BLOCKS, ORDER_STAGES, DOWNLOAD_CHUNK_SIZE,
+                        get_current_unix_time, format_unix_time, parse_human_time_to_unix,
+                        get_next_unverified_field, format_field_for_display, input_prompt_blocks,
+                        get_button_style, create_button)
 
 ## Load environment variables ##
 env_path = Path(__file__).parent.parent / '.env'
 load_dotenv(env_path)
 
+# BOT_MODE=async runs the asyncio version of this bot (async_bot.py) instead. Checked before
+# anything below connects to Slack or starts workers, so async mode never builds the sync bot.
+if __name__ == "__main__" and os.environ.get('BOT_MODE', 'sync') == 'async':
+    import async_bot
+    async_bot.main()
+    raise SystemExit
+
 ### CONSTANTS ###
 DB_NAME = os.environ.get('DB_NAME')
-BOT_ID = WebClient(token=os.environ.get('SLACK_BOT_TOKEN')).api_call("auth.test")['user_id']
-
-## Path configurations ##
-SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
-PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
-BLOCK_MESSAGES_DIR = os.path.join(PROJECT_ROOT, 'all_connected', 'block_messages')
-IMAGE_STORAGE_DIR = os.path.join(PROJECT_ROOT, '..', 'order_screenshots')
-os.makedirs(IMAGE_STORAGE_DIR, exist_ok=True)
-
-## Load message blocks ##
-def load_message_block(filename):
-    with open(os.path.join(BLOCK_MESSAGES_DIR, filename), 'r') as infile:
-        return json.load(infile)
-
-MESSAGE_BLOCKS = {
-    'headers': load_message_block('headers.json'),
-    'channel_welcome': load_message_block('channel_welcome_message.json'),
-    'channel_created': load_message_block('channel_created_confirmation.json'),
-    'main_channel_welcome_message': load_message_block('main_channel_welcome_message.json')
-}
-
-# Order stages configuration
-ORDER_STAGES = {
-    'awaiting_app_selection': {
-        'next': 'awaiting_initial_screenshot',
-        'prompt': "Which delivery app did you use?",
-        'actions': ['app_selection']
-    },
-    'awaiting_initial_screenshot': {
-        'next': 'verifying_initial_data',
-        'prompt': None,
-        'actions': ['file_upload']
-    },
-    'verifying_initial_data': {
-        'next': 'awaiting_completion_screenshot',
-        'prompt': None,  # Dynamic based on verification flow
-        'actions': ['verify_field']
-    },
-    'awaiting_completion_screenshot': {
-        'next': 'verifying_completion_data',
-        'prompt': "Thanks for verifying all this information! Now we will move on to submitting the second screenshot which will be an *order completion* screenshot. This is usually taken right after you receive your order from the driver and includes information about the *order completion time* aka when the order was delivered. Please give snack\'n\'go a few seconds to process your image before we proceed to the next step 🙂",
-        'actions': ['file_upload']
-    },
-    'verifying_completion_data': {
-        'next': 'collecting_missing_info',
-        'prompt': None,
-        'actions': ['verify_field']
-    },
-    'collecting_missing_info': {
-        'next': 'completed',
-        'prompt': "Let's check if we're missing anything...",
-        'actions': ['verify_field']
-    }
-}
+SLACK_API_URL = os.environ.get('SLACK_API_URL', WebClient.BASE_URL)   # e.g. benchmark_bot_modes.py's fake Slack
+BOT_ID = WebClient(token=os.environ.get('SLACK_BOT_TOKEN'), base_url=SLACK_API_URL).api_call("auth.test")['user_id']
 
 # Initialize Slack app
+client = WebClient(token=os.environ.get('SLACK_BOT_TOKEN'), base_url=SLACK_API_URL)
 app = App(
-    token=os.environ.get('SLACK_BOT_TOKEN'),
-    signing_secret=os.environ.get('TASK_BOT_SIGNING_SECRET')
+    signing_secret=os.environ.get('TASK_BOT_SIGNING_SECRET'),
+    client=client
 )
-client = WebClient(token=os.environ.get('SLACK_BOT_TOKEN'))
+
+# Every outbound chat.postMessage / chat.update goes through the dispatcher (rate limits, retries, coalescing)
+dispatcher = SlackDispatcher(client)
+
+# Workspace users, kept in step with the users table
+user_directory = UserDirectory(client)
+
+# Screenshots are downloaded & sent to Gemini by background workers
+image_queue = ImageJobQueue()
+
+# Order rows by channel_id, kept in sync by update_order()
+order_cache = OrderCache()
+
+# Empty private channels created ahead of time for new orders (refilled in the background)
+def create_private_channel(name):
+    return client.conversations_create(name=name, is_private=True)["channel"]["id"]
+
+channel_pool = ChannelPool(create_private_channel)
+
+# Keep-alive session shared by all screenshot downloads (one pooled connection per worker)
+http_session = requests.Session()
+http_session.headers['Authorization'] = f'Bearer {os.environ.get("SLACK_BOT_TOKEN")}'
+http_session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=image_queue.workers))
 
 ### HELPER FUNCTIONS ###
 # Add these helper functions
 def get_all_users_info() -> dict:
     '''
     Helper function to get all users info from slack
-    Takes a users array we get from slack which is a SlackResponse object type
-    Returns a dict type containing same info with user id as key
+    Returns a dict of the workspace's (non-deleted) users keyed on user ID,
+        served from user_directory (paged users.list, refreshed by events & periodic syncs)
     '''
-    # Get users list (requires the users:read scope)
-    result = client.users_list()
-
-    # Get all user info in result
-    users_array = result["members"]
-    users_store = {}
-
-    # Turn the SlackResponse object type into dict type
-    for user in users_array:
-        if user['deleted'] == False:
-            # Key user info on their unique user ID
-            user_id = user["id"]
-            # Store the entire user object (you may not need all of the info)
-            users_store[user_id] = user
-    
-    return users_store
-
-def get_current_unix_time():
-    return int(time.time())
-
-def format_unix_time(timestamp, format_str="%Y-%m-%d %H:%M"):
-    """Convert Unix timestamp to human-readable string"""
-    if timestamp is None:
-        return "[Not Provided]"
-    return datetime.fromtimestamp(timestamp).strftime(format_str)
-
-def parse_human_time_to_unix(time_str):
-    """Convert user-input time to Unix timestamp"""
-    try:
-        dt = datetime.strptime(time_str, "%Y-%m-%d %H:%M")
-        return int(dt.timestamp())
-    except ValueError:
-        try:
-            dt = datetime.strptime(time_str, "%H:%M")  # Assume today's date
-            dt = dt.replace(year=datetime.now().year, 
-                           month=datetime.now().month,
-                           day=datetime.now().day)
-            return int(dt.timestamp())
-        except:
-            return None
+    return user_directory.users()
 
 def db_operation(query, params=None, fetch_one=False, fetch_all=False):
     """Generic database operation handler"""
-    conn = None
     try:
-        conn = connectDB(DB_NAME)
-        with conn.cursor(pymysql.cursors.DictCursor) as cursor:
+        with connectDB(DB_NAME) as conn, conn.cursor(pymysql.cursors.DictCursor) as cursor:
             cursor.execute(query, params or ())
             if fetch_one:
                 result = cursor.fetchone()
@@ -154,61 +109,84 @@ def db_operation(query, params=None, fetch_one=False, fetch_all=False):
     except Exception as e:
         print(f"Database error: {e}")
         return None
-    finally:
-        if conn:
-            conn.close()
 
-def get_order_info(channel_id):
-    """Get order information by channel ID"""
+def get_account_summary(user_id):
+    """
+    Get a user's row with their order counts (primary-key lookups on users &
+    user_order_stats) and their 5 most recent orders, over a single pooled connection.
+    Returns (user_data, recent_orders), or (None, None) if the user doesn't exist.
+    """
+    with connectDB(DB_NAME) as conn, conn.cursor(pymysql.cursors.DictCursor) as cursor:
+        cursor.execute(
+            """SELECT users.*,
+                      COALESCE(user_order_stats.total_orders, 0) AS total_orders,
+                      COALESCE(user_order_stats.completed_orders, 0) AS completed_orders,
+                      COALESCE(user_order_stats.rejected_orders, 0) AS rejected_orders,
+                      COALESCE(user_order_stats.pending_orders, 0) AS pending_orders
+               FROM users LEFT JOIN user_order_stats ON user_order_stats.user_id = users.id
+               WHERE users.id = %s""",
+            (user_id,)
+        )
+        user_data = cursor.fetchone()
+        if not user_data:
+            return None, None
+
+        cursor.execute(
+            """SELECT order_id, restaurant_name, status, channel_creation_time 
+               FROM orders WHERE user_id = %s 
+               ORDER BY channel_creation_time DESC LIMIT 5""",
+            (user_id,)
+        )
+        recent_orders = cursor.fetchall()
+    return user_data, recent_orders
+
+def load_order_info(channel_id):
+    """Read order information by channel ID from the database"""
     return db_operation(
         "SELECT * FROM orders WHERE channel_id = %s",
         (channel_id,),
         fetch_one=True
     )
 
+def get_order_info(channel_id):
+    """Get order information by channel ID (served from order_cache when possible)"""
+    return order_cache.get(channel_id, load_order_info)
+
 def get_order_channel(body):
     """Helper to get the order channel from any interaction"""
-    channel_id = body["container"]["channel_id"]
-    order = get_order_info(channel_id)
-    return order["channel_id"] if order else channel_id
+    # Orders are keyed on their channel, so the interaction's channel is the order channel
+    return body["container"]["channel_id"]
 
 def update_order(channel_id, updates):
     """Update order fields with column existence check"""
     if not updates:
         return False
         
-    # Get existing columns
-    conn = connectDB(DB_NAME)
     try:
-        with conn.cursor() as cursor:
-            cursor.execute("SHOW COLUMNS FROM orders")
-            existing_columns = {col[0] for col in cursor.fetchall()}
-            
-            # Filter updates to only include existing columns
-            valid_updates = {k: v for k, v in updates.items() if k in existing_columns}
+        # Filter updates to only include existing columns (checked against the in-memory schema)
+        valid_updates = schema_registry.filter_columns('orders', updates)
+        
+        if not valid_updates:
+            return False
             
-            if not valid_updates:
-                return False
-                
-            set_clause = ", ".join([f"{k} = %s" for k in valid_updates])
-            query = f"UPDATE orders SET {set_clause} WHERE channel_id = %s"
-            params = list(valid_updates.values()) + [channel_id]
+        query = schema_registry.update_statement('orders', tuple(valid_updates), 'channel_id')
+        params = list(valid_updates.values()) + [channel_id]
+        with connectDB(DB_NAME) as conn, conn.cursor() as cursor:
+            # Keep the per-user counts in step with the status change (same transaction)
+            if 'status' in valid_updates:
+                order_stats.apply_status_change(cursor, channel_id, valid_updates['status'])
             cursor.execute(query, params)
             conn.commit()
+            order_cache.apply_update(channel_id, valid_updates)
             return cursor.rowcount > 0
     except Exception as e:
         print(f"Database error in update_order: {e}")
         return False
-    finally:
-        if conn:
-            conn.close()
 
 def create_order(user_id, channel_id):
     """Create a new order record with Unix timestamps"""
-    conn = None
     try:
-        conn = connectDB(DB_NAME)
-        with conn.cursor() as cursor:
+        with connectDB(DB_NAME) as conn, conn.cursor() as cursor:
             # Modified query for MySQL compatibility
             cursor.execute(
                 """INSERT INTO orders 
@@ -217,22 +195,23 @@ def create_order(user_id, channel_id):
                 (user_id, channel_id, get_current_unix_time())
             )
             order_id = cursor.lastrowid  # Get the auto-incremented ID
+            order_stats.record_new_order(cursor, user_id)
             conn.commit()
+            order_cache.invalidate(channel_id)
             return order_id
     except Exception as e:
         print(f"Database error in create_order: {e}")
         return None
-    finally:
-        if conn:
-            conn.close()
 
 def create_channel(user_id):
-    """Create a new private channel for an order"""
+    """Create a new private channel for an order (claimed from channel_pool when one is ready)"""
     try:
-        # Create channel
-        channel_name = f"order-{get_current_unix_time()}"
-        response = client.conversations_create(name=channel_name, is_private=True)
-        channel_id = response["channel"]["id"]
+        start = time.perf_counter()
+        channel_id = channel_pool.claim(user_id)
+        kind = 'claim' if channel_id else 'cold'
+        if not channel_id:
+            # Pool is empty, create the channel now
+            channel_id = create_private_channel(new_channel_name())
         
         # Create order record
         order_id = create_order(user_id, channel_id)
@@ -241,102 +220,47 @@ def create_channel(user_id):
             
         # Invite user
         client.conversations_invite(channel=channel_id, users=[user_id])
+        elapsed = time.perf_counter() - start
+        channel_pool.record(kind, elapsed)
+        print(f"[CHANNEL POOL] Order channel {channel_id} ready in {elapsed:.2f}s ({kind})", datetime.now())
         return order_id, channel_id
         
     except SlackApiError as e:
         print(f"Error creating channel: {e.response['error']}")
         return None, None
 
-def get_next_unverified_field(order):
-    """Determine which field to verify next - only returns fields with actual values"""
-    verification_order = [
-        ('restaurant_name', 'is_restaurant_name_verified'),
-        ('order_placement_time', 'is_order_placement_time_verified'),
-        ('earliest_estimated_arrival_time', 'is_earliest_estimated_arrival_time_verified'),
-        ('latest_estimated_arrival_time', 'is_latest_estimated_arrival_time_verified'),
-        ('order_completion_time', 'is_order_completion_time_verified'),
-        ('restaurant_address', 'is_restaurant_address_verified')
-    ]
-    
-    for field, verification_flag in verification_order:
-        # Only return if field has a value AND isn't verified yet
-        if order.get(field) is not None and not order.get(verification_flag, False):
-            return field, verification_flag
-    return None, None
-
-def format_field_for_display(field_name, value):
-    """Convert field values to human-readable format"""
-    if field_name.endswith('_time') and value:
-        if isinstance(value, (int, float)):  # Handle Unix timestamp
-            return datetime.fromtimestamp(value).strftime("%Y-%m-%d %H:%M")
-        return value.strftime("%Y-%m-%d %H:%M") if hasattr(value, 'strftime') else str(value)
-    return str(value) if value else "[Not Provided]"
-
 def send_input_prompt(channel_id, field, is_missing=False, client=None):
     """Generic function to ask for user input with better guidance"""
-    prompt = (f"We couldn't determine the {field.replace('_', ' ')}. Please provide it:" 
-              if is_missing 
-              else f"Please enter the correct {field.replace('_', ' ')}")
-    
-    hint_text = ""
-    if field.endswith('_time'):
-        prompt += " (format: YYYY-MM-DD HH:MM or HH:MM)"
-        hint_text = "Examples: 2025-03-29 14:30 or 14:30 (for today)"
-    
-    blocks = [
-        {
-            "type": "section",
-            "text": {
-                "type": "mrkdwn",
-                "text": prompt
-            }
-        }
-    ]
-    
-    if hint_text:
-        blocks.append({
-            "type": "context",
-            "elements": [
-                {
-                    "type": "mrkdwn",
-                    "text": f"💡 *Tip:* {hint_text}"
-                }
-            ]
-        })
-    
-    blocks.extend([
-        {
-            "type": "input",
-            "block_id": f"{'missing' if is_missing else 'correct'}_{field}",
-            "element": {
-                "type": "plain_text_input",
-                "action_id": "text_input",
-                "placeholder": {
-                    "type": "plain_text",
-                    "text": "Type your answer here"
-                }
-            },
-            "label": {
-                "type": "plain_text",
-                "text": "Enter your answer:"
-            }
-        },
-        {
-            "type": "actions",
-            "elements": [
-                create_button("Submit", "process_input", field)
-            ]
-        }
-    ])
+    blocks = input_prompt_blocks(field, is_missing)
     
     if client:
-        client.chat_postMessage(
+        # Never merged with other posts: the Submit button reads this message's input
+        dispatcher.post_message(
             channel=channel_id,
             text='Input prompt', 
-            blocks=blocks
+            blocks=blocks,
+            coalesce=False
         )
     return blocks
 
+def download_slack_file(url, filepath):
+    """
+    Streams a private Slack file to disk in chunks over the shared session,
+    hashing it on the way.
+    Returns the sha256 hex digest of the file contents.
+    """
+    digest = hashlib.sha256()
+    partial_path = filepath + '.part'
+    with http_session.get(url, stream=True, timeout=30) as response:
+        if response.status_code != 200:
+            raise Exception("Failed to download file from Slack")
+        with open(partial_path, 'wb') as f:
+            for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                digest.update(chunk)
+                f.write(chunk)
+    os.replace(partial_path, filepath)
+    return digest.hexdigest()
+
 def process_image(channel_id, file):
     """Process uploaded image based on order stage"""
     print(f"[IMAGE PROCESSING] Processing image in channel {channel_id}, File: {file['name']}", datetime.now())
@@ -344,14 +268,14 @@ def process_image(channel_id, file):
     max_size_mb = 5
     
     if file["mimetype"] not in allowed_mimetypes:
-        client.chat_postMessage(
+        dispatcher.post_message(
             channel=channel_id,
             text="Only PNG/JPEG images under 5MB are allowed."
         )
         return
         
     if file["size"] > max_size_mb * 1024 * 1024:
-        client.chat_postMessage(
+        dispatcher.post_message(
             channel=channel_id,
             text=f"Image too large. Max size: {max_size_mb}MB."
         )
@@ -359,24 +283,32 @@ def process_image(channel_id, file):
 
     order = get_order_info(channel_id)
     if not order:
-        client.chat_postMessage(
+        dispatcher.post_message(
             channel=channel_id,
             text="Order not found"
         )
         return
-    
-    try:
-        # Get file info
-        file_info = client.files_info(file=file['id'])['file']
-        
-        # Download the file
-        response = requests.get(
-            file_info['url_private_download'],
-            headers={'Authorization': f'Bearer {os.environ.get("SLACK_BOT_TOKEN")}'}
+
+    # Hand the slow part (download + Gemini) to the worker pool so the handler returns right away
+    if not image_queue.submit(process_image_job, channel_id, file, order, job_name=f"image {file['id']}"):
+        print(f"[IMAGE PROCESSING] Queue full, turned away {file['id']} in {channel_id}", datetime.now())
+        dispatcher.post_message(
+            channel=channel_id,
+            text="We're processing a lot of screenshots right now 😵 Please upload your screenshot again in a minute."
         )
-        
-        if response.status_code != 200:
-            raise Exception("Failed to download file from Slack")
+        return
+
+    dispatcher.post_message(
+        channel=channel_id,
+        text="📸 Got your screenshot! Processing it now, this usually takes a few seconds..."
+    )
+
+def process_image_job(channel_id, file, order):
+    """Download the screenshot, run extraction and start verification (runs on an image_queue worker)"""
+    try:
+        download_start = time.perf_counter()
+        # Get file info (file_shared events already passed the full files_info result)
+        file_info = file if 'url_private_download' in file else client.files_info(file=file['id'])['file']
         
         # Create filename
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -396,13 +328,15 @@ def process_image(channel_id, file):
         filename = f"order_{order['order_id']}_{stage}_{timestamp}.{file_ext}"
         filepath = os.path.join(IMAGE_STORAGE_DIR, filename)
         
-        # Save the file
-        with open(filepath, 'wb') as f:
-            f.write(response.content)
+        # Download & save the file
+        image_digest = download_slack_file(file_info['url_private_download'], filepath)
+        download_seconds = time.perf_counter() - download_start
         
         # Process the image
-        extracted = gemini_process_image(filepath, image_stage)
+        extract_start = time.perf_counter()
+        extracted = gemini_process_image(filepath, image_stage, image_digest=image_digest)
         print(extracted)
+        print(f"[IMAGE PROCESSING] {file['id']}: download {download_seconds:.2f}s, extraction {time.perf_counter() - extract_start:.2f}s", datetime.now())
         
         updates = {
             'status': 'verifying_initial_data' if stage == 'placement' else 'verifying_completion_data'
@@ -428,9 +362,11 @@ def process_image(channel_id, file):
             raise Exception("Failed to update order in database")
             
     except Exception as e:
+        # Let a re-delivery of the same file try again
+        file_dedup.release(file['id'])
         error_msg = f"Error processing image: {str(e)}"
         print(error_msg)
-        client.chat_postMessage(
+        dispatcher.post_message(
             channel=channel_id,
             text=error_msg
         )
@@ -439,7 +375,7 @@ def start_field_verification(channel_id, client):
     # Get the current order information
     order = get_order_info(channel_id)
     if not order:
-        client.chat_postMessage(
+        dispatcher.post_message(
             channel=order['channel_id'],
             text="No active order", 
             blocks=[{
@@ -466,7 +402,7 @@ def start_field_verification(channel_id, client):
     field_value = order.get(field)
     
     # Send verification prompt
-    client.chat_postMessage(
+    dispatcher.post_message(
         channel=channel_id,
         text='send verification prompt', 
         blocks={{
@@ -512,7 +448,7 @@ def handle_stage_completion(order, client):
     print(f"[STAGE CHANGE] Channel {channel_id} moving from {current_stage} to {next_stage}", datetime.now())
 
     if not next_stage:
-        client.chat_postMessage(
+        dispatcher.post_message(
             channel=channel_id,
             text="Thank you! Submission complete. ",
             blocks=[
@@ -532,7 +468,7 @@ def handle_stage_completion(order, client):
         # Show progress indicator with the new stage
         next_prompt = ORDER_STAGES.get(next_stage, {}).get('prompt')
         if next_prompt:
-            client.chat_postMessage(
+            dispatcher.post_message(
                 channel=channel_id, 
                 text='Next step', 
                 blocks=[{
@@ -548,30 +484,6 @@ def handle_stage_completion(order, client):
         if next_stage == 'collecting_missing_info':
             check_for_missing_info(order['channel_id'], client)
 
-def get_button_style(action_id, is_disabled=False):
-    """Helper to get button style based on action_id"""
-    if is_disabled:
-        return None
-    if action_id == "verify_field_yes":
-        return "primary"  # Slack's primary is green
-    elif action_id == "verify_field_no":
-        return "danger"   # Slack's danger is red
-    elif action_id == "process_input":
-        return "primary"  # Blue (same as yes for now)
-    return None
-
-def create_button(text, action_id, value, style=None):
-    """Create a properly formatted Slack button"""
-    button = {
-        "type": "button",
-        "text": {"type": "plain_text", "text": text},
-        "action_id": action_id,
-        "value": value
-    }
-    if style in ["primary", "danger"]:  # Only allowed styles
-        button["style"] = style
-    return button
-
 def update_message_after_action(client, channel_id, ts, original_blocks, decision_text):
     """Update message to show decision and remove buttons"""
     # Create new blocks without action blocks
@@ -586,7 +498,7 @@ def update_message_after_action(client, channel_id, ts, original_blocks, decisio
         }
     })
     
-    client.chat_update(
+    dispatcher.update_message(
         channel=channel_id,
         ts=ts,
         blocks=new_blocks
@@ -621,6 +533,9 @@ def handle_message(payload, say):
             say("Please upload only one file at a time.")
             return
         file = payload['files'][0]
+        # The same upload also arrives as a file_shared event
+        if not file_dedup.claim(file['id']):
+            return
         if "image" not in file['mimetype']:
             say(text="Please upload an image file. ", 
                 blocks=[{
@@ -636,23 +551,25 @@ def handle_message(payload, say):
         say()
 
 def send_messages(channel_id, block=None, text=None):
-    messenger.send_message(channel_id, block, text)
+    """Queues a (non-interactive) message to a user or channel"""
+    return dispatcher.post_message(channel=channel_id, text=text, blocks=block, priority=BROADCAST)
 
-def send_welcome_message(users_list) -> None:
+def send_welcome_message(users_list) -> dict:
     '''
     Takes   A list containing all user ids or a dictionary with user ids as its keys. 
             currently using users_store returned by get_all_users_info()
-    Sends welcoming message to all users
+    Sends welcoming message to all active users (concurrently, within Slack's rate limits)
+    Returns the dispatcher's per-user delivery report
     '''
-    active_users = messenger.get_active_users_list()
-    for user_id in users_list:
-        if BOT_ID != user_id and user_id in active_users:      
-            try:
-                print(f'IN Welcome: {user_id}', datetime.now())
-                client.chat_postMessage(channel=f"@{user_id}", blocks = MESSAGE_BLOCKS["main_channel_welcome_message"]['blocks'], text="Welcome to Snack N Go!")
-                print("Welcome!")
-            except SlackApiError as e:
-                assert e.response["ok"] is False and e.response["error"], f"Got an error: {e.response['error']}"
+    active_users = set(messenger.get_active_users_list())
+    recipients = [user_id for user_id in users_list if user_id != BOT_ID and user_id in active_users]
+    report = dispatcher.fan_out(recipients, blocks=MESSAGE_BLOCKS["main_channel_welcome_message"]['blocks'],
+                                text="Welcome to Snack N Go!")
+    print(f"[WELCOME] Sent {report['sent']}, failed {report['failed']} in {report['seconds']:.1f}s", datetime.now())
+    for user_id, delivery in report['users'].items():
+        if not delivery['ok']:
+            print(f"[WELCOME] Could not welcome {user_id}: {delivery['error']}")
+    return report
 
 @app.action("process_input")
 def handle_user_input(ack, body, say, logger, client):
@@ -724,13 +641,17 @@ def handle_file_shared_events(body, logger):
     user_id = body["event"]["user"]["id"]
 
     print(f"[FILE SHARED] User {user_id} shared file in channel {channel_id}", datetime.now())
+
+    # The same upload also arrives as a message event with 'files'
+    if not file_dedup.claim(file_id, body.get("event_id")):
+        return
     
     try:
         file_info = client.files_info(file=file_id)["file"]
         if "image" in file_info["mimetype"]:
             process_image(channel_id, file_info)
         else:
-            client.chat_postMessage(
+            dispatcher.post_message(
                 channel=channel_id,
                 text="Please upload an image file (JPG, JPEG, or PNG).",
                 blocks=[{
@@ -743,7 +664,7 @@ def handle_file_shared_events(body, logger):
             )
     except SlackApiError as e:
         logger.error(f"Error fetching file info: {e.response['error']}")
-        client.chat_postMessage(
+        dispatcher.post_message(
             channel=channel_id,
             text="Sorry, I couldn't process your file.",
             blocks=[{
@@ -759,12 +680,16 @@ def handle_file_shared_events(body, logger):
 def handle_team_join(body, logger, say):
     logger.info("Team join event received!")
     logger.info(body)  # Log the entire payload for debugging
-    user_store = get_all_users_info()
-    messenger.add_users(user_store)
+    user_directory.apply_user(body["event"]["user"])
     user_id = body["event"]["user"]["id"]
     print(f"[NEW USER] User {user_id} joined the workspace", datetime.now())
     send_welcome_message([user_id])
 
+@app.event("user_change")
+def handle_user_change(body, logger):
+    """Keep the user directory & users table in step with profile changes / deactivations"""
+    user_directory.apply_user(body["event"]["user"])
+
 @app.action("start_order_submission")
 def handle_start_order_submission(ack, body, say):
     """Start new order submission flow"""
@@ -774,7 +699,7 @@ def handle_start_order_submission(ack, body, say):
     print(f"[ORDER STARTED] User {user_id} started new order submission at {datetime.now()}") 
 
     if order_id and channel_id:
-        client.chat_postMessage(
+        dispatcher.post_message(
             channel=channel_id,
             text = 'Which of the following delivery apps do you use?', 
             blocks=[{
@@ -805,7 +730,8 @@ def handle_start_order_submission(ack, body, say):
                         "value": "grubhub"
                     }
                 ]
-            }]
+            }],
+            coalesce=False
         )
         say(f"Created private channel for your order: <#{channel_id}>")
     else:
@@ -829,7 +755,7 @@ def handle_app_selection(ack, body, say):
     app_display_name = app_display_names.get(app_used, app_used.capitalize())
     
     # Update the original message to show selection
-    client.chat_update(
+    dispatcher.update_message(
         channel=channel_id,
         ts=ts,
         blocks=[
@@ -854,7 +780,7 @@ def handle_app_selection(ack, body, say):
     # Update the database and proceed to the next step
     if update_order(channel_id, {"app_used": app_used, "status": "awaiting_initial_screenshot"}):
         # Send a new message for the next step
-        client.chat_postMessage(
+        dispatcher.post_message(
             channel=channel_id,
             text=ORDER_STAGES['awaiting_initial_screenshot']['prompt'],
             blocks=[
@@ -885,7 +811,7 @@ def handle_app_selection(ack, body, say):
     app_display_name = app_display_names.get(app_used, app_used.capitalize())
     
     # Update the original message to show selection
-    client.chat_update(
+    dispatcher.update_message(
         channel=channel_id,
         ts=ts,
         blocks=[
@@ -903,7 +829,7 @@ def handle_app_selection(ack, body, say):
     # Update the database and proceed to the next step
     if update_order(channel_id, {"app_used": app_used, "status": "awaiting_initial_screenshot"}):
         # Send a new message for the next step
-        client.chat_postMessage(
+        dispatcher.post_message(
             channel=channel_id,
             text=ORDER_STAGES['awaiting_initial_screenshot']['prompt'],
             blocks=[
@@ -934,7 +860,7 @@ def handle_app_selection(ack, body, say):
     app_display_name = app_display_names.get(app_used, app_used.capitalize())
     
     # Update the original message to show selection
-    client.chat_update(
+    dispatcher.update_message(
         channel=channel_id,
         ts=ts,
         blocks=[
@@ -952,7 +878,7 @@ def handle_app_selection(ack, body, say):
     # Update the database and proceed to the next step
     if update_order(channel_id, {"app_used": app_used, "status": "awaiting_initial_screenshot"}):
         # Send a new message for the next step
-        client.chat_postMessage(
+        dispatcher.post_message(
             channel=channel_id,
             text=ORDER_STAGES['awaiting_initial_screenshot']['prompt'],
             blocks=[
@@ -1010,48 +936,14 @@ def handle_check_account_status(ack, body, say):
     user_id = body["user"]["id"]
     
     try:
-        # Get user data from database
-        user_data = db_operation(
-            "SELECT * FROM users WHERE id = %s",
-            (user_id,),
-            fetch_one=True
-        )
+        # Get user data & order statistics from database
+        user_data, recent_orders = get_account_summary(user_id)
         
         if user_data:
-            # Get order statistics
-            total_orders = db_operation(
-                "SELECT COUNT(*) FROM orders WHERE user_id = %s",
-                (user_id,),
-                fetch_one=True
-            )['COUNT(*)']
-            
-            completed_orders = db_operation(
-                "SELECT COUNT(*) FROM orders WHERE user_id = %s AND status = 'completed'",
-                (user_id,),
-                fetch_one=True
-            )['COUNT(*)']
-            
-            rejected_orders = db_operation(
-                "SELECT COUNT(*) FROM orders WHERE user_id = %s AND status = 'rejected'",
-                (user_id,),
-                fetch_one=True
-            )['COUNT(*)']
-            
-            pending_orders = db_operation(
-                """SELECT COUNT(*) FROM orders WHERE user_id = %s 
-                   AND status NOT IN ('completed', 'rejected')""",
-                (user_id,),
-                fetch_one=True
-            )['COUNT(*)']
-            
-            # Get the most recent orders for history
-            recent_orders = db_operation(
-                """SELECT order_id, restaurant_name, status, channel_creation_time 
-                FROM orders WHERE user_id = %s 
-                ORDER BY channel_creation_time DESC LIMIT 5""",
-                (user_id,),
-                fetch_one=False
-            )
+            total_orders = int(user_data['total_orders'])
+            completed_orders = int(user_data['completed_orders'])
+            rejected_orders = int(user_data['rejected_orders'])
+            pending_orders = int(user_data['pending_orders'])
             
             # Format recent orders for display
             orders_history = "\n".join(
@@ -1104,7 +996,7 @@ def start_field_verification(channel_id, client):
     # Get the current order information
     order = get_order_info(channel_id)
     if not order:
-        client.chat_postMessage(
+        dispatcher.post_message(
             channel=channel_id,
             text="No active order", 
             blocks=[{
@@ -1153,17 +1045,19 @@ def start_field_verification(channel_id, client):
         }
     ]
     
-    client.chat_postMessage(
+    # Never merged with other posts: the Yes / No buttons rewrite this message
+    dispatcher.post_message(
         channel=channel_id,
         text='Field verification prompt',
-        blocks=blocks
+        blocks=blocks,
+        coalesce=False
     )
 
 def check_for_missing_info(channel_id, client):
     """Check if any required fields are missing and prompt for them"""
     order = get_order_info(channel_id)
     if not order:
-        return client.chat_postMessage(
+        return dispatcher.post_message(
             channel=channel_id, 
             text = "Order not found"
         )
@@ -1182,7 +1076,7 @@ def check_for_missing_info(channel_id, client):
     ]
     
     if missing_fields:
-        client.chat_postMessage(
+        dispatcher.post_message(
             channel=channel_id, 
             text = "We're missing some information:"
         )
@@ -1191,7 +1085,7 @@ def check_for_missing_info(channel_id, client):
     else:
         # No missing info, complete the order
         if update_order(channel_id, {'status': 'completed'}):
-            client.chat_postMessage(
+            dispatcher.post_message(
                 channel=channel_id, 
                 text = "Thank you! Your order submission is complete.",
                 blocks = [
@@ -1213,9 +1107,15 @@ def check_for_missing_info(channel_id, client):
             )
 
 if __name__ == "__main__":
+    os.makedirs(IMAGE_STORAGE_DIR, exist_ok=True)
+    migrations.apply_migrations()
+    schema_registry.load()
+    channel_pool.start()
+    file_dedup.start()
+    extraction_cache.start()
     # TODO? Figure out why team join doesnt work when app starts
-    user_store = get_all_users_info()
-    messenger.add_users(user_store)
+    user_store = user_directory.full_sync()
+    user_directory.start()
     send_welcome_message(user_store.keys())
     handler = SocketModeHandler(app, os.environ.get("SLACK_APP_TOKEN"))
-    handler.start()
\ No newline at end of file
+    handler.start()
@@ -0,0 +1,199 @@
+"""
+Date: 10/18/2026
+Description: Constants & helpers shared by the sync (bot.py) and async
+    (async_bot.py) Slack bots: paths, message blocks, order stages, time
+    parsing / formatting and block builders. Importing it has no side effects
+    beyond reading the block JSON files, so async_bot.py doesn't have to
+    import bot.py (which connects to Slack and starts its workers).
+"""
+import os
+import json
+import time
+from datetime import datetime
+
+## Path configurations ##
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
+BLOCK_MESSAGES_DIR = os.path.join(PROJECT_ROOT, 'all_connected', 'block_messages')
+IMAGE_STORAGE_DIR = os.path.join(PROJECT_ROOT, '..', 'order_screenshots')   # created by the bots at startup
+
+## Load message blocks ##
+def load_message_block(filename):
+    with open(os.path.join(BLOCK_MESSAGES_DIR, filename), 'r') as infile:
+        return json.load(infile)
+
+MESSAGE_BLOCKS = {
+    'headers': load_message_block('headers.json'),
+    'channel_welcome': load_message_block('channel_welcome_message.json'),
+    'channel_created': load_message_block('channel_created_confirmation.json'),
+    'main_channel_welcome_message': load_message_block('main_channel_welcome_message.json')
+}
+
+# Order stages configuration
+ORDER_STAGES = {
+    'awaiting_app_selection': {
+        'next': 'awaiting_initial_screenshot',
+        'prompt': "Which delivery app did you use?",
+        'actions': ['app_selection']
+    },
+    'awaiting_initial_screenshot': {
+        'next': 'verifying_initial_data',
+        'prompt': None,
+        'actions': ['file_upload']
+    },
+    'verifying_initial_data': {
+        'next': 'awaiting_completion_screenshot',
+        'prompt': None,  # Dynamic based on verification flow
+        'actions': ['verify_field']
+    },
+    'awaiting_completion_screenshot': {
+        'next': 'verifying_completion_data',
+        'prompt': "Thanks for verifying all this information! Now we will move on to submitting the second screenshot which will be an *order completion* screenshot. This is usually taken right after you receive your order from the driver and includes information about the *order completion time* aka when the order was delivered. Please give snack\'n\'go a few seconds to process your image before we proceed to the next step 🙂",
+        'actions': ['file_upload']
+    },
+    'verifying_completion_data': {
+        'next': 'collecting_missing_info',
+        'prompt': None,
+        'actions': ['verify_field']
+    },
+    'collecting_missing_info': {
+        'next': 'completed',
+        'prompt': "Let's check if we're missing anything...",
+        'actions': ['verify_field']
+    }
+}
+
+# Screenshot downloads are streamed to disk in chunks of this size
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+### HELPER FUNCTIONS ###
+def get_current_unix_time():
+    return int(time.time())
+
+def format_unix_time(timestamp, format_str="%Y-%m-%d %H:%M"):
+    """Convert Unix timestamp to human-readable string"""
+    if timestamp is None:
+        return "[Not Provided]"
+    return datetime.fromtimestamp(timestamp).strftime(format_str)
+
+def parse_human_time_to_unix(time_str):
+    """Convert user-input time to Unix timestamp"""
+    try:
+        dt = datetime.strptime(time_str, "%Y-%m-%d %H:%M")
+        return int(dt.timestamp())
+    except ValueError:
+        try:
+            dt = datetime.strptime(time_str, "%H:%M")  # Assume today's date
+            dt = dt.replace(year=datetime.now().year, 
+                           month=datetime.now().month,
+                           day=datetime.now().day)
+            return int(dt.timestamp())
+        except:
+            return None
+
+def get_next_unverified_field(order):
+    """Determine which field to verify next - only returns fields with actual values"""
+    verification_order = [
+        ('restaurant_name', 'is_restaurant_name_verified'),
+        ('order_placement_time', 'is_order_placement_time_verified'),
+        ('earliest_estimated_arrival_time', 'is_earliest_estimated_arrival_time_verified'),
+        ('latest_estimated_arrival_time', 'is_latest_estimated_arrival_time_verified'),
+        ('order_completion_time', 'is_order_completion_time_verified'),
+        ('restaurant_address', 'is_restaurant_address_verified')
+    ]
+    
+    for field, verification_flag in verification_order:
+        # Only return if field has a value AND isn't verified yet
+        if order.get(field) is not None and not order.get(verification_flag, False):
+            return field, verification_flag
+    return None, None
+
+def format_field_for_display(field_name, value):
+    """Convert field values to human-readable format"""
+    if field_name.endswith('_time') and value:
+        if isinstance(value, (int, float)):  # Handle Unix timestamp
+            return datetime.fromtimestamp(value).strftime("%Y-%m-%d %H:%M")
+        return value.strftime("%Y-%m-%d %H:%M") if hasattr(value, 'strftime') else str(value)
+    return str(value) if value else "[Not Provided]"
+
+def input_prompt_blocks(field, is_missing=False):
+    """Builds the blocks asking the user to type a field's value (posted by send_input_prompt)"""
+    prompt = (f"We couldn't determine the {field.replace('_', ' ')}. Please provide it:" 
+              if is_missing 
+              else f"Please enter the correct {field.replace('_', ' ')}")
+    
+    hint_text = ""
+    if field.endswith('_time'):
+        prompt += " (format: YYYY-MM-DD HH:MM or HH:MM)"
+        hint_text = "Examples: 2025-03-29 14:30 or 14:30 (for today)"
+    
+    blocks = [
+        {
+            "type": "section",
+            "text": {
+                "type": "mrkdwn",
+                "text": prompt
+            }
+        }
+    ]
+    
+    if hint_text:
+        blocks.append({
+            "type": "context",
+            "elements": [
+                {
+                    "type": "mrkdwn",
+                    "text": f"💡 *Tip:* {hint_text}"
+                }
+            ]
+        })
+    
+    blocks.extend([
+        {
+            "type": "input",
+            "block_id": f"{'missing' if is_missing else 'correct'}_{field}",
+            "element": {
+                "type": "plain_text_input",
+                "action_id": "text_input",
+                "placeholder": {
+                    "type": "plain_text",
+                    "text": "Type your answer here"
+                }
+            },
+            "label": {
+                "type": "plain_text",
+                "text": "Enter your answer:"
+            }
+        },
+        {
+            "type": "actions",
+            "elements": [
+                create_button("Submit", "process_input", field)
+            ]
+        }
+    ])
+    return blocks
+
+def get_button_style(action_id, is_disabled=False):
+    """Helper to get button style based on action_id"""
+    if is_disabled:
+        return None
+    if action_id == "verify_field_yes":
+        return "primary"  # Slack's primary is green
+    elif action_id == "verify_field_no":
+        return "danger"   # Slack's danger is red
+    elif action_id == "process_input":
+        return "primary"  # Blue (same as yes for now)
+    return None
+
+def create_button(text, action_id, value, style=None):
+    """Create a properly formatted Slack button"""
+    button = {
+        "type": "button",
+        "text": {"type": "plain_text", "text": text},
+        "action_id": action_id,
+        "value": value
+    }
+    if style in ["primary", "danger"]:  # Only allowed styles
+        button["style"] = style
+    return button
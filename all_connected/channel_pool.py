@@ -0,0 +1,161 @@
+"""
+Date: 10/18/2026
+Description: Pool of pre-created private Slack channels for new orders.
+    Starting an order used to create a channel, insert the order and invite
+    the user one after another while the user waited. A background thread
+    now keeps CHANNEL_POOL_TARGET empty channels ready (created at most
+    CHANNEL_POOL_REFILL_RATE per refill round), so starting an order only
+    claims one. Pooled channels are recorded in the `channel_pool` table so
+    they're reused after a restart and never handed out twice across bot
+    processes. Claim vs. cold-create latency is tracked in stats().
+"""
+import os
+import secrets
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from dotenv import load_dotenv
+env_path = Path(__file__).parent.parent / '.env'
+load_dotenv(env_path)
+
+import helper_functions
+
+### ### SETTINGS ### ###
+DB_NAME = os.environ.get('DB_NAME')
+CHANNEL_POOL_TARGET = int(os.environ.get('CHANNEL_POOL_TARGET', 10))              # empty channels kept ready
+CHANNEL_POOL_REFILL_RATE = int(os.environ.get('CHANNEL_POOL_REFILL_RATE', 5))     # channels created per refill round
+CHANNEL_POOL_REFILL_INTERVAL = float(os.environ.get('CHANNEL_POOL_REFILL_INTERVAL', 30))  # seconds between rounds
+RECENT_TIMINGS_KEPT = 200                                                         # latencies kept for stats()
+
+
+def new_channel_name():
+    """Returns a unique order channel name (order-<unix time>-<random suffix>)"""
+    return f"order-{int(time.time())}-{secrets.token_hex(3)}"
+
+
+class ChannelPool:
+    """
+    Pre-created channel ids, in memory (deque) and in the channel_pool table.
+    `create_func(name)` must create a private channel and return its id.
+    claim() hands out the oldest ready channel, or None when the pool is empty
+    so the caller falls back to creating one itself (cold create).
+    """
+    def __init__(self, create_func, target=CHANNEL_POOL_TARGET, refill_rate=CHANNEL_POOL_REFILL_RATE,
+                 refill_interval=CHANNEL_POOL_REFILL_INTERVAL, db_name=None):
+        self.create_func = create_func
+        self.target = target
+        self.refill_rate = max(refill_rate, 1)
+        self.refill_interval = refill_interval
+        self.db_name = db_name or DB_NAME
+        self._ready = deque()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._timings = {'claim': deque(maxlen=RECENT_TIMINGS_KEPT), 'cold': deque(maxlen=RECENT_TIMINGS_KEPT)}
+        self._stats = {'created': 0, 'create_errors': 0, 'claimed': 0, 'cold_creates': 0, 'lost_races': 0}
+
+    def start(self):
+        """Loads unclaimed channels left from earlier runs and starts the refill thread (only once)."""
+        with self._lock:
+            if self._thread:
+                return
+            self._thread = threading.Thread(target=self._refill_loop, name="channel-pool-refill", daemon=True)
+        try:
+            with helper_functions.connectDB(self.db_name) as conn, conn.cursor() as cursor:
+                cursor.execute("SELECT channel_id FROM channel_pool WHERE claimed_at IS NULL ORDER BY created_at")
+                with self._lock:
+                    self._ready.extend(row[0] for row in cursor.fetchall())
+        except Exception as e:
+            print(f"[CHANNEL POOL] Could not load pooled channels: {e}")
+        self._thread.start()
+
+    def claim(self, user_id):
+        """
+        Takes the id of the user starting an order.
+        Returns a ready channel id marked as claimed by that user, or None if
+            the pool is empty (the refill thread is woken up either way).
+        """
+        self._wake.set()
+        while True:
+            with self._lock:
+                if not self._ready:
+                    return None
+                channel_id = self._ready.popleft()
+            try:
+                with helper_functions.connectDB(self.db_name) as conn, conn.cursor() as cursor:
+                    cursor.execute(
+                        "UPDATE channel_pool SET claimed_at = %s, claimed_by = %s WHERE channel_id = %s AND claimed_at IS NULL",
+                        (int(time.time()), user_id, channel_id)
+                    )
+                    conn.commit()
+                    claimed = cursor.rowcount == 1
+            except Exception as e:
+                print(f"[CHANNEL POOL] Could not claim {channel_id}: {e}")
+                with self._lock:
+                    self._ready.appendleft(channel_id)
+                return None
+            if claimed:
+                with self._lock:
+                    self._stats['claimed'] += 1
+                return channel_id
+            # Another bot process claimed it first, try the next one
+            with self._lock:
+                self._stats['lost_races'] += 1
+
+    def record(self, kind, seconds):
+        """
+        Takes 'claim' or 'cold' and how long the caller took to get a usable
+        order channel that way. Kept for stats().
+        """
+        with self._lock:
+            self._timings[kind].append(seconds)
+            if kind == 'cold':
+                self._stats['cold_creates'] += 1
+
+    def available(self):
+        with self._lock:
+            return len(self._ready)
+
+    def refill(self):
+        """Creates up to refill_rate channels if the pool is below target. Returns the number created."""
+        missing = min(self.target - self.available(), self.refill_rate)
+        created = 0
+        for _ in range(max(missing, 0)):
+            name = new_channel_name()
+            try:
+                channel_id = self.create_func(name)
+                with helper_functions.connectDB(self.db_name) as conn, conn.cursor() as cursor:
+                    cursor.execute(
+                        "INSERT INTO channel_pool (channel_id, channel_name, created_at) VALUES (%s, %s, %s)",
+                        (channel_id, name, int(time.time()))
+                    )
+                    conn.commit()
+            except Exception as e:
+                print(f"[CHANNEL POOL] Could not pre-create a channel: {e}")
+                with self._lock:
+                    self._stats['create_errors'] += 1
+                break
+            with self._lock:
+                self._ready.append(channel_id)
+                self._stats['created'] += 1
+            created += 1
+        return created
+
+    def _refill_loop(self):
+        while True:
+            self.refill()
+            self._wake.wait(self.refill_interval)
+            self._wake.clear()
+
+    def stats(self):
+        """Returns a snapshot (dict) of pool size, counters and claim vs. cold-create latency."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['available'] = len(self._ready)
+            stats['target'] = self.target
+            timings = {kind: sorted(values) for kind, values in self._timings.items()}
+        for kind, values in timings.items():
+            stats[f'avg_{kind}_seconds'] = sum(values) / len(values) if values else 0.0
+            stats[f'p95_{kind}_seconds'] = values[min(len(values) - 1, int(len(values) * 0.95))] if values else 0.0
+        return stats
@@ -15,6 +15,7 @@ import task
 import messenger
 import bot
 import task_parameters
+import migrations
 
 from datetime import datetime as dt, date
 import time
@@ -32,6 +33,8 @@ MATCHING_CYCLE = task_parameters.MATCHING_CYCLE
 
 MESSENGER_BOT_CYCLE = task_parameters.MESSENGER_BOT_CYCLE 
 
+EXPIRY_CYCLE = task_parameters.EXPIRY_CYCLE
+
 START_HOURS = task_parameters.START_HOURS
 END_HOURS = task_parameters.END_HOURS
 
@@ -63,9 +66,10 @@ def task_call():
 
 
 ### ### Matching Algorithm & Assignments call ### ###
-# Update expired tasks, matches unexpired & unassigned tasks to users, create those Assignments
+# Matches unexpired & unassigned tasks to users, create those Assignments
 def match_call():
     """Takes & returns nothing. Container for match call timer."""
+    messenger.update_all_reliability(incremental=True) # users whose assignments changed since the last cycle
     matching_assignments.match_users_and_tasks(task_parameters.MATCHING_ALGO, DB_NAME)
     print("- tasks matched", dt.now())
 
@@ -81,6 +85,16 @@ def messenger_bot_call():
 
 
 
+### ### Task Expiry call ### ###
+# Marks tasks past their time window as expired (the only writer of tasks.expired)
+def expiry_call():
+    """Takes & returns nothing. Container for expiry sweep timer."""
+    expired = messenger.expire_tasks()
+    if expired:
+        print(f'- {expired} tasks expired', dt.now())
+
+
+
 def start_all_timers():
     task_timer = RepeatTimer(task_call, TASK_CYCLE)
     match_timer = RepeatTimer(match_call,
@@ -91,25 +105,28 @@ def start_all_timers():
                                 seconds=MESSENGER_BOT_CYCLE,
                                 minutes=0,
                                 hours=0)
+    expiry_timer = RepeatTimer(expiry_call, EXPIRY_CYCLE)
     # Start all cycles
     task_timer.start()
     match_timer.start()
     messenger_timer.start()
+    expiry_timer.start()
     print("STARTED ALL TIMERS", dt.now())
-    return task_timer, match_timer, messenger_timer
+    return task_timer, match_timer, messenger_timer, expiry_timer
 
-def cancel_all_timers(task_timer, match_timer, messenger_timer):
+def cancel_all_timers(task_timer, match_timer, messenger_timer, expiry_timer):
     print("CANCEL ALL TIMERS", dt.now())
     task_timer.cancel()
     match_timer.cancel()
     messenger_timer.cancel()
+    expiry_timer.cancel()
 
 def daily_cycle():
     all_users = messenger.get_all_users_list()
     for user_id in all_users:
         if user_id not in admin_list:
             messenger.update_account_status(user_id, "active")
-    task_timer, match_timer, messenger_timer = start_all_timers()
+    task_timer, match_timer, messenger_timer, expiry_timer = start_all_timers()
     # Run time
     end_time = dt.combine(date.today(), END_HOURS)
     duration = (end_time - dt.now()).total_seconds()
@@ -117,18 +134,16 @@ def daily_cycle():
     time.sleep(duration + 2) # run till end_time
     # Check assignments and end daily summary
     bot.check_all_assignments()
-    for user_id in all_users:
-        if user_id not in ['USLACKBOT']:
-            messenger.update_reliability(user_id)
+    messenger.update_all_reliability()
     # End all cycles
-    cancel_all_timers(task_timer, match_timer, messenger_timer)
+    cancel_all_timers(task_timer, match_timer, messenger_timer, expiry_timer)
 
 def short_cycle():
     all_users = messenger.get_all_users_list()
     for user_id in all_users:
         if user_id not in admin_list:
             messenger.update_account_status(user_id, "active")
-    task_timer, match_timer, messenger_timer = start_all_timers()
+    task_timer, match_timer, messenger_timer, expiry_timer = start_all_timers()
     # Run time
     end_time = dt.combine(date.today(), END_HOURS)
     duration = (end_time - dt.now()).total_seconds()
@@ -137,9 +152,11 @@ def short_cycle():
     # Check assignments and end daily summary
     bot.check_all_assignments()
     # End all cycles
-    cancel_all_timers(task_timer, match_timer, messenger_timer)
+    cancel_all_timers(task_timer, match_timer, messenger_timer, expiry_timer)
 
 if __name__ == "__main__":
+    # The timers read tasks.expires_at (migration 6), don't wait for the bot to migrate the database
+    migrations.apply_migrations()
     start_hours_str = START_HOURS.strftime("%H:%M")
 
     schedule.every().monday.at(start_hours_str).do(short_cycle)
@@ -2,6 +2,8 @@
 Author: Amelia Zhang, based on work from Amy Fung & Cynthia Wang & Sofia Kobayashi & Helen Mao
 Date: 03/28/2025
 Description: Updated to store all timestamps as Unix timestamps (integers)
+Later schema changes (indexes, new tables) live in migrations.py and are applied at bot startup
+or with `python migrations.py`.
 */
 
 DROP DATABASE IF EXISTS `snackngo_db`;
@@ -82,4 +84,51 @@ CREATE TABLE IF NOT EXISTS orders (
     UNIQUE KEY (channel_id), 
     FOREIGN KEY (user_id) REFERENCES users(id) ON UPDATE CASCADE ON DELETE SET NULL
 )
-ENGINE = InnoDB;
\ No newline at end of file
+ENGINE = InnoDB;
+
+-- Gemini extraction results keyed by sha256(image bytes + stage + prompt version + mode)
+CREATE TABLE IF NOT EXISTS extraction_cache (
+    cache_key CHAR(64) PRIMARY KEY,
+    result TEXT NOT NULL, -- JSON encoded extraction dict
+    created_at INT NOT NULL, -- Unix timestamp, used for TTL expiry
+    INDEX (created_at)
+)
+ENGINE = InnoDB;
+
+-- Slack files that have already been picked up (message + file_shared events fire for the same upload)
+CREATE TABLE IF NOT EXISTS processed_files (
+    file_id VARCHAR(50) PRIMARY KEY,
+    event_id VARCHAR(50),
+    claimed_at INT NOT NULL, -- Unix timestamp
+    INDEX (claimed_at)
+)
+ENGINE = InnoDB;
+
+-- Per-user order counts, updated with every order insert / status change (see order_stats.py)
+CREATE TABLE IF NOT EXISTS user_order_stats (
+    user_id VARCHAR(50) PRIMARY KEY,
+    total_orders INT NOT NULL DEFAULT 0,
+    completed_orders INT NOT NULL DEFAULT 0,
+    rejected_orders INT NOT NULL DEFAULT 0,
+    pending_orders INT NOT NULL DEFAULT 0, -- any status other than completed/rejected
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+)
+ENGINE = InnoDB;
+
+-- Private channels created ahead of time for new orders (see channel_pool.py)
+CREATE TABLE IF NOT EXISTS channel_pool (
+    channel_id VARCHAR(50) PRIMARY KEY,
+    channel_name VARCHAR(80) NOT NULL,
+    created_at INT NOT NULL, -- Unix timestamp
+    claimed_at INT, -- NULL while the channel is still available
+    claimed_by VARCHAR(50),
+    INDEX (claimed_at, created_at)
+)
+ENGINE = InnoDB;
+
+-- Per-user report cache versions ('*' = every user), bumped on each invalidation (see report_cache.py)
+CREATE TABLE IF NOT EXISTS report_versions (
+    user_id VARCHAR(50) PRIMARY KEY,
+    version INT NOT NULL DEFAULT 0
+)
+ENGINE = InnoDB;
@@ -0,0 +1,154 @@
+"""
+Date: 10/18/2026
+Description: Cache of Gemini screenshot extraction results, keyed by a hash of
+    the image bytes + image stage + prompt version. Recent results live in an
+    in-memory LRU; every result is also stored in the `extraction_cache` table
+    so re-uploads are served without calling the model, even after a restart.
+    start() deletes expired rows in the background so the table doesn't grow forever.
+"""
+import os
+import json
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from dotenv import load_dotenv
+env_path = Path(__file__).parent.parent / '.env'
+load_dotenv(env_path)
+
+import helper_functions
+
+### ### SETTINGS ### ###
+DB_NAME = os.environ.get('DB_NAME')
+EXTRACTION_CACHE_SIZE = int(os.environ.get('EXTRACTION_CACHE_SIZE', 500))          # entries kept in memory
+EXTRACTION_CACHE_TTL = int(os.environ.get('EXTRACTION_CACHE_TTL', 7 * 24 * 3600))  # seconds a result stays valid
+PURGE_INTERVAL = float(os.environ.get('EXTRACTION_CACHE_PURGE_INTERVAL', 24 * 3600))  # seconds between purges
+
+_memory = OrderedDict()     # key -> (result dict, created_at unix time)
+_lock = threading.Lock()
+_stats = {'memory_hits': 0, 'db_hits': 0, 'misses': 0, 'stores': 0, 'empty_skipped': 0, 'evictions': 0, 'errors': 0}
+_purge_thread = None
+
+
+def make_key(image_bytes, *parts):
+    """
+    Takes the raw image bytes and anything else the result depends on
+        (image stage, prompt version, ...).
+    Returns the cache key (sha256 hex str).
+    """
+    digest = hashlib.sha256(image_bytes).hexdigest()
+    return make_key_from_digest(digest, *parts)
+
+def make_key_from_digest(image_digest, *parts):
+    """Same as make_key() for callers that already hashed the image bytes."""
+    return hashlib.sha256("|".join([image_digest] + [str(part) for part in parts]).encode()).hexdigest()
+
+def _remember(key, result, created_at):
+    """Adds an entry to the in-memory LRU. Caller holds the lock."""
+    _memory[key] = (result, created_at)
+    _memory.move_to_end(key)
+    while len(_memory) > EXTRACTION_CACHE_SIZE:
+        _memory.popitem(last=False)
+        _stats['evictions'] += 1
+
+def get(key):
+    """
+    Takes a cache key (str).
+    Returns a copy of the cached extraction dict, or None on a miss.
+    """
+    now = int(time.time())
+    with _lock:
+        entry = _memory.get(key)
+        if entry is not None:
+            result, created_at = entry
+            if now - created_at <= EXTRACTION_CACHE_TTL:
+                _memory.move_to_end(key)
+                _stats['memory_hits'] += 1
+                return dict(result)
+            del _memory[key]
+
+    try:
+        with helper_functions.connectDB(DB_NAME) as conn, conn.cursor() as cursor:
+            cursor.execute(
+                "SELECT result, created_at FROM extraction_cache WHERE cache_key = %s AND created_at >= %s",
+                (key, now - EXTRACTION_CACHE_TTL)
+            )
+            row = cursor.fetchone()
+    except Exception as e:
+        print(f"[EXTRACTION CACHE] Lookup failed: {e}")
+        row = None
+        with _lock:
+            _stats['errors'] += 1
+
+    with _lock:
+        if row is None:
+            _stats['misses'] += 1
+            return None
+        result = json.loads(row[0])
+        _remember(key, result, row[1])
+        _stats['db_hits'] += 1
+        return dict(result)
+
+def put(key, result):
+    """
+    Takes a cache key (str) and an extraction dict.
+    Stores the result in memory and in the extraction_cache table, unless no
+        field was extracted (a failed parse is retried next time, not replayed).
+    """
+    now = int(time.time())
+    if all(value is None for value in result.values()):
+        with _lock:
+            _stats['empty_skipped'] += 1
+        return
+    with _lock:
+        _remember(key, dict(result), now)
+        _stats['stores'] += 1
+    try:
+        with helper_functions.connectDB(DB_NAME) as conn, conn.cursor() as cursor:
+            cursor.execute(
+                """INSERT INTO extraction_cache (cache_key, result, created_at) VALUES (%s, %s, %s)
+                   ON DUPLICATE KEY UPDATE result = VALUES(result), created_at = VALUES(created_at)""",
+                (key, json.dumps(result), now)
+            )
+            conn.commit()
+    except Exception as e:
+        print(f"[EXTRACTION CACHE] Store failed: {e}")
+        with _lock:
+            _stats['errors'] += 1
+
+def purge_expired():
+    """Deletes expired rows from the extraction_cache table. Returns the number deleted."""
+    with helper_functions.connectDB(DB_NAME) as conn, conn.cursor() as cursor:
+        cursor.execute("DELETE FROM extraction_cache WHERE created_at < %s",
+                       (int(time.time()) - EXTRACTION_CACHE_TTL,))
+        conn.commit()
+        return cursor.rowcount
+
+def start():
+    """Starts the thread that purges expired rows now and every PURGE_INTERVAL seconds (only once)."""
+    global _purge_thread
+    with _lock:
+        if _purge_thread:
+            return
+        _purge_thread = threading.Thread(target=_purge_loop, name="extraction-cache-purge", daemon=True)
+    _purge_thread.start()
+
+def _purge_loop():
+    while True:
+        try:
+            purged = purge_expired()
+            if purged:
+                print(f"[EXTRACTION CACHE] Purged {purged} expired results")
+        except Exception as e:
+            print(f"[EXTRACTION CACHE] Could not purge expired results: {e}")
+        time.sleep(PURGE_INTERVAL)
+
+def stats():
+    """Returns a snapshot (dict) of the hit/miss counters and the in-memory size."""
+    with _lock:
+        snapshot = dict(_stats)
+        snapshot['size'] = len(_memory)
+    lookups = snapshot['memory_hits'] + snapshot['db_hits'] + snapshot['misses']
+    snapshot['hit_ratio'] = (snapshot['memory_hits'] + snapshot['db_hits']) / lookups if lookups else 0.0
+    return snapshot
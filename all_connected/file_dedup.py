@@ -0,0 +1,105 @@
+"""
+Date: 10/18/2026
+Description: Makes sure each uploaded Slack file is processed once. Slack sends
+    both a `message` event (with 'files') and a `file_shared` event for the same
+    upload, and retries events it thinks timed out. The first handler to claim
+    a file_id wins; the claim is kept in memory for quick repeats and in the
+    `processed_files` table so it holds across restarts and bot processes.
+    start() runs purge() in the background so that table doesn't grow forever.
+"""
+import os
+import threading
+import time
+from pathlib import Path
+from dotenv import load_dotenv
+env_path = Path(__file__).parent.parent / '.env'
+load_dotenv(env_path)
+
+import helper_functions
+
+### ### SETTINGS ### ###
+DB_NAME = os.environ.get('DB_NAME')
+SEEN_TTL = int(os.environ.get('FILE_DEDUP_TTL', 600))   # seconds a claim is remembered in memory
+RETENTION_DAYS = int(os.environ.get('FILE_DEDUP_RETENTION_DAYS', 30))               # days a claim is kept in the database
+PURGE_INTERVAL = float(os.environ.get('FILE_DEDUP_PURGE_INTERVAL', 24 * 3600))      # seconds between purges
+
+_seen = {}  # file_id -> time claimed/seen
+_lock = threading.Lock()
+_purge_thread = None
+
+
+def _forget_old(now):
+    """Drops in-memory claims older than SEEN_TTL. Caller holds the lock."""
+    for file_id in [f for f, seen_at in _seen.items() if now - seen_at > SEEN_TTL]:
+        del _seen[file_id]
+
+def claim(file_id, event_id=None):
+    """
+    Takes a Slack file id (str) and optionally the event id that delivered it.
+    Returns True if this caller should process the file, False if it was
+        already claimed (by this process or any other).
+    """
+    now = time.time()
+    with _lock:
+        _forget_old(now)
+        if file_id in _seen:
+            return False
+        _seen[file_id] = now
+
+    try:
+        with helper_functions.connectDB(DB_NAME) as conn, conn.cursor() as cursor:
+            cursor.execute(
+                "INSERT IGNORE INTO processed_files (file_id, event_id, claimed_at) VALUES (%s, %s, %s)",
+                (file_id, event_id, int(now))
+            )
+            conn.commit()
+            claimed = cursor.rowcount == 1
+    except Exception as e:
+        # Still deduplicated within this process if the database is unavailable
+        print(f"[FILE DEDUP] Could not record claim for {file_id}: {e}")
+        claimed = True
+
+    if not claimed:
+        print(f"[FILE DEDUP] {file_id} already processed, skipping (event {event_id})")
+    return claimed
+
+def release(file_id):
+    """
+    Takes a Slack file id (str).
+    Removes its claim so the file can be processed again, e.g. after a failed download.
+    """
+    with _lock:
+        _seen.pop(file_id, None)
+    try:
+        with helper_functions.connectDB(DB_NAME) as conn, conn.cursor() as cursor:
+            cursor.execute("DELETE FROM processed_files WHERE file_id = %s", (file_id,))
+            conn.commit()
+    except Exception as e:
+        print(f"[FILE DEDUP] Could not release claim for {file_id}: {e}")
+
+def purge(older_than_days=RETENTION_DAYS):
+    """Deletes claims older than the given number of days. Returns the number deleted."""
+    with helper_functions.connectDB(DB_NAME) as conn, conn.cursor() as cursor:
+        cursor.execute("DELETE FROM processed_files WHERE claimed_at < %s",
+                       (int(time.time()) - older_than_days * 24 * 3600,))
+        conn.commit()
+        return cursor.rowcount
+
+def start():
+    """Starts the thread that purges old claims now and every PURGE_INTERVAL seconds (only once)."""
+    global _purge_thread
+    with _lock:
+        if _purge_thread:
+            return
+        _purge_thread = threading.Thread(target=_purge_loop, name="file-dedup-purge", daemon=True)
+    _purge_thread.start()
+
+def _purge_loop():
+    while True:
+        try:
+            purged = purge()
+            if purged:
+                print(f"[FILE DEDUP] Purged {purged} claims older than {RETENTION_DAYS} days")
+        except Exception as e:
+            print(f"[FILE DEDUP] Could not purge old claims: {e}")
+        time.sleep(PURGE_INTERVAL)
@@ -5,14 +5,19 @@ Description:
 '''
 
 import google.generativeai as genai
-from PIL import Image
+from PIL import Image, ImageChops
+from io import BytesIO
 from dotenv import load_dotenv
 from datetime import datetime
 import re
 import time
+import json
+import asyncio
 from pathlib import Path
 import os
 
+import extraction_cache
+
 env_path = Path(__file__).parent.parent / '.env'
 load_dotenv(env_path)
 
@@ -24,6 +29,29 @@ if not GOOGLE_API_KEY:
 genai.configure(api_key=GOOGLE_API_KEY)
 model = genai.GenerativeModel("gemini-1.5-flash")
 
+# 'single': one structured (JSON schema) request per screenshot
+# 'multi': the original separate restaurant + time requests, parsed from free text
+EXTRACTION_MODE = os.environ.get('GEMINI_EXTRACTION_MODE', 'single')
+EXTRACTION_MODES = ('single', 'multi')
+
+# Per-mode latency counters so both paths can be compared on live traffic
+EXTRACTION_STATS = {mode: {'images': 0, 'model_calls': 0, 'total_seconds': 0.0} for mode in EXTRACTION_MODES}
+
+# Screenshots are shrunk & re-encoded before upload. max_dim caps the longest
+# side in pixels, quality is the JPEG quality; 'original' uploads the file as is.
+PREPROCESS_PRESETS = {
+    'original': None,
+    'large': {'max_dim': 2048, 'quality': 90},
+    'medium': {'max_dim': 1536, 'quality': 85},
+    'small': {'max_dim': 1024, 'quality': 80},
+}
+PREPROCESS_PRESET = os.environ.get('GEMINI_PREPROCESS_PRESET', 'medium')
+BORDER_TRIM_TOLERANCE = 12  # max per-channel difference from the corner colour still treated as empty margin
+
+# Part of the extraction cache key. Bump whenever a prompt or the parsing
+# changes so results from the old prompts are not served anymore.
+PROMPT_VERSION = 1
+
 # extract timestamp from an image using the Gemini API
 def test_image_extraction(image_path):
 
@@ -57,13 +85,84 @@ def test_image_extraction(image_path):
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ SNACK'N'GO FUNCTION ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
-def gemini_process_image(image_path, image_stage):
+def trim_uniform_borders(img, tolerance=BORDER_TRIM_TOLERANCE):
+    """
+    Crops away solid-colour margins (letterboxing, blank space under a short
+    receipt) around the screenshot content. The status bar is kept since it
+    holds the screenshot time.
+    """
+    background = Image.new(img.mode, img.size, img.getpixel((0, 0)))
+    diff = ImageChops.difference(img, background).convert('L').point(lambda px: 255 if px > tolerance else 0)
+    bbox = diff.getbbox()
+    if not bbox:
+        return img
+    # keep everything above the content so the status bar is never cut off
+    left, upper, right, lower = bbox
+    return img.crop((left, 0, right, lower))
+
+def preprocess_image(img, preset=None):
+    """
+    Shrinks a screenshot before it's sent to Gemini.
+    Takes a PIL image and a preset name from PREPROCESS_PRESETS (defaults to PREPROCESS_PRESET).
+    Returns (inline image part for generate_content, size of the uploaded bytes).
+    The part carries the encoded bytes themselves: given a PIL image that isn't
+        backed by a file, the SDK would re-encode it as lossless WebP (larger
+        than the JPEG) before sending it.
+    """
+    preset = preset or PREPROCESS_PRESET
+    settings = PREPROCESS_PRESETS[preset]
+    if settings is None:
+        # 'original': the file's own bytes, unchanged
+        if getattr(img, 'filename', None):
+            with open(img.filename, 'rb') as infile:
+                data = infile.read()
+            return {'mime_type': Image.MIME.get(img.format, 'image/png'), 'data': data}, len(data)
+        buffer = BytesIO()
+        img.save(buffer, format='PNG')
+        return {'mime_type': 'image/png', 'data': buffer.getvalue()}, buffer.tell()
+
+    img = img.convert('RGB')
+    img = trim_uniform_borders(img)
+    if max(img.size) > settings['max_dim']:
+        img.thumbnail((settings['max_dim'], settings['max_dim']), Image.LANCZOS)
+
+    buffer = BytesIO()
+    img.save(buffer, format='JPEG', quality=settings['quality'], optimize=True)
+    return {'mime_type': 'image/jpeg', 'data': buffer.getvalue()}, buffer.tell()
+
+def empty_extraction_result():
+    """Returns the extraction dict with every database field set to None"""
+    return {
+        "restaurant_name": None,
+        "restaurant_address": None,
+        "order_placement_time": None,
+        "earliest_estimated_arrival_time": None,
+        "latest_estimated_arrival_time": None,
+        "order_completion_time": None
+    }
+
+def get_extraction_stats():
+    """Returns per-mode image counts, model calls and average latency (seconds)"""
+    stats = {}
+    for mode, counters in EXTRACTION_STATS.items():
+        stats[mode] = dict(counters)
+        stats[mode]['avg_seconds'] = counters['total_seconds'] / counters['images'] if counters['images'] else 0.0
+    return stats
+
+def gemini_process_image(image_path, image_stage, mode=None, use_cache=True, preset=None, image_digest=None):
     """
     Processes food delivery screenshot based on stage and returns data in consistent format.
     
     Args:
         image_path: Path to the image file
         image_stage: Either 'awaiting_placement_time' or 'awaiting_arrival_time'
+        mode: 'single' (one structured request) or 'multi' (separate requests).
+              Defaults to EXTRACTION_MODE.
+        use_cache: Serve/store the result in extraction_cache, keyed by the
+              image bytes, stage, prompt version, mode and preset.
+        preset: Preprocessing preset (see PREPROCESS_PRESETS). Defaults to PREPROCESS_PRESET.
+        image_digest: sha256 hex digest of the file, if the caller already
+              computed it while downloading (saves re-reading the file).
         
     Returns:
         Dictionary with extracted data matching database schema:
@@ -76,43 +175,206 @@ def gemini_process_image(image_path, image_stage):
             "order_completion_time": unix timestamp or None
         }
     """
+    mode = mode or EXTRACTION_MODE
+    if mode not in EXTRACTION_MODES:
+        raise ValueError(f"Unknown extraction mode '{mode}', expected one of {EXTRACTION_MODES}")
+    preset = preset or PREPROCESS_PRESET
+    if preset not in PREPROCESS_PRESETS:
+        raise ValueError(f"Unknown preprocessing preset '{preset}', expected one of {list(PREPROCESS_PRESETS)}")
+
+    # Same screenshot already processed -> skip the model entirely
+    cache_key, cached = _cache_lookup(image_path, image_stage, mode, preset, image_digest) if use_cache else (None, None)
+    if cached is not None:
+        return cached
+
+    start = time.perf_counter()
+    model_calls = 0
     try:
-        img = Image.open(image_path)
+        img, payload_size = preprocess_image(Image.open(image_path), preset)
+        print(f"[GEMINI] Uploading {preset} preset: {payload_size / 1024:.0f}KB (was {os.path.getsize(image_path) / 1024:.0f}KB)")
         
         # Initialize result structure matching database schema
-        result = {
-            "restaurant_name": None,
-            "restaurant_address": None,
-            "order_placement_time": None,
-            "earliest_estimated_arrival_time": None,
-            "latest_estimated_arrival_time": None,
-            "order_completion_time": None
-        }
-        
-        # Get restaurant info
-        restaurant_info = extract_restaurant_info(img)
-        result.update(restaurant_info)
-        
-        # Process based on stage
-        if image_stage == "awaiting_placement_time":
-            time_data = extract_initial_times(img)
-            result.update(time_data)
-        elif image_stage == "awaiting_arrival_time":
-            completion_time = extract_completion_time(img)
-            result["order_completion_time"] = completion_time
-        
+        result = empty_extraction_result()
+
+        if mode == 'single':
+            # One request for every field of this stage
+            model_calls += 1
+            result.update(extract_all_fields(img, image_stage))
+        else:
+            # Get restaurant info
+            model_calls += 1
+            restaurant_info = extract_restaurant_info(img)
+            result.update(restaurant_info)
+            
+            # Process based on stage
+            if image_stage == "awaiting_placement_time":
+                model_calls += 1
+                time_data = extract_initial_times(img)
+                result.update(time_data)
+            elif image_stage == "awaiting_arrival_time":
+                model_calls += 1
+                completion_time = extract_completion_time(img)
+                result["order_completion_time"] = completion_time
+
+        # Only successful extractions are cached, errors are retried next time
+        if cache_key:
+            extraction_cache.put(cache_key, result)
         return result
         
     except Exception as e:
         print(f"Error processing {image_stage} image: {e}")
-        return {
-            "restaurant_name": None,
-            "restaurant_address": None,
-            "order_placement_time": None,
-            "earliest_estimated_arrival_time": None,
-            "latest_estimated_arrival_time": None,
-            "order_completion_time": None
-        }
+        return empty_extraction_result()
+
+    finally:
+        _record_extraction(mode, image_stage, model_calls, time.perf_counter() - start)
+
+async def gemini_process_image_async(image_path, image_stage, mode=None, use_cache=True, preset=None, image_digest=None):
+    """
+    Same as gemini_process_image(), for the async bot (async_bot.py).
+    In 'single' mode the model request is awaited with generate_content_async;
+        cache lookups and image preprocessing run in a worker thread.
+    'multi' mode has no async path and runs gemini_process_image() in a thread.
+    """
+    mode = mode or EXTRACTION_MODE
+    if mode != 'single':
+        return await asyncio.to_thread(gemini_process_image, image_path, image_stage, mode=mode,
+                                       use_cache=use_cache, preset=preset, image_digest=image_digest)
+    preset = preset or PREPROCESS_PRESET
+    if preset not in PREPROCESS_PRESETS:
+        raise ValueError(f"Unknown preprocessing preset '{preset}', expected one of {list(PREPROCESS_PRESETS)}")
+
+    cache_key, cached = (await asyncio.to_thread(_cache_lookup, image_path, image_stage, mode, preset, image_digest)
+                         if use_cache else (None, None))
+    if cached is not None:
+        return cached
+
+    start = time.perf_counter()
+    model_calls = 0
+    try:
+        img, _ = await asyncio.to_thread(lambda: preprocess_image(Image.open(image_path), preset))
+        fields, prompt, generation_config = _all_fields_request(image_stage)
+        model_calls += 1
+        response = await model.generate_content_async([img, prompt], generation_config=generation_config)
+        print("Raw Gemini response:", response.text)
+
+        result = empty_extraction_result()
+        result.update(_parse_all_fields(response.text, fields))
+        if cache_key:
+            await asyncio.to_thread(extraction_cache.put, cache_key, result)
+        return result
+
+    except Exception as e:
+        print(f"Error processing {image_stage} image: {e}")
+        return empty_extraction_result()
+
+    finally:
+        _record_extraction(mode, image_stage, model_calls, time.perf_counter() - start)
+
+def _cache_lookup(image_path, image_stage, mode, preset, image_digest=None):
+    """Returns (cache key, cached result or None). The key is None if the file can't be read."""
+    try:
+        if image_digest:
+            cache_key = extraction_cache.make_key_from_digest(image_digest, image_stage, PROMPT_VERSION, mode, preset)
+        else:
+            with open(image_path, 'rb') as f:
+                cache_key = extraction_cache.make_key(f.read(), image_stage, PROMPT_VERSION, mode, preset)
+    except OSError as e:
+        print(f"Error reading {image_path} for the extraction cache: {e}")
+        return None, None
+    cached = extraction_cache.get(cache_key)
+    if cached is not None:
+        print(f"[GEMINI] Cache hit for {image_stage} image {image_path}")
+    return cache_key, cached
+
+def _record_extraction(mode, image_stage, model_calls, elapsed):
+    EXTRACTION_STATS[mode]['images'] += 1
+    EXTRACTION_STATS[mode]['model_calls'] += model_calls
+    EXTRACTION_STATS[mode]['total_seconds'] += elapsed
+    print(f"[GEMINI] {mode} extraction of {image_stage} image took {elapsed:.2f}s ({model_calls} model calls)")
+
+def compare_extraction_modes(image_path, image_stage):
+    """
+    Runs both extraction modes on the same image so their accuracy and latency
+    can be compared side by side.
+    Returns {'single': {'result', 'seconds'}, 'multi': {...}, 'differences': [fields]}
+    """
+    comparison = {}
+    for mode in EXTRACTION_MODES:
+        start = time.perf_counter()
+        result = gemini_process_image(image_path, image_stage, mode=mode, use_cache=False)
+        comparison[mode] = {'result': result, 'seconds': time.perf_counter() - start}
+
+    comparison['differences'] = [field for field in empty_extraction_result()
+                                 if comparison['single']['result'][field] != comparison['multi']['result'][field]]
+    return comparison
+
+# JSON schema for the single-request mode. Times come back as strings exactly
+# as they appear on screen and go through the same convert_to_unix() as the
+# multi-request path.
+def _extraction_schema(fields):
+    return {
+        "type": "object",
+        "properties": {field: {"type": "string", "nullable": True} for field in fields},
+        "required": list(fields)
+    }
+
+STAGE_FIELDS = {
+    "awaiting_placement_time": ("restaurant_name", "restaurant_address", "order_placement_time",
+                                "earliest_estimated_arrival_time", "latest_estimated_arrival_time"),
+    "awaiting_arrival_time": ("restaurant_name", "restaurant_address", "order_completion_time"),
+}
+
+STAGE_PROMPTS = {
+    "awaiting_placement_time": (
+        "This is a food delivery app screenshot taken right after an order was placed. Extract:\n"
+        "- restaurant_name: the restaurant name, if shown\n"
+        "- restaurant_address: the restaurant address, if shown\n"
+        "- order_placement_time: when the order was placed (the phone's current time, usually top left, if nothing else is shown)\n"
+        "- earliest_estimated_arrival_time and latest_estimated_arrival_time: the estimated delivery window "
+        "(use the same time for both if only one estimate is shown)\n"
+        "Adjust AM/PM logically. Follow these principles:\n"
+        "1. **Relative Consistency:** If two times appear in the same context (e.g., order time and delivery time), ensure their relationship makes sense (e.g., delivery cannot be before ordering).\n"
+        "2. **24-Hour Clues:** If any time is in 24-hour format (e.g., '20:45'), assume other times nearby should align (e.g., '8:17' becomes '20:17').\n"
+        "3. **AM/PM Priority:** If AM/PM labels exist (e.g., '8:17 PM'), trust them. If missing, infer based on activity (e.g., '9:00' with 'Evening Delivery' text → PM).\n"
+        "Write every time as 'H:MM AM' or 'H:MM PM'. Use null for anything not shown."
+    ),
+    "awaiting_arrival_time": (
+        "This is a food delivery app screenshot taken after an order was delivered. Extract:\n"
+        "- restaurant_name: the restaurant name, if shown\n"
+        "- restaurant_address: the restaurant address, if shown\n"
+        "- order_completion_time: when the order was delivered/completed\n"
+        "Write the time as 'H:MM AM' or 'H:MM PM'. Use null for anything not shown."
+    ),
+}
+
+def _all_fields_request(image_stage):
+    """Returns (fields, prompt, generation config) for the single-request mode"""
+    fields = STAGE_FIELDS[image_stage]
+    generation_config = genai.GenerationConfig(
+        response_mime_type="application/json",
+        response_schema=_extraction_schema(fields)
+    )
+    return fields, STAGE_PROMPTS[image_stage], generation_config
+
+def _parse_all_fields(text, fields):
+    """Parses the JSON answer of the single-request mode, times converted to unix"""
+    data = json.loads(text)
+    extracted = {}
+    for field in fields:
+        value = data.get(field)
+        if isinstance(value, str):
+            value = value.strip() or None
+        if value is not None and field.endswith('_time'):
+            value = convert_to_unix(value)
+        extracted[field] = value
+    return extracted
+
+def extract_all_fields(img, image_stage):
+    """Extract every field for the given stage with a single structured request"""
+    fields, prompt, generation_config = _all_fields_request(image_stage)
+    response = model.generate_content([img, prompt], generation_config=generation_config)
+    print("Raw Gemini response:", response.text)
+    return _parse_all_fields(response.text, fields)
 
 def extract_restaurant_info(img):
     """Extract restaurant name and address from image"""
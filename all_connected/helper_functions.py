@@ -12,20 +12,33 @@ load_dotenv(env_path)
 import pymysql
 from flask import Flask
 
+import threading
+import time as _time
+from collections import deque
 
 from datetime import datetime, time
 
 
+### ### CONNECTION POOL SETTINGS ### ###
+DB_POOL_MIN_SIZE = int(os.environ.get('DB_POOL_MIN_SIZE', 1))       # connections kept open even when idle
+DB_POOL_MAX_SIZE = int(os.environ.get('DB_POOL_MAX_SIZE', 10))      # hard cap on open connections per database
+DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 10))      # seconds to wait for a free connection
+DB_POOL_MAX_IDLE = float(os.environ.get('DB_POOL_MAX_IDLE', 300))   # seconds before an idle connection is evicted
+DB_POOL_PING_AFTER = float(os.environ.get('DB_POOL_PING_AFTER', 30))  # idle seconds before a health check on checkout
+DB_POOL_LEAK_AFTER = float(os.environ.get('DB_POOL_LEAK_AFTER', 120))  # checkout seconds before a connection counts as leaked
 
-def connectDB(DB_NAME):
+
+class PoolExhaustedError(Exception):
+    """Raised when no pooled connection frees up within DB_POOL_TIMEOUT."""
+
+
+def _open_connection(DB_NAME):
     """
-     * General Helper Function * 
+     * Helper function for ConnectionPool *
     Takes a database name (str).
-    Returns a connection object to that database. This connection should eventually
-        be closed with .close()
+    Returns a brand-new pymysql connection to that database.
     """
-    # Connect to the database
-    db = pymysql.connect(
+    return pymysql.connect(
         host='localhost',
         user='root', 
         # password=os.environ['SQL_PASS'], 
@@ -33,7 +46,254 @@ def connectDB(DB_NAME):
         db=DB_NAME
     )
 
-    return db
+
+class PooledConnection:
+    """
+    Thin wrapper around a pymysql connection checked out of a ConnectionPool.
+    Behaves like the raw connection (cursor(), commit(), ...), but close() and
+    leaving a `with` block hand the connection back to the pool instead of
+    closing the socket. A wrapper that is garbage collected without being
+    closed is reported as a leak and its connection is reclaimed.
+    """
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
+        self._checkout_time = _time.monotonic()
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        if self._conn is None:
+            raise pymysql.err.InterfaceError("Connection already returned to the pool")
+        return getattr(self._conn, name)
+
+    def close(self):
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            self._pool.release(conn, self._checkout_time)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __del__(self):
+        if getattr(self, '_conn', None) is not None:
+            self._pool.record_leak()
+            self.close()
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of pymysql connections to one database.
+    Keeps between min_size and max_size connections open, health checks
+    connections that sat idle for a while, evicts connections idle longer than
+    max_idle and keeps counters for pool_stats().
+    """
+    def __init__(self, db_name, min_size=DB_POOL_MIN_SIZE, max_size=DB_POOL_MAX_SIZE,
+                 timeout=DB_POOL_TIMEOUT, max_idle=DB_POOL_MAX_IDLE,
+                 ping_after=DB_POOL_PING_AFTER, leak_after=DB_POOL_LEAK_AFTER):
+        self.db_name = db_name
+        self.min_size = min_size
+        self.max_size = max(max_size, 1)
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.ping_after = ping_after
+        self.leak_after = leak_after
+
+        self._idle = deque()            # (connection, time it was returned)
+        self._checked_out = {}          # id(connection) -> checkout time
+        self._size = 0                  # idle + checked out
+        self._cond = threading.Condition()
+        self._stats = {
+            'checkouts': 0,
+            'created': 0,
+            'closed': 0,
+            'evicted': 0,
+            'failed_health_checks': 0,
+            'leaks_detected': 0,
+            'timeouts': 0,
+            'total_wait_time': 0.0,
+            'max_wait_time': 0.0,
+        }
+
+    def _discard(self, conn):
+        """Closes a connection that is leaving the pool. Caller holds the lock."""
+        self._size -= 1
+        self._stats['closed'] += 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _evict_idle(self):
+        """Closes connections idle longer than max_idle, keeping min_size open. Caller holds the lock."""
+        now = _time.monotonic()
+        while self._idle and self._size > self.min_size and now - self._idle[0][1] > self.max_idle:
+            conn, _ = self._idle.popleft()
+            self._stats['evicted'] += 1
+            self._discard(conn)
+
+    def _healthy(self, conn, idle_since):
+        """Pings connections that have been idle for a while. Returns False if the server is gone."""
+        if _time.monotonic() - idle_since < self.ping_after:
+            return True
+        try:
+            conn.ping(reconnect=False)
+            return True
+        except Exception:
+            return False
+
+    def acquire(self):
+        """
+        Returns a PooledConnection, reusing an idle connection when possible.
+        Blocks up to `timeout` seconds when max_size connections are in use and
+        raises PoolExhaustedError if none frees up.
+        """
+        start = _time.monotonic()
+        deadline = start + self.timeout
+        while True:
+            conn = None
+            idle_since = None
+            create = False
+            with self._cond:
+                self._evict_idle()
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - _time.monotonic()
+                    if remaining <= 0:
+                        self._stats['timeouts'] += 1
+                        raise PoolExhaustedError(
+                            f"No free connection to {self.db_name} after {self.timeout}s "
+                            f"({self._size} open, max {self.max_size})")
+                    self._cond.wait(remaining)
+                if self._idle:
+                    conn, idle_since = self._idle.pop()  # most recently used first
+                else:
+                    self._size += 1
+                    create = True
+
+            if create:
+                try:
+                    conn = _open_connection(self.db_name)
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+                with self._cond:
+                    self._stats['created'] += 1
+            elif not self._healthy(conn, idle_since):
+                with self._cond:
+                    self._stats['failed_health_checks'] += 1
+                    self._discard(conn)
+                    self._cond.notify()
+                continue
+
+            waited = _time.monotonic() - start
+            with self._cond:
+                self._checked_out[id(conn)] = _time.monotonic()
+                self._stats['checkouts'] += 1
+                self._stats['total_wait_time'] += waited
+                self._stats['max_wait_time'] = max(self._stats['max_wait_time'], waited)
+            return PooledConnection(self, conn)
+
+    def release(self, conn, checkout_time=None):
+        """Takes back a connection, rolling back anything left uncommitted."""
+        try:
+            conn.rollback()
+            healthy = conn.open
+        except Exception:
+            healthy = False
+        with self._cond:
+            self._checked_out.pop(id(conn), None)
+            if healthy:
+                self._idle.append((conn, _time.monotonic()))
+            else:
+                self._discard(conn)
+            self._cond.notify()
+
+    def record_leak(self):
+        with self._cond:
+            self._stats['leaks_detected'] += 1
+
+    def close_all(self):
+        """Closes every idle connection. Checked-out connections close when returned."""
+        with self._cond:
+            while self._idle:
+                conn, _ = self._idle.popleft()
+                self._discard(conn)
+
+    def stats(self):
+        """Returns a snapshot (dict) of the pool counters."""
+        with self._cond:
+            now = _time.monotonic()
+            stats = dict(self._stats)
+            stats['open'] = self._size
+            stats['idle'] = len(self._idle)
+            stats['in_use'] = len(self._checked_out)
+            stats['long_checkouts'] = sum(1 for t in self._checked_out.values() if now - t > self.leak_after)
+            stats['avg_wait_time'] = (stats['total_wait_time'] / stats['checkouts']) if stats['checkouts'] else 0.0
+            return stats
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def get_pool(DB_NAME):
+    """
+     * General Helper Function * 
+    Takes a database name (str).
+    Returns the shared ConnectionPool for that database, creating it on first use.
+    """
+    with _pools_lock:
+        pool = _pools.get(DB_NAME)
+        if pool is None:
+            pool = _pools[DB_NAME] = ConnectionPool(DB_NAME)
+        return pool
+
+def pool_stats(DB_NAME=None):
+    """
+    Takes an optional database name (str).
+    Returns the stats dict of that pool, or {db_name: stats} for every pool.
+    """
+    with _pools_lock:
+        pools = dict(_pools)
+    if DB_NAME is not None:
+        return pools[DB_NAME].stats() if DB_NAME in pools else {}
+    return {name: pool.stats() for name, pool in pools.items()}
+
+
+def connectDB(DB_NAME):
+    """
+     * General Helper Function * 
+    Takes a database name (str).
+    Returns a pooled connection to that database. Use it as a context manager
+        (`with connectDB(DB_NAME) as conn:`) or call .close() when done, which
+        returns the connection to the pool rather than closing it.
+    """
+    return get_pool(DB_NAME).acquire()
+
+def insert_rows(db, query, rows, chunk_size):
+    """
+     * General Helper Function * 
+    Takes a pooled connection, a single-row parameterized INSERT (`VALUES (%s, ...)`),
+        a list of parameter tuples and the number of rows per statement.
+    Inserts every row with executemany (pymysql sends each chunk as one
+        multi-row INSERT) and commits once; rolls back if any chunk fails.
+    Returns the number of rows inserted.
+    """
+    inserted = 0
+    chunk_size = max(chunk_size, 1)
+    cursor = db.cursor()
+    try:
+        for i in range(0, len(rows), chunk_size):
+            inserted += cursor.executemany(query, rows[i:i + chunk_size]) or 0
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return inserted
 
 
 # code to open text file and read into a matrix
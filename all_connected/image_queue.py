@@ -0,0 +1,119 @@
+"""
+Date: 10/18/2026
+Description: Bounded background job queue used by the Slack bot to process
+    uploaded screenshots (download + Gemini extraction) outside of the event
+    handler, so handlers can return to Slack right away.
+"""
+import os
+import queue
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from dotenv import load_dotenv
+env_path = Path(__file__).parent.parent / '.env'
+load_dotenv(env_path)
+
+### ### SETTINGS ### ###
+IMAGE_WORKERS = int(os.environ.get('IMAGE_WORKERS', 4))         # screenshots processed at the same time
+IMAGE_QUEUE_SIZE = int(os.environ.get('IMAGE_QUEUE_SIZE', 20))  # jobs allowed to wait before new uploads are turned away
+RECENT_JOBS_KEPT = 100                                          # per-job timings kept for stats()
+
+
+class ImageJobQueue:
+    """
+    Fixed pool of worker threads pulling jobs from a bounded queue.
+    submit() never blocks: when the queue is full it returns False so the
+    caller can tell the user to try again (backpressure) instead of piling up
+    work. Each job's queue wait and run time is recorded.
+    """
+    def __init__(self, workers=IMAGE_WORKERS, max_queue=IMAGE_QUEUE_SIZE):
+        self.workers = max(workers, 1)
+        self._jobs = queue.Queue(maxsize=max_queue)
+        self._threads = []
+        self._lock = threading.Lock()
+        self._running = 0
+        self._recent = deque(maxlen=RECENT_JOBS_KEPT)
+        self._stats = {
+            'submitted': 0,
+            'rejected': 0,
+            'completed': 0,
+            'failed': 0,
+            'total_wait_time': 0.0,
+            'total_run_time': 0.0,
+            'max_wait_time': 0.0,
+            'max_run_time': 0.0,
+        }
+
+    def start(self):
+        """Starts the worker threads (only once)."""
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f"image-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, func, *args, job_name=None, **kwargs):
+        """
+        Takes a function and its arguments.
+        Queues the call for a worker thread.
+        Returns True if queued, False if the queue is full.
+        """
+        self.start()
+        job = (func, args, kwargs, job_name or func.__name__, time.monotonic())
+        try:
+            self._jobs.put_nowait(job)
+        except queue.Full:
+            with self._lock:
+                self._stats['rejected'] += 1
+            return False
+        with self._lock:
+            self._stats['submitted'] += 1
+        return True
+
+    def _work(self):
+        while True:
+            func, args, kwargs, job_name, queued_at = self._jobs.get()
+            started = time.monotonic()
+            with self._lock:
+                self._running += 1
+            ok = True
+            try:
+                func(*args, **kwargs)
+            except Exception as e:
+                ok = False
+                print(f"[IMAGE QUEUE] Job {job_name} failed: {e}")
+            finally:
+                finished = time.monotonic()
+                self._record(job_name, started - queued_at, finished - started, ok)
+                self._jobs.task_done()
+
+    def _record(self, job_name, wait, run, ok):
+        with self._lock:
+            self._running -= 1
+            self._stats['completed' if ok else 'failed'] += 1
+            self._stats['total_wait_time'] += wait
+            self._stats['total_run_time'] += run
+            self._stats['max_wait_time'] = max(self._stats['max_wait_time'], wait)
+            self._stats['max_run_time'] = max(self._stats['max_run_time'], run)
+            self._recent.append({'job': job_name, 'wait': wait, 'run': run, 'ok': ok})
+        print(f"[IMAGE QUEUE] {job_name} waited {wait:.2f}s, ran {run:.2f}s")
+
+    def join(self):
+        """Blocks until every queued job has finished."""
+        self._jobs.join()
+
+    def stats(self):
+        """Returns a snapshot (dict) of queue depth, job counts and timings."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['queued'] = self._jobs.qsize()
+            stats['running'] = self._running
+            stats['workers'] = self.workers
+            done = stats['completed'] + stats['failed']
+            stats['avg_wait_time'] = stats['total_wait_time'] / done if done else 0.0
+            stats['avg_run_time'] = stats['total_run_time'] / done if done else 0.0
+            stats['recent_jobs'] = list(self._recent)
+            return stats
@@ -3,9 +3,13 @@ Name: Helen Mao
 Date: 06/26/2023
 Description: Maintenance file for Snap N Go. Can be used to apply immediate
         fix while the bot and connections file are running.
+
+        python maintenance.py                          # sync users, export the tables to CSV
+        python maintenance.py reconcile-order-stats    # rebuild user_order_stats from orders
 """
 import helper_functions
 import matching_assignments
+import order_stats
 import task
 import messenger
 import bot
@@ -15,6 +19,7 @@ import time
 
 
 import os
+import sys
 from pathlib import Path
 from dotenv import load_dotenv
 env_path = Path(__file__).parent.parent / '.env'
@@ -42,8 +47,8 @@ START_HOURS = task_parameters.START_HOURS
 END_HOURS = task_parameters.END_HOURS
 
 def add_new_users():
-    user_store = bot.get_all_users_info()
-    messenger.add_users(user_store)
+    """Full users.list sync into the users table. Returns the synced {user_id: user}."""
+    return bot.user_directory.full_sync()
 
 def delete_invalid_submissions(user_id, task_id, assignment_id):
     message = []
@@ -51,51 +56,67 @@ def delete_invalid_submissions(user_id, task_id, assignment_id):
     return
 
 def broadcast(block = None, text = None):
-    active_users = messenger.get_active_users_list()
-    for user_id in active_users:
-        bot.send_messages(user_id, block = None, text = None)
+    """DMs the block/text to every active user. Returns the per-user delivery report."""
+    report = bot.dispatcher.fan_out(messenger.get_active_users_list(), blocks=block, text=text)
+    print(f"[BROADCAST] Sent {report['sent']}, failed {report['failed']} in {report['seconds']:.1f}s")
+    return report
 
 def test_update_reliability(user_id):
-    conn = helper_functions.connectDB(DB_NAME)
-    cur = conn.cursor()
-    date = datetime.today().strftime('%Y/%m/%d')
-    print(date)
-    query = f'''SELECT task_id
-                FROM assignments
-                WHERE (user_id = '{user_id}') and DATE(recommend_time) >= CURDATE() -1
-            '''
-    cur.execute(query)
-    accepted = cur.fetchall()
-    print(accepted)
+    with helper_functions.connectDB(DB_NAME) as conn:
+        cur = conn.cursor()
+        date = datetime.today().strftime('%Y/%m/%d')
+        print(date)
+        query = f'''SELECT task_id
+                    FROM assignments
+                    WHERE (user_id = '{user_id}') and DATE(recommend_time) >= CURDATE() -1
+                '''
+        cur.execute(query)
+        accepted = cur.fetchall()
+        print(accepted)
+
+def print_pool_stats():
+    """Prints the connection pool counters (checkouts, wait time, leaks...) for every database."""
+    for db_name, stats in helper_functions.pool_stats().items():
+        print(f"[DB POOL] {db_name}: {stats}")
+
+def reconcile_order_stats():
+    """Rebuilds user_order_stats from the orders table and prints any users whose counts had drifted."""
+    report = order_stats.rebuild(DB_NAME)
+    print(f"[ORDER STATS] Rebuilt stats for {report['users']} users, {len(report['drift'])} drifted")
+    for row in report['drift']:
+        print(f"  {row['user_id']}: stored {row['stored']} expected {row['expected']}")
+    return report
 
 def export_table_to_csv(table_name, csv_file):
-    # Connect to MySQL database
-    conn = helper_functions.connectDB(DB_NAME)
-
-    try:
+    # Connect to MySQL database (returned to the pool at the end of the block)
+    with helper_functions.connectDB(DB_NAME) as conn:
         # Execute SQL query to fetch data from table
         with conn.cursor() as cursor:
             sql = f'SELECT * FROM {table_name}'
             cursor.execute(sql)
             result = cursor.fetchall()
 
-        # Convert result to DataFrame
-        df = pd.DataFrame(result)
-
-        # Save DataFrame to CSV file with column names
-        df.to_csv(csv_file, index=False)
+    # Convert result to DataFrame
+    df = pd.DataFrame(result)
 
-        print(f"Table '{table_name}' exported to '{csv_file}' successfully.")
+    # Save DataFrame to CSV file with column names
+    df.to_csv(csv_file, index=False)
 
-    finally:
-        # Close database connection
-        conn.close()
+    print(f"Table '{table_name}' exported to '{csv_file}' successfully.")
 
 
 
 if __name__ == "__main__":
-    add_new_users()
-    # bot.send_messages('U05B24S3LR1', block = None, text = 'Hello world')
-    export_table_to_csv('users', '../users.csv')
-    export_table_to_csv('orders', '../orders.csv')
+    command = sys.argv[1] if len(sys.argv) > 1 else 'export'
+    if command == 'export':
+        add_new_users()
+        # bot.send_messages('U05B24S3LR1', block = None, text = 'Hello world')
+        export_table_to_csv('users', '../users.csv')
+        export_table_to_csv('orders', '../orders.csv')
+        export_table_to_csv('user_order_stats', '../user_order_stats.csv')
+    elif command == 'reconcile-order-stats':
+        # Rewrites the live stats table, so only ever run on request
+        reconcile_order_stats()
+    else:
+        sys.exit(f"Unknown command '{command}', expected export or reconcile-order-stats")
     print("DONE")
\ No newline at end of file
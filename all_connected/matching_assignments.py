@@ -5,6 +5,7 @@ Description: All functions & algorithms for the Matching Component & Assignment
 """
 
 import random
+import numpy as np
 import pymysql
 import helper_functions
 from datetime import datetime
@@ -63,24 +64,21 @@ def create_task_user_dict(assignment_data):
     return task_users_dict
 
 
-def insert_assignments(assignment_info, db):
+def insert_assignments(assignment_info, db, chunk_size=None):
     """
      * Helper function for match_users_and_tasks() *
-    Takes a list of assignments and database (obj).
-    Inserts the assignments into the database given. 
-    Returns nothing.
+    Takes a list of assignments and database (obj), optionally the rows per INSERT
+        (default task_parameters.INSERT_CHUNK_SIZE).
+    Inserts the assignments into the database given in one transaction. 
+    Returns the number of rows inserted.
     """
-    # Connect to database & create cursor obj
-    cursor = db.cursor()
-
-    for assignment in assignment_info:
-        # Create & execute query
-        query = f"INSERT INTO assignments(`task_id`, `user_id`, `status`) VALUES \
-            ({assignment['task_id']}, '{assignment['user_id']}', 'not assigned');"
-        cursor.execute(query)
-
-        # Commit the changes to the database
-        db.commit()
+    if chunk_size is None:
+        # task_parameters imports this module, so import it here
+        from task_parameters import INSERT_CHUNK_SIZE
+        chunk_size = INSERT_CHUNK_SIZE
+    query = "INSERT INTO assignments (`task_id`, `user_id`, `status`) VALUES (%s, %s, %s)"
+    rows = [(assignment['task_id'], assignment['user_id'], 'not assigned') for assignment in assignment_info]
+    return helper_functions.insert_rows(db, query, rows, chunk_size)
 
 def create_ab_groups(user_list):
     middle_index = int(len(user_list)/2)
@@ -104,6 +102,9 @@ def algorithm_random(assignment_data, task_data, user_data):
     for task_id in task_data:
         # Subtract all previously-assigned users from overall user pool
         available_user_ids = set(user_data['id']) - task_users_dict.get(task_id, set())
+        if not available_user_ids:
+            print(f"No eligible user for task {task_id}, leaving it unassigned")
+            continue
 
         # Assign & note matching
         user_id = random.choice(list(available_user_ids))
@@ -141,21 +142,284 @@ def algorithm_weighted(assignment_data, task_data, user_data):
     for task_id in task_data:
         if count <= half_task:
             # Subtract all previously-assigned users from overall user pool
-            available_user_ids = set(b_group) - task_users_dict.get(task_id, set())
+            available_user_ids = list(set(b_group) - task_users_dict.get(task_id, set()))
             reliability_list = [int(reliability_dict[user]*100) for user in available_user_ids]
 
-            # Assign & note matching
-            user_id = random.choices(list(available_user_ids), reliability_list)[0]
+            # Assign & note matching (uniformly if every candidate has a 0 weight)
+            if not available_user_ids:
+                user_id = None
+            elif sum(reliability_list) > 0:
+                user_id = random.choices(available_user_ids, reliability_list)[0]
+            else:
+                user_id = random.choice(available_user_ids)
         else:
-            available_user_ids = set(a_group) - task_users_dict.get(task_id, set())
+            available_user_ids = list(set(a_group) - task_users_dict.get(task_id, set()))
 
             # Assign & note matching
-            user_id = random.choice(list(available_user_ids))
-        matchings.append([task_id, user_id])
+            user_id = random.choice(available_user_ids) if available_user_ids else None
         count += 1
+        if user_id is None:
+            print(f"No eligible user for task {task_id}, leaving it unassigned")
+            continue
+        matchings.append([task_id, user_id])
     return matchings
 
 
+### ### ARRAY-BACKED (NUMPY) ALGORITHMS ### ###
+# Same matchings as algorithm_random / algorithm_weighted, but users are mapped
+# to integer indices and a whole cycle is drawn with a few batched NumPy calls.
+# Previous assignments are kept as sorted (task index * n_users + user index)
+# keys, looked up by binary search; draws that hit one are re-drawn (rejection resampling), and the few
+# tasks still colliding after MAX_RESAMPLE_ROUNDS are drawn exactly.
+# Tasks with no eligible user are left unmatched instead of raising.
+MAX_RESAMPLE_ROUNDS = 10
+_rng = np.random.default_rng()
+
+def _excluded_keys(task_ids, assignment_data, user_index):
+    """
+    * Helper function for the NumPy algorithms *
+    Returns the sorted int64 keys task_position * n_users + user_position of
+        every (task, previously-assigned user) pair among these tasks.
+    """
+    if not assignment_data:
+        return np.empty(0, dtype=np.int64)
+    task_index = {task_id: i for i, task_id in enumerate(task_ids)}
+    task_pos = np.fromiter((task_index.get(t, -1) for t in assignment_data['task_id']), dtype=np.int64)
+    user_pos = np.fromiter((user_index.get(u, -1) for u in assignment_data['user_id']), dtype=np.int64)
+    known = (task_pos >= 0) & (user_pos >= 0)
+    return np.sort(task_pos[known] * len(user_index) + user_pos[known])
+
+def _is_excluded(keys, excluded):
+    """Membership test of keys (array) in the sorted excluded keys, by binary search."""
+    if len(excluded) == 0:
+        return np.zeros(len(keys), dtype=bool)
+    return excluded[np.searchsorted(excluded, keys).clip(max=len(excluded) - 1)] == keys
+
+def _draw_users(task_positions, pool, weights, excluded, n_users):
+    """
+    * Helper function for the NumPy algorithms *
+    Takes task positions (array), candidate user positions (array), their
+        weights (array or None for uniform), the excluded keys and the number of users.
+    Returns an array with one user position per task, -1 where no candidate is eligible.
+    """
+    chosen = np.full(len(task_positions), -1, dtype=np.int64)
+    if len(task_positions) == 0 or len(pool) == 0:
+        return chosen
+    p = None
+    if weights is not None and weights.sum() > 0:
+        p = weights / weights.sum()
+
+    todo = np.arange(len(task_positions))
+    for _ in range(MAX_RESAMPLE_ROUNDS):
+        draws = pool[_rng.choice(len(pool), size=len(todo), p=p)]
+        clash = _is_excluded(task_positions[todo] * n_users + draws, excluded)
+        chosen[todo[~clash]] = draws[~clash]
+        todo = todo[clash]
+        if len(todo) == 0:
+            return chosen
+
+    # Tasks that kept colliding: draw among their remaining candidates directly
+    for i in todo:
+        allowed = ~_is_excluded(task_positions[i] * n_users + pool, excluded)
+        if not allowed.any():
+            continue
+        sub_p = None
+        if p is not None and p[allowed].sum() > 0:
+            sub_p = p[allowed] / p[allowed].sum()
+        chosen[i] = _rng.choice(pool[allowed], p=sub_p)
+    return chosen
+
+def _np_matchings(task_ids, user_ids, chosen):
+    return [[task_ids[i], user_ids[u]] for i, u in enumerate(chosen.tolist()) if u >= 0]
+
+def algorithm_random_np(assignment_data, task_data, user_data):
+    """
+    * Vectorized algorithm_random *
+    Takes the same arguments & returns the same format as algorithm_random.
+    """
+    task_ids = list(task_data)
+    user_ids = list(user_data['id'])
+    user_index = {user_id: i for i, user_id in enumerate(user_ids)}
+    excluded = _excluded_keys(task_ids, assignment_data, user_index)
+
+    chosen = _draw_users(np.arange(len(task_ids)), np.arange(len(user_ids)), None, excluded, len(user_ids))
+    return _np_matchings(task_ids, user_ids, chosen)
+
+def algorithm_weighted_np(assignment_data, task_data, user_data):
+    """
+    * Vectorized algorithm_weighted *
+    Takes the same arguments & returns the same format as algorithm_weighted:
+        the first half of the tasks (+1) go to the B group weighted on reliability,
+        the rest to the A group uniformly.
+    """
+    task_ids = list(task_data)
+    user_ids = list(user_data['id'])
+    user_index = {user_id: i for i, user_id in enumerate(user_ids)}
+    excluded = _excluded_keys(task_ids, assignment_data, user_index)
+    weights = (np.asarray(user_data['reliability'], dtype=float) * 100).astype(np.int64).astype(float)
+
+    # Same split as create_ab_groups()
+    middle_index = int(len(user_ids) / 2)
+    a_pool, b_pool = np.arange(middle_index), np.arange(middle_index, len(user_ids))
+    b_tasks = min(int(len(task_ids) / 2) + 1, len(task_ids))
+
+    chosen = np.concatenate([
+        _draw_users(np.arange(b_tasks), b_pool, weights[b_pool], excluded, len(user_ids)),
+        _draw_users(np.arange(b_tasks, len(task_ids)), a_pool, None, excluded, len(user_ids)),
+    ])
+    return _np_matchings(task_ids, user_ids, chosen)
+
+
+### ### CAPACITY-CONSTRAINED (OPTIMAL) MATCHING ### ###
+# Solves the whole cycle as one max-weight b-matching instead of picking a user
+# per task independently: every task gets at most one user, every user at most
+# `capacity` tasks, previously-assigned (task, user) pairs are never matched,
+# as many tasks as possible are matched and, among those matchings, the one
+# giving the most tasks to the most reliable users wins.
+# The user slots that can be filled together form a (transversal) matroid, so
+# filling them greedily from the most reliable users down is optimal: users are
+# bucketed into `reliability_levels` levels and, one level at a time, their
+# source edges are opened and the current flow is augmented to a max flow
+# (scipy's Dinic). Augmenting paths never un-assign an already used slot.
+# Each task is only connected to `candidates_per_task` users (an evenly spread
+# random subset) so the graph stays sparse for thousands of users. The result is
+# therefore optimal over that sampled graph; tasks it leaves unmatched get one
+# more round with the pairs that involve them or a user with capacity left. Needs scipy.
+try:
+    from scipy.sparse import csr_matrix
+    from scipy.sparse.csgraph import maximum_flow
+except ImportError:
+    csr_matrix = None
+
+SOURCE, SINK = 0, 1
+DEFAULT_RELIABILITY = 0.1       # users.reliability of a new user, used for NULLs
+MATCHING_RETRY_EDGES = 2000000  # max extra (task, user) pairs tried for tasks the sample left unmatched
+
+def _candidate_edges(task_ids, assignment_data, user_data, candidates_per_task):
+    """
+    * Helper function for algorithm_capacity()*
+    Returns (task positions, user positions) of the allowed candidate pairs: each
+        task gets a run of a random user permutation (so every user is a candidate
+        for about as many tasks), minus the previously-assigned pairs.
+    """
+    n_tasks, n_users = len(task_ids), len(user_data['id'])
+    k = min(candidates_per_task, n_users)
+    offsets = (np.arange(n_tasks)[:, None] * k + np.arange(k)[None, :]) % n_users
+    task_pos = np.repeat(np.arange(n_tasks), k)
+    user_pos = _rng.permutation(n_users)[offsets].ravel()
+    user_index = {user_id: i for i, user_id in enumerate(user_data['id'])}
+    allowed = ~_is_excluded(task_pos * n_users + user_pos, _excluded_keys(task_ids, assignment_data, user_index))
+    return task_pos[allowed], user_pos[allowed]
+
+def _augment(n_tasks, n_users, task_pos, user_pos, edge_flow, capacity, open_steps):
+    """
+    * Helper function for algorithm_capacity()*
+    Takes the allowed (task, user) edges, the current flow on each of them (0/1
+        array) and a list of boolean user masks. For each mask in turn, opens
+        those users' source edges and augments the flow to a max flow.
+    Returns the new flow on each edge.
+    """
+    # Nodes: source, sink, users, tasks. Edges: source -> user (capacity),
+    #   user -> task (1, both directions so the flow can be rerouted), task -> sink (1)
+    user_node = 2 + np.arange(n_users, dtype=np.int64)
+    task_node = 2 + n_users + np.arange(n_tasks, dtype=np.int64)
+    n_nodes = 2 + n_users + n_tasks
+    rows = np.concatenate([np.full(n_users, SOURCE), user_node[user_pos], task_node[task_pos], task_node])
+    cols = np.concatenate([user_node, task_node[task_pos], user_node[user_pos], np.full(n_tasks, SINK)])
+    edge_keys = user_node[user_pos] * n_nodes + task_node[task_pos]
+    edge_order = np.argsort(edge_keys)
+    edge_keys = edge_keys[edge_order]
+    edge_flow = edge_flow.astype(np.int32)
+
+    for open_users in open_steps:
+        user_flow = np.bincount(user_pos, weights=edge_flow, minlength=n_users)
+        task_flow = np.bincount(task_pos, weights=edge_flow, minlength=n_tasks)
+        residual = np.concatenate([np.where(open_users, capacity - user_flow, 0), 1 - edge_flow, edge_flow, 1 - task_flow])
+        keep = residual > 0
+        graph = csr_matrix((residual[keep].astype(np.int32), (rows[keep], cols[keep])), shape=(n_nodes, n_nodes))
+        result = maximum_flow(graph, SOURCE, SINK, method='dinic')
+        if result.flow_value == 0:
+            continue
+        # The returned flow is antisymmetric: flow[i, j] is the net change on edge i -> j
+        #   (looked up by sorted row * n_nodes + column keys, much faster than fancy-indexing the matrix)
+        flow = result.flow.tocsr()
+        flow.sort_indices()
+        flow = flow.tocoo()
+        flow_keys = flow.row.astype(np.int64) * n_nodes + flow.col
+        found = np.minimum(np.searchsorted(flow_keys, edge_keys), len(flow_keys) - 1)
+        edge_flow[edge_order] += np.where(flow_keys[found] == edge_keys, flow.data[found], 0).astype(np.int32)
+    return edge_flow
+
+def algorithm_capacity(assignment_data, task_data, user_data, capacity=None, candidates_per_task=None,
+                       reliability_levels=None):
+    """
+    * One of many possible matching algorithms for match_users_and_tasks()*
+    Takes the same arguments as algorithm_random, plus optionally the max tasks
+        per user per cycle, the number of candidate users per task and the number
+        of reliability levels (defaults in task_parameters; a capacity of None is
+        just enough for every task: tasks / users, rounded up).
+    Matches as many tasks as possible over the sampled candidate pairs without
+        going over any user's capacity, preferring reliable users. Then retries
+        the tasks left unmatched with every eligible pair that involves them or
+        a user with capacity left (up to MATCHING_RETRY_EDGES pairs), so a task
+        no longer stays unmatched just because its eligible users were not in
+        its sample. Only a reroute through two other sampled-out pairs can
+        still be missed.
+    Returns a list of those user-task matches, format: [[task_id, user_id], [...], ...]
+    """
+    if csr_matrix is None:
+        raise ImportError("algorithm_capacity needs scipy (pip install scipy)")
+    if candidates_per_task is None or reliability_levels is None:
+        # task_parameters imports this module, so import it here
+        import task_parameters
+        capacity = capacity or task_parameters.MATCHING_USER_CAPACITY
+        candidates_per_task = candidates_per_task or task_parameters.MATCHING_CANDIDATES_PER_TASK
+        reliability_levels = reliability_levels or task_parameters.MATCHING_RELIABILITY_LEVELS
+
+    task_ids = list(task_data)
+    user_ids = list(user_data['id']) if user_data else []
+    n_tasks, n_users = len(task_ids), len(user_ids)
+    if not n_tasks or not n_users:
+        return []
+    capacity = capacity or -(-n_tasks // n_users)
+    task_pos, user_pos = _candidate_edges(task_ids, assignment_data, user_data, candidates_per_task)
+
+    # Most reliable level first (NULL reliability counts as the 0.1 a new user starts with)
+    reliability = np.nan_to_num(np.asarray(user_data['reliability'], dtype=float), nan=DEFAULT_RELIABILITY)
+    level = np.clip((reliability * reliability_levels).astype(np.int64), 0, reliability_levels)
+    open_steps = [level >= current for current in np.unique(level)[::-1]]
+    edge_flow = _augment(n_tasks, n_users, task_pos, user_pos, np.zeros(len(task_pos), dtype=np.int32),
+                         capacity, open_steps)
+
+    # Retry: connect each unmatched task to every eligible user and each user with capacity left
+    #   to every task, outside the sample. Then a user can take an unmatched task directly,
+    #   or by handing one of its tasks over to a user with capacity left
+    task_load = np.bincount(task_pos, weights=edge_flow, minlength=n_tasks)
+    user_load = np.bincount(user_pos, weights=edge_flow, minlength=n_users)
+    unmatched, spare = np.flatnonzero(task_load == 0), np.flatnonzero(user_load < capacity)
+    if len(unmatched) and len(spare):
+        budget = max(MATCHING_RETRY_EDGES // (len(unmatched) + len(spare)), 1)
+        extra_task, extra_user = [], []
+        for rows, n_cols, row_is_task in ((unmatched, n_users, True), (spare, n_tasks, False)):
+            per_row = min(n_cols, budget)
+            picked = np.arange(n_cols) if per_row == n_cols else _rng.choice(n_cols, per_row, replace=False)
+            row_pos, col_pos = np.repeat(rows, per_row), np.tile(picked, len(rows))
+            extra_task.append(row_pos if row_is_task else col_pos)
+            extra_user.append(col_pos if row_is_task else row_pos)
+        extra_keys = np.unique(np.concatenate(extra_task) * n_users + np.concatenate(extra_user))
+        user_index = {user_id: i for i, user_id in enumerate(user_ids)}
+        extra_keys = extra_keys[~(_is_excluded(extra_keys, _excluded_keys(task_ids, assignment_data, user_index))
+                                  | _is_excluded(extra_keys, np.sort(task_pos * n_users + user_pos)))]
+        if len(extra_keys):
+            task_pos = np.concatenate([task_pos, extra_keys // n_users])
+            user_pos = np.concatenate([user_pos, extra_keys % n_users])
+            edge_flow = np.concatenate([edge_flow, np.zeros(len(extra_keys), dtype=np.int32)])
+            edge_flow = _augment(n_tasks, n_users, task_pos, user_pos, edge_flow, capacity, [np.ones(n_users, dtype=bool)])
+
+    used = np.flatnonzero(edge_flow)
+    return [[task_ids[t], user_ids[u]] for t, u in zip(task_pos[used].tolist(), user_pos[used].tolist())]
+
+
 ### ### OVERALL MATCHING & ASSIGNMENT GENERATION ### ###
 def match_users_and_tasks(matching_algo, db_name):
     """
@@ -164,32 +428,30 @@ def match_users_and_tasks(matching_algo, db_name):
         Assignments to the 'assignments' table.
     Returns nothing.
     """
-    # Open database connection
-    db = helper_functions.connectDB(db_name)
+    # Open database connection (returned to the pool at the end of the block)
+    with helper_functions.connectDB(db_name) as db:
 
-    # read in assignment, task, and user data
-    assignment_data = read_table(db, 'assignments')
-    # task_data = read_table(db, 'tasks')
-    user_data = read_table(db, 'users')
+        # read in user data
+        # task_data = read_table(db, 'tasks')
+        user_data = read_table(db, 'users')
 
-    # Updates task expiration status
-    cursor = db.cursor()
-    cursor.execute(f"UPDATE tasks SET expired = 1 WHERE start_time + INTERVAL time_window minute < now()")
-    
-    # Identify unassigned tasks 
-    cursor.execute(f"SELECT tasks.id FROM tasks LEFT JOIN assignments ON tasks.id=assignments.task_id \
-                   WHERE expired = 0 AND tasks.id NOT IN (SELECT task_id from assignments)")
-    unassigned_tasks = set([tasks[0] for tasks in cursor.fetchall()])
-    # Use the given Matching Algorithm to match users to unassigned tasks
-    if user_data:
-        task_user_matchings = matching_algo(assignment_data, unassigned_tasks, user_data)
-
-        # Generate Assignments & insert them into the Assignments table
-        all_assignments = [{'task_id': task_id, 'user_id': user_id} for task_id, user_id in task_user_matchings]
-        insert_assignments(all_assignments, db)
-
-    # Close database connection
-    db.close()
+        # Identify unexpired & unassigned tasks (tasks.expired itself is kept up to date by
+        #   messenger.expire_tasks(), the periodic sweep)
+        cursor = db.cursor()
+        cursor.execute("""SELECT tasks.id FROM tasks WHERE expires_at >= NOW()
+                          AND NOT EXISTS (SELECT 1 FROM assignments WHERE assignments.task_id = tasks.id)""")
+        unassigned_tasks = set([tasks[0] for tasks in cursor.fetchall()])
+
+        # No exclusions: the algorithms skip users previously assigned to a task, and by the
+        #   NOT EXISTS above none of these tasks has ever been assigned to anyone
+        assignment_data = {}
+        # Use the given Matching Algorithm to match users to unassigned tasks
+        if user_data:
+            task_user_matchings = matching_algo(assignment_data, unassigned_tasks, user_data)
+
+            # Generate Assignments & insert them into the Assignments table
+            all_assignments = [{'task_id': task_id, 'user_id': user_id} for task_id, user_id in task_user_matchings]
+            insert_assignments(all_assignments, db)
 
 
 
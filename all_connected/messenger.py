@@ -8,6 +8,7 @@ run this file in another terminal
 (both of these things need to happen in order to run)
 """
 import helper_functions
+from report_cache import reports
 from datetime import datetime
 
 import os
@@ -22,95 +23,155 @@ DB_NAME = os.environ.get('DB_NAME')
 
 def add_users(user_store):
     '''
-    Gets teh database connection. Returns nothing.
-    Add users to the database based on the current list of users in the the workplace 
+    Takes a dict of Slack user objects keyed on user id (e.g. from user_directory).
+    Adds new workspace members to the users table and updates changed usernames,
+        in one transaction. Bots, Slackbot and deleted users are skipped.
+    Returns {'inserted': n, 'updated': n, 'unchanged': n}
     '''
-    conn = helper_functions.connectDB(DB_NAME)
-    cur = conn.cursor()
-    # user_store = get_all_users_info()
-    query = '''INSERT IGNORE INTO users (username, id) VALUES (%s, %s)'''
-    for key in user_store:
-        not_bot = user_store[key]['is_bot'] == False
-        not_slackbot = (key != 'USLACKBOT')
-        deleted = user_store[key]['deleted']
-        if not_bot and not_slackbot and (not deleted):
-            username = user_store[key]['name']
-            cur.execute(query, (username, key))
-            conn.commit()
-    conn.close()
+    members = {key: user['name'] for key, user in user_store.items()
+               if not user.get('is_bot') and key != 'USLACKBOT' and not user.get('deleted')}
+    counts = {'inserted': 0, 'updated': 0, 'unchanged': 0}
+    if not members:
+        return counts
+    with helper_functions.connectDB(DB_NAME) as conn:
+        cur = conn.cursor()
+        placeholders = ", ".join(["%s"] * len(members))
+        cur.execute(f"SELECT id, username FROM users WHERE id IN ({placeholders})", tuple(members))
+        existing = dict(cur.fetchall())
+
+        changed = [(username, key) for key, username in members.items() if key in existing and existing[key] != username]
+        new = [(username, key) for key, username in members.items() if key not in existing]
+        if changed:
+            # One multi-row statement for every renamed user
+            cur.executemany('''INSERT INTO users (username, id) VALUES (%s, %s)
+                               ON DUPLICATE KEY UPDATE username = VALUES(username)''', changed)
+        # New users are inserted one row per statement: the set_comp_category trigger
+        # alternates compensation categories by reading AUTO_INCREMENT per statement
+        for row in new:
+            cur.execute('''INSERT IGNORE INTO users (username, id) VALUES (%s, %s)''', row)
+        conn.commit()
+    counts.update(inserted=len(new), updated=len(changed), unchanged=len(members) - len(new) - len(changed))
+    return counts
 
 def get_total_users():
-    conn = helper_functions.connectDB(DB_NAME)
-    cur = conn.cursor()
-    query = "SELECT COUNT(id) FROM users WHERE `status` = 'active'"
-    cur.execute(query)
-    total_users = cur.fetchone()[0]
+    with helper_functions.connectDB(DB_NAME) as conn:
+        cur = conn.cursor()
+        query = "SELECT COUNT(id) FROM users WHERE `status` = 'active'"
+        cur.execute(query)
+        total_users = cur.fetchone()[0]
     return int(total_users)
 
 def get_active_users_list():
-    conn = helper_functions.connectDB(DB_NAME)
-    cur = conn.cursor()
-    query = "SELECT id FROM users WHERE `status` = 'active'"
-    cur.execute(query)
-    active_users_list = cur.fetchall()
+    with helper_functions.connectDB(DB_NAME) as conn:
+        cur = conn.cursor()
+        query = "SELECT id FROM users WHERE `status` = 'active'"
+        cur.execute(query)
+        active_users_list = cur.fetchall()
     active_users = [user[0] for user in active_users_list]
     return active_users
 
 def get_all_users_list():
-    conn = helper_functions.connectDB(DB_NAME)
-    cur = conn.cursor()
-    query = "SELECT id FROM users"
-    cur.execute(query)
-    all_users_list = cur.fetchall()
+    with helper_functions.connectDB(DB_NAME) as conn:
+        cur = conn.cursor()
+        query = "SELECT id FROM users"
+        cur.execute(query)
+        all_users_list = cur.fetchall()
     all_users = [user[0] for user in all_users_list]
     return all_users
 
 def get_account_info(user_id):
-    conn = helper_functions.connectDB(DB_NAME)
-    cur = conn.cursor()
-    query = f"SELECT compensation FROM users WHERE id = '{user_id}'"
-    cur.execute(query)
-    compensation = cur.fetchone()[0]
-    query = f"SELECT task_id FROM assignments WHERE user_id = '{user_id}' AND checked = 1 AND submission_time IS NOT NULL"
-    cur.execute(query)
-    tasks = [task[0] for task in cur.fetchall()]
+    with helper_functions.connectDB(DB_NAME) as conn:
+        cur = conn.cursor()
+        query = f"SELECT compensation FROM users WHERE id = '{user_id}'"
+        cur.execute(query)
+        compensation = cur.fetchone()[0]
+        query = f"SELECT task_id FROM assignments WHERE user_id = '{user_id}' AND checked = 1 AND submission_time IS NOT NULL"
+        cur.execute(query)
+        tasks = [task[0] for task in cur.fetchall()]
     return compensation, tasks
 
 def update_account_status(user_id, status):
-    conn = helper_functions.connectDB(DB_NAME)
-    cur = conn.cursor()
-    cur.execute(f"UPDATE users SET `status` = '{status}' WHERE id = '{user_id}'")
-    conn.commit()
-    conn.close
+    with helper_functions.connectDB(DB_NAME) as conn:
+        cur = conn.cursor()
+        cur.execute(f"UPDATE users SET `status` = '{status}' WHERE id = '{user_id}'")
+        conn.commit()
 
 def add_account_compensation(user_id, compensation):
-    conn = helper_functions.connectDB(DB_NAME)
-    cur = conn.cursor()
-    cur.execute(f"UPDATE users SET `compensation` = compensation + {compensation} WHERE id = '{user_id}'")
-    conn.commit()
-    conn.close
-
-def update_tasks_expired():
-    conn = helper_functions.connectDB(DB_NAME)
-    cur = conn.cursor()
-    cur.execute("UPDATE tasks SET `expired` = 1 WHERE (start_time + INTERVAL time_window MINUTE) < NOW()")
-    conn.commit()
-    conn.close
+    with helper_functions.connectDB(DB_NAME) as conn:
+        cur = conn.cursor()
+        cur.execute(f"UPDATE users SET `compensation` = compensation + {compensation} WHERE id = '{user_id}'")
+        conn.commit()
+
+# Read paths decide expiry from tasks.expires_at (generated from start_time + time_window
+# and indexed, see migrations 6 & 7) instead of updating `expired` first. expire_tasks() keeps
+# the `expired` flag in step from one periodic sweep (connections.expiry_call).
+TASK_OPEN = "tasks.expires_at >= NOW()"
+
+def expire_tasks():
+    '''
+    Sets expired = 1 on tasks whose time window has passed. Served by the
+    (expired, expires_at) index, so it only reads tasks not yet flagged.
+    Returns the number of tasks expired.
+    '''
+    with helper_functions.connectDB(DB_NAME) as conn:
+        cur = conn.cursor()
+        cur.execute("UPDATE tasks SET `expired` = 1 WHERE `expired` = 0 AND expires_at < NOW()")
+        expired = cur.rowcount
+        conn.commit()
+    if expired:
+        reports.invalidate()
+    return expired
 
 def get_task_list(user_id, task_id):
-    conn = helper_functions.connectDB(DB_NAME)
-    cur = conn.cursor()
-    query = f'''SELECT assignments.task_id, assignments.user_id, 
-                tasks.location, tasks.description, tasks.start_time, tasks.time_window, 
-                tasks.compensation
-                FROM assignments INNER JOIN tasks ON assignments.task_id = tasks.id
-                WHERE (assignments.task_id = {task_id} AND assignments.user_id = '{user_id}')'''
-    cur.execute(query)
-    assignment = cur.fetchone()
-    conn.close()
+    with helper_functions.connectDB(DB_NAME) as conn:
+        cur = conn.cursor()
+        query = f'''SELECT assignments.task_id, assignments.user_id, 
+                    tasks.location, tasks.description, tasks.start_time, tasks.time_window, 
+                    tasks.compensation
+                    FROM assignments INNER JOIN tasks ON assignments.task_id = tasks.id
+                    WHERE (assignments.task_id = {task_id} AND assignments.user_id = '{user_id}')'''
+        cur.execute(query)
+        assignment = cur.fetchone()
     assert assignment, f"Assignment #{task_id} could not be found in database!"
     return assignment
 
+# A user's report: accepted & not yet submitted tasks plus pending tasks, unexpired,
+# in get_task_list() row format + the assignment status (index 7), by start time
+REPORT_TASKS_SQL = f'''SELECT assignments.task_id, assignments.user_id,
+                    tasks.location, tasks.description, tasks.start_time, tasks.time_window,
+                    tasks.compensation, assignments.`status`
+                    FROM assignments INNER JOIN tasks ON assignments.task_id = tasks.id
+                    WHERE assignments.user_id IN ({{users}}) AND {TASK_OPEN}
+                        AND ((assignments.`status` = 'accepted' AND assignments.img IS NULL)
+                             OR assignments.`status` = 'pending')
+                    ORDER BY assignments.user_id, tasks.start_time'''
+
+def get_report_tasks(user_id):
+    '''
+    Takes a user id.
+    Returns that user's active (accepted, unexpired, not submitted) & pending (unexpired)
+        task rows in one query: get_task_list() format + status at index 7, sorted by start time.
+    '''
+    return get_report_tasks_batch([user_id]).get(user_id, [])
+
+def get_report_tasks_batch(user_ids):
+    '''
+    Takes a list of user ids.
+    Returns {user id: get_report_tasks() rows} for all of them from one query
+        (users without active or pending tasks are left out).
+    '''
+    if not user_ids:
+        return {}
+    user_ids = list(user_ids)
+    with helper_functions.connectDB(DB_NAME) as conn:
+        cur = conn.cursor()
+        cur.execute(REPORT_TASKS_SQL.format(users=", ".join(["%s"] * len(user_ids))), user_ids)
+        rows = cur.fetchall()
+    report_tasks = {}
+    for row in rows:
+        report_tasks.setdefault(row[1], []).append(row)
+    return report_tasks
+
 
 def get_assignments(db_name):
     '''
@@ -119,17 +180,15 @@ def get_assignments(db_name):
     details) that user is assigned
     Return the dictionary
     '''
-    update_tasks_expired()
-    conn = helper_functions.connectDB(db_name)
-    cur = conn.cursor()
-    query = '''SELECT assignments.task_id, assignments.user_id, 
-                tasks.location, tasks.description, tasks.start_time, tasks.time_window, 
-                tasks.compensation
-                FROM assignments INNER JOIN tasks ON assignments.task_id = tasks.id
-                WHERE (assignments.`status` = 'not assigned' AND tasks.expired != 1)'''
-    cur.execute(query)
-    assignments = cur.fetchall()
-    conn.close()
+    with helper_functions.connectDB(db_name) as conn:
+        cur = conn.cursor()
+        query = f'''SELECT assignments.task_id, assignments.user_id, 
+                    tasks.location, tasks.description, tasks.start_time, tasks.time_window, 
+                    tasks.compensation
+                    FROM assignments INNER JOIN tasks ON assignments.task_id = tasks.id
+                    WHERE (assignments.`status` = 'not assigned' AND {TASK_OPEN})'''
+        cur.execute(query)
+        assignments = cur.fetchall()
     assignments_dict = {}
     for assignment in assignments:
         uid = assignment[1]
@@ -140,13 +199,13 @@ def get_assignments(db_name):
     return assignments_dict
 
 def get_assign_status(task, user):
-    conn = helper_functions.connectDB(DB_NAME)
-    cur = conn.cursor()
-    query = f'''SELECT status FROM assignments
-                WHERE task_id = {task} AND user_id = '{user}'
-    '''
-    cur.execute(query)
-    status = cur.fetchone()[0]
+    with helper_functions.connectDB(DB_NAME) as conn:
+        cur = conn.cursor()
+        query = f'''SELECT status FROM assignments
+                    WHERE task_id = {task} AND user_id = '{user}'
+        '''
+        cur.execute(query)
+        status = cur.fetchone()[0]
     return status
 
 
@@ -159,19 +218,20 @@ def update_assign_status(status, task_id, user_id):
         
     Helper function to update assignment status,
     '''
-    conn = helper_functions.connectDB(DB_NAME)
-    cur = conn.cursor()
-    if status == "pending":
-        query = '''UPDATE assignments INNER JOIN tasks 
-                ON assignments.task_id = tasks.id
-                SET assignments.`status` = 'pending', recommend_time = NOW()
-                WHERE (assignments.`status` = 'not assigned' AND tasks.expired != 1)
-        '''
-        cur.execute(query)
-    elif status == "accepted" or status == "rejected":
-        cur.execute(f"UPDATE assignments SET `status` = '{status}' WHERE task_id={task_id} AND user_id='{user_id}'")
-    conn.commit()
-    conn.close
+    with helper_functions.connectDB(DB_NAME) as conn:
+        cur = conn.cursor()
+        if status == "pending":
+            query = f'''UPDATE assignments INNER JOIN tasks 
+                    ON assignments.task_id = tasks.id
+                    SET assignments.`status` = 'pending', recommend_time = NOW()
+                    WHERE (assignments.`status` = 'not assigned' AND {TASK_OPEN})
+            '''
+            cur.execute(query)
+        elif status == "accepted" or status == "rejected":
+            cur.execute(f"UPDATE assignments SET `status` = '{status}' WHERE task_id={task_id} AND user_id='{user_id}'")
+        conn.commit()
+    # Sending tasks changes many users' reports, accepting / rejecting only this user's
+    reports.invalidate(None if status == "pending" else user_id)
 
 def get_accepted_tasks(user_id) -> list:
     """
@@ -179,18 +239,15 @@ def get_accepted_tasks(user_id) -> list:
     Finds that user's assignment data.
     
     """
-    update_tasks_expired()
-    conn = helper_functions.connectDB(DB_NAME)
-    cur = conn.cursor()
-    query = f'''SELECT DISTINCT assignments.task_id
-                FROM assignments INNER JOIN tasks 
-                ON assignments.task_id = tasks.id
-                WHERE (assignments.user_id = '{user_id}') AND (assignments.`status` = 'accepted') AND (tasks.expired != 1) AND (img IS NULL)'''
-    cur.execute(query)
-
-    task_list = [int(task_id[0]) for task_id in cur.fetchall()]
-    
-    conn.close()
+    with helper_functions.connectDB(DB_NAME) as conn:
+        cur = conn.cursor()
+        query = f'''SELECT DISTINCT assignments.task_id
+                    FROM assignments INNER JOIN tasks 
+                    ON assignments.task_id = tasks.id
+                    WHERE (assignments.user_id = '{user_id}') AND (assignments.`status` = 'accepted') AND ({TASK_OPEN}) AND (img IS NULL)'''
+        cur.execute(query)
+
+        task_list = [int(task_id[0]) for task_id in cur.fetchall()]
     return task_list
 
 def get_pending_tasks(user_id) -> list:
@@ -199,27 +256,25 @@ def get_pending_tasks(user_id) -> list:
     Finds that user's assignment data.
     
     """
-    conn = helper_functions.connectDB(DB_NAME)
-    cur = conn.cursor()
-    # query = f'''SELECT task_id FROM assignments 
-    #             WHERE user_id = '{user_id}' AND `status` = 'pending'
-    #         '''
-    query = f'''SELECT DISTINCT assignments.task_id 
-                FROM assignments INNER JOIN tasks
-                ON assignments.task_id = tasks.id
-                WHERE assignments.user_id = '{user_id}' AND assignments.`status` = 'pending' AND tasks.expired = 0
-            '''
-    cur.execute(query)
-    task_list = [item[0] for item in cur.fetchall()]
-    conn.close()
+    with helper_functions.connectDB(DB_NAME) as conn:
+        cur = conn.cursor()
+        # query = f'''SELECT task_id FROM assignments 
+        #             WHERE user_id = '{user_id}' AND `status` = 'pending'
+        #         '''
+        query = f'''SELECT DISTINCT assignments.task_id 
+                    FROM assignments INNER JOIN tasks
+                    ON assignments.task_id = tasks.id
+                    WHERE assignments.user_id = '{user_id}' AND assignments.`status` = 'pending' AND {TASK_OPEN}
+                '''
+        cur.execute(query)
+        task_list = [item[0] for item in cur.fetchall()]
     return task_list
 
 def check_time_window(task_id):
-    update_tasks_expired()
-    conn = helper_functions.connectDB(DB_NAME)
-    cur = conn.cursor()
-    cur.execute(f"SELECT expired, (start_time<NOW()) FROM tasks WHERE id = {task_id}")
-    timing = cur.fetchone()
+    with helper_functions.connectDB(DB_NAME) as conn:
+        cur = conn.cursor()
+        cur.execute(f"SELECT NOT ({TASK_OPEN}), (start_time<NOW()) FROM tasks WHERE id = {task_id}")
+        timing = cur.fetchone()
     expired = timing[0]
     started = timing[1]
     if expired == 1:
@@ -228,14 +283,14 @@ def check_time_window(task_id):
         return "not started"
 
 def submit_task(user_id, task_id, path):
-    update_tasks_expired()
-    conn = helper_functions.connectDB(DB_NAME)
-    cur = conn.cursor()
-    cur.execute(f"SELECT expired, (start_time<NOW()) FROM tasks WHERE id = {task_id}")
-    timing = cur.fetchone()
-    expired = timing[0]
-    started = timing[1]
-    if expired == 0 and started == 1:
+    with helper_functions.connectDB(DB_NAME) as conn:
+        cur = conn.cursor()
+        cur.execute(f"SELECT NOT ({TASK_OPEN}), (start_time<NOW()) FROM tasks WHERE id = {task_id}")
+        timing = cur.fetchone()
+        expired = timing[0]
+        started = timing[1]
+        if not (expired == 0 and started == 1):
+            return False
         query = f'''UPDATE assignments 
                     INNER JOIN users ON assignments.user_id = users.id
                     INNER JOIN tasks ON assignments.task_id = tasks.id
@@ -246,109 +301,124 @@ def submit_task(user_id, task_id, path):
                 '''
         cur.execute(query)
         conn.commit()
-        conn.close()
-        update_reliability(user_id)
-        return True
-    else:
-        return False
+    reports.invalidate(user_id)
+    # The new submission_time puts this user in the next incremental update_all_reliability()
+    return True
 
 def delete_submission(user_id, task_id):
-    conn = helper_functions.connectDB(DB_NAME)
-    cur = conn.cursor()
-    query = f'''UPDATE assignments
-            SET img = NULL, submission_time = NULL
-            WHERE user_id = {user_id} AND task_id = {task_id}
-            '''
-    cur.execute(query)
-    conn.commit()
-    conn.close()
+    with helper_functions.connectDB(DB_NAME) as conn:
+        cur = conn.cursor()
+        query = f'''UPDATE assignments
+                SET img = NULL, submission_time = NULL
+                WHERE user_id = {user_id} AND task_id = {task_id}
+                '''
+        cur.execute(query)
+        conn.commit()
+    reports.invalidate(user_id)
     return
     
 def check_all_assignments():
-    conn = helper_functions.connectDB(DB_NAME)
-    cur = conn.cursor()
-    query = f'''UPDATE assignments 
-                INNER JOIN users ON assignments.user_id = users.id
-                INNER JOIN tasks ON assignments.task_id = tasks.id
-            SET users.compensation = users.compensation+ tasks.compensation,
-                assignments.checked = 1
-            WHERE (assignments.checked = 0 AND submission_time IS NOT NULL)
-            '''
-    cur.execute(query)
-    conn.commit()
-    conn.close()
+    with helper_functions.connectDB(DB_NAME) as conn:
+        cur = conn.cursor()
+        query = f'''UPDATE assignments 
+                    INNER JOIN users ON assignments.user_id = users.id
+                    INNER JOIN tasks ON assignments.task_id = tasks.id
+                SET users.compensation = users.compensation+ tasks.compensation,
+                    assignments.checked = 1
+                WHERE (assignments.checked = 0 AND submission_time IS NOT NULL)
+                '''
+        cur.execute(query)
+        conn.commit()
     return
 
+# Reliability = 0.3 * old reliability + 0.7 * (submissions / accepted assignments
+# recommended since yesterday, or 0.1 if either count is 0), for all users in one statement
+RELIABILITY_SQL = '''UPDATE users
+        LEFT JOIN (SELECT user_id,
+                          SUM(status = 'accepted') AS accepted,
+                          COUNT(img) AS submissions
+                   FROM assignments
+                   WHERE DATE(recommend_time) >= CURDATE() -1 {assignment_filter}
+                   GROUP BY user_id) AS recent ON recent.user_id = users.id
+    SET users.reliability = users.reliability * 0.3 + 0.7 * (
+        CASE WHEN COALESCE(recent.accepted, 0) = 0 OR COALESCE(recent.submissions, 0) = 0 THEN 0.1
+             ELSE ROUND(recent.submissions / recent.accepted, 2) END)
+    WHERE users.id <> 'USLACKBOT' {user_filter}
+'''
+_last_reliability_run = None   # database time the last update_all_reliability() started
+
+def update_all_reliability(incremental=False, user_ids=None):
+    '''
+    Recomputes reliability (see RELIABILITY_SQL) for every user in one UPDATE.
+    With incremental=True, only users with assignment activity since the last
+        run are updated (since midnight for the first run in this process):
+        any assignment inserted, accepted, rejected, submitted or deleted bumps
+        assignments.updated_at (migration 9).
+    With user_ids, only those users are updated.
+    Returns the number of users whose reliability changed.
+    '''
+    global _last_reliability_run
+    filters, params = [], []
+    if user_ids is not None:
+        if not user_ids:
+            return 0
+        filters.append(f"IN ({', '.join(['%s'] * len(user_ids))})")
+        params.append(list(user_ids))
+    with helper_functions.connectDB(DB_NAME) as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT NOW(), CURDATE()")
+        started, today = cur.fetchone()
+        if incremental:
+            filters.append("IN (SELECT user_id FROM assignments WHERE updated_at >= %s)")
+            params.append([_last_reliability_run or today])
+        # Same filters on the users being updated and on the assignments aggregated for them
+        user_filter = "".join(f" AND users.id {f}" for f in filters)
+        assignment_filter = "".join(f" AND user_id {f}" for f in filters)
+        flat_params = [value for group in params for value in group]
+        cur.execute(RELIABILITY_SQL.format(assignment_filter=assignment_filter, user_filter=user_filter),
+                    flat_params + flat_params)
+        updated = cur.rowcount
+        conn.commit()
+    if user_ids is None:
+        _last_reliability_run = started
+    scope = 'incremental' if incremental else 'selected' if user_ids is not None else 'all'
+    print(f"[RELIABILITY] Updated {updated} users ({scope})")
+    return updated
+
 def update_reliability(user_id):
-    conn = helper_functions.connectDB(DB_NAME)
-    cur = conn.cursor()
-    query = f'''SELECT COUNT(status)
-                FROM assignments
-                WHERE status = 'accepted' and user_id = '{user_id}' and DATE(recommend_time) >= CURDATE() -1
-            '''
-    cur.execute(query)
-    accepted = cur.fetchone()[0]
-    if accepted == 0:
-        new_reliability = 0.1
-    else:
-        query = f'''SELECT COUNT(img)
-                    FROM assignments
-                    WHERE img IS NOT NULL and user_id = '{user_id}' and DATE(recommend_time) >= CURDATE() -1
-                '''
-        cur.execute(query)
-        submissions = cur.fetchone()[0]
-        if submissions == 0:
-            new_reliability = 0.1
-        else:
-            new_reliability = round(submissions/accepted, 2)
-    query = f'''SELECT reliability
-                FROM users
-                WHERE user_id = '{user_id}'
-            '''
-    cur.execute(query)
-    old_reliability = cur.fetchone()[0]
-    reliability = old_reliability * 0.3 +new_reliability * 0.7
-    print(user_id, reliability)
-    query = f'''UPDATE users 
-            SET reliability = {reliability}
-            WHERE id = '{user_id}'
-            '''
-    cur.execute(query)
-    conn.commit()
-    conn.close()
+    update_all_reliability(user_ids=[user_id])
     return
 
         
 def update_reliability_old(user_id):
-    conn = helper_functions.connectDB(DB_NAME)
-    cur = conn.cursor()
-    query = f'''SELECT COUNT(status)
-                FROM assignments
-                WHERE status = 'accepted' and user_id = '{user_id}'
-            '''
-    cur.execute(query)
-    accepted = cur.fetchone()[0]
-    if accepted == 0:
-        reliability = 0.1
-    else:
-        query = f'''SELECT COUNT(img)
+    with helper_functions.connectDB(DB_NAME) as conn:
+        cur = conn.cursor()
+        query = f'''SELECT COUNT(status)
                     FROM assignments
-                    WHERE img IS NOT NULL and user_id = '{user_id}'
+                    WHERE status = 'accepted' and user_id = '{user_id}'
                 '''
         cur.execute(query)
-        submissions = cur.fetchone()[0]
-        if submissions == 0:
+        accepted = cur.fetchone()[0]
+        if accepted == 0:
             reliability = 0.1
         else:
-            reliability = round(submissions/accepted, 2)
-    print(user_id, reliability)
-    query = f'''UPDATE users 
-            SET reliability = {reliability}
-            WHERE id = '{user_id}'
-            '''
-    cur.execute(query)
-    conn.commit()
-    conn.close()
+            query = f'''SELECT COUNT(img)
+                        FROM assignments
+                        WHERE img IS NOT NULL and user_id = '{user_id}'
+                    '''
+            cur.execute(query)
+            submissions = cur.fetchone()[0]
+            if submissions == 0:
+                reliability = 0.1
+            else:
+                reliability = round(submissions/accepted, 2)
+        print(user_id, reliability)
+        query = f'''UPDATE users 
+                SET reliability = {reliability}
+                WHERE id = '{user_id}'
+                '''
+        cur.execute(query)
+        conn.commit()
     return
 
 if __name__ == "__main__":
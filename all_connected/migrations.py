@@ -0,0 +1,289 @@
+"""
+Date: 10/18/2026
+Description: Versioned schema migrations on top of data/create_tables.sql.
+    Each migration runs once per database and is recorded in the
+    `schema_migrations` table. Every step is written to be safe to re-run,
+    so databases created before or after a table/index was added both end up
+    with the same schema. Applied at bot startup, or by hand:
+
+        python migrations.py            # apply pending migrations
+        python migrations.py status     # list applied / pending migrations
+        python migrations.py explain    # EXPLAIN the hot queries, flag full table scans
+"""
+import os
+import sys
+import pymysql
+from pathlib import Path
+from dotenv import load_dotenv
+env_path = Path(__file__).parent.parent / '.env'
+load_dotenv(env_path)
+
+import helper_functions
+import order_stats
+import schema_registry
+
+DB_NAME = os.environ.get('DB_NAME')
+MIGRATION_LOCK = 'snackngo_schema_migrations'   # MySQL named lock so two processes don't migrate at once
+MIGRATION_LOCK_TIMEOUT = 60                     # seconds
+
+
+### ### STEP HELPERS ### ###
+def table_exists(cursor, table):
+    cursor.execute(
+        "SELECT COUNT(*) FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+        (table,)
+    )
+    return cursor.fetchone()[0] > 0
+
+def index_exists(cursor, table, index_name):
+    cursor.execute(
+        """SELECT COUNT(*) FROM information_schema.STATISTICS
+           WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s""",
+        (table, index_name)
+    )
+    return cursor.fetchone()[0] > 0
+
+def covering_index_exists(cursor, table, columns):
+    """True if some index of the table starts with exactly these columns (e.g. a foreign key's index)."""
+    cursor.execute(
+        """SELECT INDEX_NAME, GROUP_CONCAT(COLUMN_NAME ORDER BY SEQ_IN_INDEX) FROM information_schema.STATISTICS
+           WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s GROUP BY INDEX_NAME""",
+        (table,)
+    )
+    return any(index_columns.split(',')[:len(columns)] == list(columns) for _, index_columns in cursor.fetchall())
+
+def column_exists(cursor, table, column):
+    cursor.execute(
+        """SELECT COUNT(*) FROM information_schema.COLUMNS
+           WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s""",
+        (table, column)
+    )
+    return cursor.fetchone()[0] > 0
+
+def add_column(table, column, definition):
+    """
+    Returns a migration step that adds a column unless it already exists.
+    Skipped if the table itself doesn't exist in this database.
+    """
+    def step(cursor):
+        if not table_exists(cursor, table):
+            print(f"[MIGRATIONS] {table} does not exist, skipping column {column}")
+            return
+        if column_exists(cursor, table, column):
+            return
+        cursor.execute(f"ALTER TABLE `{table}` ADD COLUMN `{column}` {definition}")
+    step.__name__ = f"add_column_{table}_{column}"
+    return step
+
+def add_index(table, index_name, columns):
+    """
+    Returns a migration step that creates an index unless it (or another
+    index starting with the same columns) already exists.
+    Skipped if the table itself doesn't exist in this database.
+    """
+    def step(cursor):
+        if not table_exists(cursor, table):
+            print(f"[MIGRATIONS] {table} does not exist, skipping index {index_name}")
+            return
+        if index_exists(cursor, table, index_name) or covering_index_exists(cursor, table, columns):
+            return
+        column_list = ", ".join([f"`{column}`" for column in columns])
+        cursor.execute(f"CREATE INDEX `{index_name}` ON `{table}` ({column_list})")
+    step.__name__ = f"add_index_{index_name}"
+    return step
+
+
+### ### MIGRATIONS ### ###
+# (version, description, steps). Steps are SQL strings or functions taking a cursor.
+# Append new migrations at the end, never edit one that has shipped.
+MIGRATIONS = [
+    (1, "extraction cache, processed files & per-user order stats tables", [
+        """CREATE TABLE IF NOT EXISTS extraction_cache (
+               cache_key CHAR(64) PRIMARY KEY,
+               result TEXT NOT NULL,
+               created_at INT NOT NULL,
+               INDEX (created_at)
+           ) ENGINE = InnoDB""",
+        """CREATE TABLE IF NOT EXISTS processed_files (
+               file_id VARCHAR(50) PRIMARY KEY,
+               event_id VARCHAR(50),
+               claimed_at INT NOT NULL,
+               INDEX (claimed_at)
+           ) ENGINE = InnoDB""",
+        """CREATE TABLE IF NOT EXISTS user_order_stats (
+               user_id VARCHAR(50) PRIMARY KEY,
+               total_orders INT NOT NULL DEFAULT 0,
+               completed_orders INT NOT NULL DEFAULT 0,
+               rejected_orders INT NOT NULL DEFAULT 0,
+               pending_orders INT NOT NULL DEFAULT 0,
+               updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+           ) ENGINE = InnoDB""",
+    ]),
+    (2, "composite indexes for per-user order & assignment lookups", [
+        add_index('orders', 'idx_orders_user_status', ('user_id', 'status')),
+        add_index('orders', 'idx_orders_user_created', ('user_id', 'channel_creation_time')),
+        add_index('assignments', 'idx_assignments_user_status', ('user_id', 'status')),
+        add_index('assignments', 'idx_assignments_user_recommend', ('user_id', 'recommend_time')),
+    ]),
+    (3, "pre-created order channel pool", [
+        """CREATE TABLE IF NOT EXISTS channel_pool (
+               channel_id VARCHAR(50) PRIMARY KEY,
+               channel_name VARCHAR(80) NOT NULL,
+               created_at INT NOT NULL,
+               claimed_at INT,
+               claimed_by VARCHAR(50),
+               INDEX (claimed_at, created_at)
+           ) ENGINE = InnoDB""",
+    ]),
+    (4, "index for the matcher's per-task assignment lookups", [
+        add_index('assignments', 'idx_assignments_task', ('task_id',)),
+    ]),
+    (5, "index for the incremental reliability update's recent submitters", [
+        add_index('assignments', 'idx_assignments_submission', ('submission_time', 'user_id')),
+    ]),
+    (6, "indexed task expiry time (read paths stop updating tasks.expired)", [
+        add_column('tasks', 'expires_at', "DATETIME AS (start_time + INTERVAL time_window MINUTE) STORED"),
+        add_index('tasks', 'idx_tasks_expires', ('expires_at',)),
+    ]),
+    # expires_at alone matches every task that ever expired; with `expired` first
+    # the sweep only reads tasks not yet flagged (idx_tasks_expires still serves open-task reads)
+    (7, "index for the expiry sweep over not-yet-expired tasks", [
+        add_index('tasks', 'idx_tasks_expired_expires', ('expired', 'expires_at')),
+    ]),
+    # Migration 1 created user_order_stats empty; also corrects rows that new orders
+    # started (1 total, 1 pending) for users whose older orders were never counted
+    (8, "backfill per-user order stats from existing orders", [
+        order_stats.backfill,
+    ]),
+    # Set on insert and on every change (accept / reject / submit / delete), so the incremental
+    # reliability update also picks up users whose assignment status changed without a submission
+    (9, "assignment change time for the incremental reliability update", [
+        add_column('assignments', 'updated_at', "TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP"),
+        add_index('assignments', 'idx_assignments_updated', ('updated_at', 'user_id')),
+    ]),
+    (10, "report cache versions shared between processes", [
+        """CREATE TABLE IF NOT EXISTS report_versions (
+               user_id VARCHAR(50) PRIMARY KEY,
+               version INT NOT NULL DEFAULT 0
+           ) ENGINE = InnoDB""",
+    ]),
+]
+
+
+### ### RUNNER ### ###
+def _ensure_migrations_table(cursor):
+    cursor.execute(
+        """CREATE TABLE IF NOT EXISTS schema_migrations (
+               version INT PRIMARY KEY,
+               description VARCHAR(200),
+               applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+           ) ENGINE = InnoDB"""
+    )
+
+def _applied_versions(cursor):
+    cursor.execute("SELECT version FROM schema_migrations")
+    return {row[0] for row in cursor.fetchall()}
+
+def apply_migrations(db_name=None):
+    """
+    Takes an optional database name.
+    Applies every migration not yet recorded in schema_migrations, in order,
+        then refreshes schema_registry if anything changed in its database.
+    Returns the list of versions applied (empty if already up to date).
+    """
+    applied_now = []
+    with helper_functions.connectDB(db_name or DB_NAME) as conn, conn.cursor() as cursor:
+        cursor.execute("SELECT GET_LOCK(%s, %s)", (MIGRATION_LOCK, MIGRATION_LOCK_TIMEOUT))
+        if cursor.fetchone()[0] != 1:
+            raise Exception("Could not get the schema migration lock, is another process migrating?")
+        try:
+            _ensure_migrations_table(cursor)
+            done = _applied_versions(cursor)
+            for version, description, steps in MIGRATIONS:
+                if version in done:
+                    continue
+                print(f"[MIGRATIONS] Applying {version}: {description}")
+                for step in steps:
+                    if callable(step):
+                        step(cursor)
+                    else:
+                        cursor.execute(step)
+                cursor.execute("INSERT INTO schema_migrations (version, description) VALUES (%s, %s)",
+                               (version, description))
+                conn.commit()
+                applied_now.append(version)
+        finally:
+            cursor.execute("SELECT RELEASE_LOCK(%s)", (MIGRATION_LOCK,))
+            cursor.fetchone()
+
+    # schema_registry caches the bot's database only (not e.g. a test database)
+    if applied_now and (db_name or DB_NAME) == schema_registry.DB_NAME:
+        schema_registry.refresh()
+    return applied_now
+
+def migration_status(db_name=None):
+    """Returns [(version, description, applied (bool)), ...] for every known migration."""
+    with helper_functions.connectDB(db_name or DB_NAME) as conn, conn.cursor() as cursor:
+        _ensure_migrations_table(cursor)
+        conn.commit()
+        done = _applied_versions(cursor)
+    return [(version, description, version in done) for version, description, _ in MIGRATIONS]
+
+
+### ### QUERY PLAN CHECK ### ###
+# (name, tables it must not fully scan, query, sample parameters)
+HOT_QUERIES = [
+    ("orders by user & status", ('orders',),
+     "SELECT COUNT(*) FROM orders WHERE user_id = %s AND status = 'completed'", ('U000',)),
+    ("recent orders by user", ('orders',),
+     """SELECT order_id, restaurant_name, status, channel_creation_time FROM orders
+        WHERE user_id = %s ORDER BY channel_creation_time DESC LIMIT 5""", ('U000',)),
+    ("assignments by user & status", ('assignments',),
+     "SELECT task_id FROM assignments WHERE user_id = %s AND `status` = 'pending'", ('U000',)),
+    ("open unassigned tasks", ('tasks', 'assignments'),
+     """SELECT tasks.id FROM tasks WHERE expires_at >= NOW()
+        AND NOT EXISTS (SELECT 1 FROM assignments WHERE assignments.task_id = tasks.id)""", ()),
+    ("expiry sweep", ('tasks',),
+     "SELECT id FROM tasks WHERE `expired` = 0 AND expires_at < NOW()", ()),
+    ("assignments by user & recommend time", ('assignments',),
+     """SELECT COUNT(status) FROM assignments
+        WHERE status = 'accepted' AND user_id = %s AND recommend_time >= CURDATE() - INTERVAL 1 DAY""", ('U000',)),
+    ("users with assignment changes since the last reliability update", ('assignments',),
+     "SELECT user_id FROM assignments WHERE updated_at >= NOW() - INTERVAL 30 MINUTE", ()),
+]
+
+def check_query_plans(db_name=None):
+    """
+    EXPLAINs every query in HOT_QUERIES.
+    Returns {query name: [tables read with a full table scan]}; an empty list
+        means the query is served by an index. Queries on tables that don't
+        exist in this database are left out.
+    """
+    results = {}
+    with helper_functions.connectDB(db_name or DB_NAME) as conn:
+        cursor = conn.cursor()
+        plan_cursor = conn.cursor(pymysql.cursors.DictCursor)
+        for name, tables, query, params in HOT_QUERIES:
+            if not all(table_exists(cursor, table) for table in tables):
+                continue
+            plan_cursor.execute("EXPLAIN " + query, params)
+            plan = plan_cursor.fetchall()
+            results[name] = [row['table'] for row in plan if row['table'] in tables and row['type'] == 'ALL']
+    return results
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else 'apply'
+    if command == 'apply':
+        applied = apply_migrations()
+        print(f"Applied migrations: {applied}" if applied else "Schema is up to date.")
+    elif command == 'status':
+        for version, description, applied in migration_status():
+            print(f"{version:>4}  {'applied' if applied else 'PENDING':<8} {description}")
+    elif command == 'explain':
+        full_scans = check_query_plans()
+        for name, tables in full_scans.items():
+            print(f"{'FULL SCAN' if tables else 'ok':<10} {name} {tables if tables else ''}")
+        sys.exit(1 if any(full_scans.values()) else 0)
+    else:
+        print(__doc__)
+        sys.exit(2)
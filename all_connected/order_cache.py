@@ -0,0 +1,119 @@
+"""
+Date: 10/18/2026
+Description: Write-through in-process cache of `orders` rows keyed by channel_id.
+    One verification click used to re-read the same order row several times;
+    with this cache the row is read once and kept in sync by update_order().
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from dotenv import load_dotenv
+env_path = Path(__file__).parent.parent / '.env'
+load_dotenv(env_path)
+
+### ### SETTINGS ### ###
+ORDER_CACHE_TTL = int(os.environ.get('ORDER_CACHE_TTL', 600))    # seconds before a row is re-read from the database
+ORDER_CACHE_SIZE = int(os.environ.get('ORDER_CACHE_SIZE', 1000))  # open orders kept in memory
+
+
+class OrderCache:
+    """
+    channel_id -> order row (dict). Rows are loaded on first use, patched in
+    place after each successful write and re-read once they are older than
+    `ttl` seconds. Tracks hit ratio and how old (stale) served rows were.
+    Loaders take generation() before reading the database and pass it to
+    store(), so a row read before an update / invalidation is never cached
+    after it (the update would otherwise be lost for the whole ttl).
+    """
+    def __init__(self, ttl=ORDER_CACHE_TTL, max_size=ORDER_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._rows = OrderedDict()  # channel_id -> (row, loaded_at)
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'write_throughs': 0, 'invalidations': 0,
+                       'discarded_stores': 0, 'total_staleness': 0.0, 'max_staleness': 0.0}
+
+    def get(self, channel_id, loader):
+        """
+        Takes a channel id (str) and a loader function (channel_id -> row or None).
+        Returns a copy of the cached row, loading it on a miss or once it expired.
+        """
+        row = self.peek(channel_id)
+        if row is None:
+            generation = self.generation()
+            row = loader(channel_id)
+            self.store(channel_id, row, generation)
+        return row
+
+    def generation(self):
+        """Returns the write counter to pass to store() for a row about to be loaded."""
+        with self._lock:
+            return self._generation
+
+    def peek(self, channel_id):
+        """
+        Takes a channel id (str).
+        Returns a copy of the cached row, or None on a miss (counted in the stats).
+        Lets callers that load rows themselves (e.g. the async bot) use the cache.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._rows.get(channel_id)
+            if entry is not None and now - entry[1] <= self.ttl:
+                row, loaded_at = entry
+                staleness = now - loaded_at
+                self._rows.move_to_end(channel_id)
+                self._stats['hits'] += 1
+                self._stats['total_staleness'] += staleness
+                self._stats['max_staleness'] = max(self._stats['max_staleness'], staleness)
+                return dict(row)
+            self._stats['misses'] += 1
+        return None
+
+    def store(self, channel_id, row, generation):
+        """
+        Takes a channel id, a freshly loaded row (ignored if None) and the
+            generation() taken before loading it.
+        Caches a copy unless an order was updated or invalidated in the meantime.
+        """
+        if row is not None:
+            with self._lock:
+                if generation != self._generation:
+                    self._stats['discarded_stores'] += 1
+                    return
+                self._rows[channel_id] = (dict(row), time.monotonic())
+                self._rows.move_to_end(channel_id)
+                while len(self._rows) > self.max_size:
+                    self._rows.popitem(last=False)
+
+    def apply_update(self, channel_id, updates):
+        """Takes a channel id and the column values just written. Patches the cached row, if any."""
+        with self._lock:
+            entry = self._rows.get(channel_id)
+            if entry is not None:
+                entry[0].update(updates)
+                self._stats['write_throughs'] += 1
+            self._generation += 1
+
+    def invalidate(self, channel_id=None):
+        """Drops one cached row, or every row when no channel id is given."""
+        with self._lock:
+            if channel_id is None:
+                self._rows.clear()
+            else:
+                self._rows.pop(channel_id, None)
+            self._generation += 1
+            self._stats['invalidations'] += 1
+
+    def stats(self):
+        """Returns a snapshot (dict) of hits, misses, hit ratio and staleness of served rows."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = len(self._rows)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = stats['hits'] / lookups if lookups else 0.0
+        stats['avg_staleness'] = stats['total_staleness'] / stats['hits'] if stats['hits'] else 0.0
+        return stats
@@ -0,0 +1,111 @@
+"""
+Date: 10/18/2026
+Description: Per-user order counts kept in the `user_order_stats` table.
+    The counts are adjusted in the same transaction as every order insert /
+    status change, so reading a user's stats is a primary-key lookup instead
+    of counting over the whole orders table. rebuild() recomputes the table
+    from scratch and reports any drift.
+"""
+import os
+import pymysql
+from pathlib import Path
+from dotenv import load_dotenv
+env_path = Path(__file__).parent.parent / '.env'
+load_dotenv(env_path)
+
+import helper_functions
+
+DB_NAME = os.environ.get('DB_NAME')
+FINAL_STATUSES = ('completed', 'rejected')   # every other order status counts as pending
+STAT_COLUMNS = ('total_orders', 'completed_orders', 'rejected_orders', 'pending_orders')
+
+
+# Statements are module constants so the sync and async bots share them
+NEW_ORDER_SQL = """INSERT INTO user_order_stats (user_id, total_orders, pending_orders) VALUES (%s, 1, 1)
+                   ON DUPLICATE KEY UPDATE total_orders = total_orders + 1, pending_orders = pending_orders + 1"""
+
+STATUS_CHANGE_SQL = """UPDATE user_order_stats INNER JOIN orders ON orders.user_id = user_order_stats.user_id
+           SET user_order_stats.completed_orders = user_order_stats.completed_orders + (%s = 'completed') - (orders.status = 'completed'),
+               user_order_stats.rejected_orders = user_order_stats.rejected_orders + (%s = 'rejected') - (orders.status = 'rejected'),
+               user_order_stats.pending_orders = user_order_stats.pending_orders
+                   + (%s NOT IN ('completed', 'rejected')) - (orders.status NOT IN ('completed', 'rejected'))
+           WHERE orders.channel_id = %s AND orders.status <> %s"""
+
+# Every user's counts recomputed from the orders table (rebuild() & the backfill in migration 1)
+EXPECTED_STATS_SQL = """SELECT user_id,
+                               COUNT(*) AS total_orders,
+                               SUM(status = 'completed') AS completed_orders,
+                               SUM(status = 'rejected') AS rejected_orders,
+                               SUM(status NOT IN ('completed', 'rejected')) AS pending_orders
+                        FROM orders WHERE user_id IS NOT NULL GROUP BY user_id"""
+
+def status_change_params(channel_id, new_status):
+    """Returns the parameters for STATUS_CHANGE_SQL"""
+    return (new_status, new_status, new_status, channel_id, new_status)
+
+def record_new_order(cursor, user_id):
+    """
+    Takes an open cursor (inside the order INSERT's transaction) and a user id.
+    Counts one more pending order for that user.
+    """
+    cursor.execute(NEW_ORDER_SQL, (user_id,))
+
+def apply_status_change(cursor, channel_id, new_status):
+    """
+    Takes an open cursor, the order's channel id and the status it's about to get.
+    Moves the order from its current bucket (completed / rejected / pending) to
+        the new one. Must run before the orders UPDATE, in the same transaction,
+        since it reads the old status from the orders row.
+    """
+    cursor.execute(STATUS_CHANGE_SQL, status_change_params(channel_id, new_status))
+
+def get_user_stats(user_id):
+    """
+    Takes a user id (str).
+    Returns that user's counts (dict with STAT_COLUMNS), all 0 if they have no orders.
+    """
+    with helper_functions.connectDB(DB_NAME) as conn, conn.cursor(pymysql.cursors.DictCursor) as cursor:
+        cursor.execute(
+            f"SELECT {', '.join(STAT_COLUMNS)} FROM user_order_stats WHERE user_id = %s",
+            (user_id,)
+        )
+        row = cursor.fetchone()
+    return row or {column: 0 for column in STAT_COLUMNS}
+
+def backfill(cursor):
+    """
+    Takes an open cursor.
+    Sets every user's counts from their existing orders (migration step: the
+        table starts empty on databases that already have orders). Safe to re-run.
+    """
+    if not cursor.execute("SHOW TABLES LIKE 'orders'"):
+        return
+    cursor.execute(
+        f"""INSERT INTO user_order_stats (user_id, {', '.join(STAT_COLUMNS)}) {EXPECTED_STATS_SQL}
+            ON DUPLICATE KEY UPDATE {', '.join(f'{c} = VALUES({c})' for c in STAT_COLUMNS)}"""
+    )
+
+def rebuild(db_name=None):
+    """
+    Recomputes user_order_stats from the orders table (reconciliation job).
+    Returns {'users': number of users with orders, 'drift': [{'user_id', 'expected', 'stored'}, ...]}
+        listing every user whose stored counts didn't match.
+    """
+    expected_query = EXPECTED_STATS_SQL
+    with helper_functions.connectDB(db_name or DB_NAME) as conn, conn.cursor(pymysql.cursors.DictCursor) as cursor:
+        cursor.execute(expected_query)
+        expected = {row['user_id']: {c: int(row[c]) for c in STAT_COLUMNS} for row in cursor.fetchall()}
+        cursor.execute(f"SELECT user_id, {', '.join(STAT_COLUMNS)} FROM user_order_stats")
+        stored = {row['user_id']: {c: int(row[c]) for c in STAT_COLUMNS} for row in cursor.fetchall()}
+
+        zero = {column: 0 for column in STAT_COLUMNS}
+        drift = [{'user_id': user_id, 'expected': expected.get(user_id, zero), 'stored': stored.get(user_id, zero)}
+                 for user_id in set(expected) | set(stored)
+                 if expected.get(user_id, zero) != stored.get(user_id, zero)]
+
+        # Replace the table contents in one transaction
+        cursor.execute("DELETE FROM user_order_stats")
+        cursor.execute(f"INSERT INTO user_order_stats (user_id, {', '.join(STAT_COLUMNS)}) {expected_query}")
+        conn.commit()
+
+    return {'users': len(expected), 'drift': drift}
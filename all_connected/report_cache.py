@@ -0,0 +1,141 @@
+"""
+Date: 10/18/2026
+Description: In-process cache of rendered "my tasks" report blocks keyed by
+    user id. A report only changes when one of the user's assignments is
+    accepted / rejected / submitted, a task expires or new tasks are sent, so
+    messenger invalidates it on exactly those writes (update_assign_status,
+    submit_task, delete_submission, expire_tasks). Those writes mostly run in
+    another process (connections) than the one serving reports, so
+    invalidations go through the `report_versions` table (migration 10): each
+    one bumps the user's row, or the '*' row for every user, and a cached
+    report is only served while both versions still match the ones it was
+    built under (one primary-key read instead of the report query). Every
+    entry also expires on its own after REPORT_CACHE_TTL seconds, or earlier
+    when one of the tasks it shows runs out of time. Imports no project module
+    but helper_functions, so messenger can import it.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from dotenv import load_dotenv
+env_path = Path(__file__).parent.parent / '.env'
+load_dotenv(env_path)
+
+import helper_functions
+
+### ### SETTINGS ### ###
+DB_NAME = os.environ.get('DB_NAME')
+REPORT_CACHE_TTL = int(os.environ.get('REPORT_CACHE_TTL', 300))     # seconds before a report is rebuilt anyway
+REPORT_CACHE_SIZE = int(os.environ.get('REPORT_CACHE_SIZE', 1000))  # users' reports kept in memory
+ALL_USERS = '*'                                                     # report_versions row bumped by invalidate()
+
+
+class ReportCache:
+    """
+    user_id -> report blocks (list). Builders take versions() before reading
+    the database and pass the user's version to store(); peek() only serves an
+    entry built under the user's current version, so a report read before an
+    invalidation (by any process) is never served after it. Entries are also
+    dropped after `ttl` seconds or their own expiry (whichever comes first).
+    """
+    def __init__(self, ttl=REPORT_CACHE_TTL, max_size=REPORT_CACHE_SIZE, db_name=None):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.db_name = db_name or DB_NAME
+        self._reports = OrderedDict()  # user_id -> (blocks, version, expires_at (monotonic))
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'invalidations': 0, 'expired': 0, 'outdated': 0}
+
+    def versions(self, user_ids):
+        """
+        Takes user ids (list of str).
+        Returns {user_id: (user's version, all users' version)} from report_versions
+            in one query, to pass to peek() / store().
+        """
+        user_ids = list(user_ids)
+        if not user_ids:
+            return {}
+        with helper_functions.connectDB(self.db_name) as conn, conn.cursor() as cursor:
+            placeholders = ", ".join(["%s"] * (len(user_ids) + 1))
+            cursor.execute(f"SELECT user_id, version FROM report_versions WHERE user_id IN ({placeholders})",
+                           user_ids + [ALL_USERS])
+            found = dict(cursor.fetchall())
+        everyone = found.get(ALL_USERS, 0)
+        return {user_id: (found.get(user_id, 0), everyone) for user_id in user_ids}
+
+    def version(self, user_id):
+        """Same as versions() for a single user. Returns (user's version, all users' version)."""
+        return self.versions([user_id])[user_id]
+
+    def peek(self, user_id, version):
+        """
+        Takes a user id (str) and its current version (from version()).
+        Returns a copy of the cached report blocks, or None on a miss /
+            expired entry / entry built under an older version.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._reports.get(user_id)
+            if entry is not None and entry[1] == version and now < entry[2]:
+                self._reports.move_to_end(user_id)
+                self._stats['hits'] += 1
+                return list(entry[0])
+            if entry is not None:
+                del self._reports[user_id]
+                self._stats['expired' if entry[1] == version else 'outdated'] += 1
+            self._stats['misses'] += 1
+        return None
+
+    def store(self, user_id, blocks, version, expires_in=None):
+        """
+        Takes a user id, its freshly built report blocks, the version taken
+            before building them and optionally the seconds until the report's
+            content changes by itself (e.g. its first task expiring).
+        Caches a copy; peek() drops it once the version moved on.
+        """
+        ttl = self.ttl if expires_in is None else min(self.ttl, expires_in)
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._reports[user_id] = (list(blocks), version, time.monotonic() + ttl)
+            self._reports.move_to_end(user_id)
+            while len(self._reports) > self.max_size:
+                self._reports.popitem(last=False)
+
+    def invalidate(self, user_id=None):
+        """
+        Drops one user's report, or every report when no user id is given,
+            here and (through report_versions) in every other process.
+        """
+        with self._lock:
+            if user_id is None:
+                self._reports.clear()
+            else:
+                self._reports.pop(user_id, None)
+            self._stats['invalidations'] += 1
+        try:
+            with helper_functions.connectDB(self.db_name) as conn, conn.cursor() as cursor:
+                cursor.execute(
+                    """INSERT INTO report_versions (user_id, version) VALUES (%s, 1)
+                       ON DUPLICATE KEY UPDATE version = version + 1""",
+                    (ALL_USERS if user_id is None else user_id,)
+                )
+                conn.commit()
+        except Exception as e:
+            # Other processes still drop the report once its TTL runs out
+            print(f"[REPORT CACHE] Could not record invalidation of {user_id or 'all reports'}: {e}")
+
+    def stats(self):
+        """Returns a snapshot (dict) of hits, misses, hit ratio, invalidations and size."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = len(self._reports)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
+
+
+# Shared by workspace (reads) and messenger (invalidation)
+reports = ReportCache()
@@ -0,0 +1,107 @@
+"""
+Date: 10/18/2026
+Description: Column names of our tables, read from information_schema once and
+    kept in memory, plus cached parameterized UPDATE/INSERT statements per
+    column set. Replaces running `SHOW COLUMNS` on every write. Call refresh()
+    after changing the schema (e.g. after a migration).
+"""
+import os
+import threading
+from pathlib import Path
+from dotenv import load_dotenv
+env_path = Path(__file__).parent.parent / '.env'
+load_dotenv(env_path)
+
+import helper_functions
+
+### ### SETTINGS ### ###
+DB_NAME = os.environ.get('DB_NAME')
+DEFAULT_TABLES = ('orders', 'tasks')   # tables loaded at startup
+
+_columns = {}      # table -> tuple of column names, in table order
+_statements = {}   # (kind, table, columns, key_column) -> SQL string
+_lock = threading.Lock()
+
+
+def load(tables=DEFAULT_TABLES, db_name=None):
+    """
+    Takes table names (iterable of str) and optionally a database name.
+    Reads their columns in one information_schema query and stores them.
+    Returns {table: columns}.
+    """
+    tables = tuple(tables)
+    with helper_functions.connectDB(db_name or DB_NAME) as conn, conn.cursor() as cursor:
+        placeholders = ", ".join(["%s"] * len(tables))
+        cursor.execute(
+            f"""SELECT TABLE_NAME, COLUMN_NAME FROM information_schema.COLUMNS
+                WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME IN ({placeholders})
+                ORDER BY TABLE_NAME, ORDINAL_POSITION""",
+            tables
+        )
+        rows = cursor.fetchall()
+
+    loaded = {table: [] for table in tables}
+    for table, column in rows:
+        loaded[table].append(column)
+    with _lock:
+        for table, columns in loaded.items():
+            _columns[table] = tuple(columns)
+    return {table: tuple(columns) for table, columns in loaded.items()}
+
+def refresh(tables=None):
+    """
+    Forgets the cached columns & statements and reloads them (all known tables
+    by default). Call after a schema migration.
+    """
+    with _lock:
+        tables = tuple(tables or _columns or DEFAULT_TABLES)
+        for table in tables:
+            _columns.pop(table, None)
+        _statements.clear()
+    return load(tables)
+
+def get_columns(table):
+    """Takes a table name (str). Returns its column names (tuple), loading them on first use."""
+    with _lock:
+        columns = _columns.get(table)
+    if columns is None:
+        columns = load((table,))[table]
+    return columns
+
+def filter_columns(table, values):
+    """
+    Takes a table name and a dict of column -> value.
+    Returns a dict with only the keys that are real columns of that table.
+    """
+    columns = set(get_columns(table))
+    return {k: v for k, v in values.items() if k in columns}
+
+def update_statement(table, columns, key_column):
+    """
+    Takes a table name, the columns being set (tuple) and the WHERE column.
+    Returns the parameterized UPDATE, built once per column set.
+        Parameters: the new values in `columns` order, then the key value.
+    """
+    cache_key = ('update', table, tuple(columns), key_column)
+    statement = _statements.get(cache_key)
+    if statement is None:
+        set_clause = ", ".join([f"`{column}` = %s" for column in columns])
+        statement = f"UPDATE `{table}` SET {set_clause} WHERE `{key_column}` = %s"
+        with _lock:
+            _statements[cache_key] = statement
+    return statement
+
+def insert_statement(table, columns):
+    """
+    Takes a table name and the columns being inserted (tuple).
+    Returns the parameterized single-row INSERT, built once per column set.
+    """
+    cache_key = ('insert', table, tuple(columns), None)
+    statement = _statements.get(cache_key)
+    if statement is None:
+        column_list = ", ".join([f"`{column}`" for column in columns])
+        placeholders = ", ".join(["%s"] * len(columns))
+        statement = f"INSERT INTO `{table}` ({column_list}) VALUES ({placeholders})"
+        with _lock:
+            _statements[cache_key] = statement
+    return statement
@@ -0,0 +1,353 @@
+"""
+Date: 10/18/2026
+Description: Central outbound queue for Slack Web API calls (chat.postMessage,
+    chat.update, ...) made by the bot. Calls are queued in priority lanes
+    (replies to a user's click ahead of broadcasts), sent by a few worker
+    threads within per-method token buckets, retried after Slack's
+    Retry-After on HTTP 429, and kept in order per channel. Consecutive
+    queued posts to the same channel are merged into one multi-block
+    message. stats() exposes queue depth and send latency.
+"""
+import os
+import bisect
+import itertools
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from pathlib import Path
+from dotenv import load_dotenv
+from slack_sdk.errors import SlackApiError
+env_path = Path(__file__).parent.parent / '.env'
+load_dotenv(env_path)
+
+### ### SETTINGS ### ###
+DISPATCH_WORKERS = int(os.environ.get('SLACK_DISPATCH_WORKERS', 4))   # calls in flight at the same time
+MAX_RETRIES = 5                # 429 retries before a call is given up
+MAX_BLOCKS_PER_MESSAGE = 50    # Slack's limit, coalesced posts stop there
+RECENT_SENDS_KEPT = 500        # latencies kept for stats()
+
+# Priority lanes, lower is sent first
+INTERACTIVE = 0   # replies to something the user just did
+BROADCAST = 1     # welcome messages, announcements, task fan-out
+LANES = {INTERACTIVE: 'interactive', BROADCAST: 'broadcast'}
+
+# Posts with these blocks are never merged: chat.update / the Submit button act on their whole message
+INTERACTIVE_BLOCKS = {'actions', 'input'}
+
+# method -> (calls per second, burst). Slack tiers: chat.update is Tier 3 (~50/min),
+# chat.postMessage is "special" (about 1/s per channel, bursts allowed).
+METHOD_LIMITS = {
+    'chat.postMessage': (float(os.environ.get('SLACK_POST_RATE', 10)), 20),
+    'chat.update': (50 / 60, 10),
+    'conversations.create': (20 / 60, 5),
+    'conversations.invite': (50 / 60, 10),
+}
+DEFAULT_LIMIT = (20 / 60, 5)     # Tier 2, for methods not listed above
+CHANNEL_POST_LIMIT = (1.0, 3)    # chat.postMessage per channel
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, holding at most `burst`."""
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _fill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def delay(self):
+        """Returns the seconds until a token is available (0 if one is available now)."""
+        with self._lock:
+            self._fill(time.monotonic())
+            return 0.0 if self._tokens >= 1 else (1 - self._tokens) / self.rate
+
+    def reserve(self):
+        """Takes a token, going into debt if needed. Returns the seconds the caller must wait before using it."""
+        with self._lock:
+            self._fill(time.monotonic())
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def pause(self, seconds):
+        """Empties the bucket so no token is available for `seconds` (after a 429)."""
+        with self._lock:
+            self._fill(time.monotonic())
+            self._tokens = min(self._tokens, -seconds * self.rate)
+
+    def is_idle(self):
+        with self._lock:
+            self._fill(time.monotonic())
+            return self._tokens >= self.burst
+
+
+class _Call:
+    """One queued API call (possibly carrying posts merged into it)."""
+    def __init__(self, seq, method, kwargs, priority, coalesce):
+        self.seq = seq
+        self.method = method
+        self.kwargs = kwargs
+        self.priority = priority
+        self.coalesce = coalesce
+        self.channel = kwargs.get('channel')
+        self.order_key = self.channel or f"#{seq}"   # calls without a channel aren't ordered
+        self.future = Future()
+        self.merged = []                             # calls coalesced into this one
+        self.submitted_at = time.monotonic()
+        self.not_before = 0.0
+        self.attempts = 0
+
+    def __lt__(self, other):
+        return self.seq < other.seq
+
+    def blocks(self):
+        blocks = self.kwargs.get('blocks')
+        if blocks:
+            return list(blocks)
+        return [{"type": "section", "text": {"type": "mrkdwn", "text": self.kwargs.get('text') or " "}}]
+
+    def can_merge(self, other):
+        """A plain post (channel, text, blocks only) can absorb the next plain post to the same channel."""
+        plain = {'channel', 'text', 'blocks'}
+        return (self.method == other.method == 'chat.postMessage' and self.coalesce and other.coalesce
+                and self.channel == other.channel and set(self.kwargs) <= plain and set(other.kwargs) <= plain
+                and len(self.blocks()) + len(other.blocks()) <= MAX_BLOCKS_PER_MESSAGE)
+
+    def merge(self, other):
+        texts = [t for t in (self.kwargs.get('text'), other.kwargs.get('text')) if t]
+        self.kwargs = {'channel': self.channel, 'text': "\n".join(texts), 'blocks': self.blocks() + other.blocks()}
+        self.merged.append(other)
+
+
+class SlackDispatcher:
+    """
+    Queue + worker threads in front of a slack_sdk WebClient. Every submit
+    returns a concurrent.futures.Future resolved with the SlackResponse (or
+    the SlackApiError); callers that don't need the response can ignore it.
+    """
+    def __init__(self, client, workers=DISPATCH_WORKERS):
+        self.client = client
+        self.workers = max(workers, 1)
+        self._pending = []            # _Call, sorted by seq
+        self._in_flight = set()       # order keys (channels) with a call being sent
+        self._cond = threading.Condition()
+        self._seq = itertools.count()
+        self._threads = []
+        self._method_buckets = {}
+        self._channel_buckets = {}
+        self._latencies = deque(maxlen=RECENT_SENDS_KEPT)
+        self._stats = {'submitted': 0, 'api_calls': 0, 'sent': 0, 'coalesced': 0,
+                       'rate_limited': 0, 'retries': 0, 'failed': 0}
+
+    def start(self):
+        """Starts the worker threads (only once)."""
+        with self._cond:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f"slack-dispatch-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    ### Submitting ###
+    def submit(self, method, priority=INTERACTIVE, coalesce=False, **kwargs):
+        """
+        Takes a Web API method name ('chat.postMessage'), a lane and the call's arguments.
+        Queues the call. Returns a Future for its SlackResponse.
+        """
+        self.start()
+        with self._cond:
+            call = _Call(next(self._seq), method, kwargs, priority, coalesce)
+            self._pending.append(call)
+            self._stats['submitted'] += 1
+            self._cond.notify()
+        return call.future
+
+    def post_message(self, channel, text=None, blocks=None, priority=INTERACTIVE, coalesce=True, **kwargs):
+        """
+        Queues a chat.postMessage. Pass coalesce=False for messages that must
+        stay on their own (e.g. input prompts, whose submit button reads the
+        message's state); posts with buttons or inputs are never coalesced.
+        """
+        if blocks and any(block.get('type') in INTERACTIVE_BLOCKS for block in blocks):
+            coalesce = False
+        kwargs = dict(kwargs, channel=channel)
+        if text is not None:
+            kwargs['text'] = text
+        if blocks is not None:
+            kwargs['blocks'] = blocks
+        return self.submit('chat.postMessage', priority=priority, coalesce=coalesce, **kwargs)
+
+    def update_message(self, channel, ts, text=None, blocks=None, priority=INTERACTIVE, **kwargs):
+        """Queues a chat.update of an existing message."""
+        kwargs = dict(kwargs, channel=channel, ts=ts)
+        if text is not None:
+            kwargs['text'] = text
+        if blocks is not None:
+            kwargs['blocks'] = blocks
+        return self.submit('chat.update', priority=priority, **kwargs)
+
+    def fan_out(self, user_ids, blocks=None, text=None, priority=BROADCAST, timeout=None):
+        """
+        Takes user ids (any iterable, duplicates are sent once), the message
+        blocks (or a function user_id -> blocks) and the notification text.
+        DMs every user through the queue, so the sends run concurrently within
+        the rate limits, and waits for all of them (up to `timeout` seconds).
+        Returns a delivery report:
+            {'sent': n, 'failed': n, 'seconds': s,
+             'users': {user_id: {'ok': bool, 'ts': message ts or None, 'error': str or None}}}
+        """
+        start = time.monotonic()
+        futures = {}
+        for user_id in dict.fromkeys(user_ids):
+            user_blocks = blocks(user_id) if callable(blocks) else blocks
+            futures[user_id] = self.post_message(user_id, text=text, blocks=user_blocks,
+                                                 priority=priority, coalesce=False)
+
+        deadline = None if timeout is None else start + timeout
+        report = {'sent': 0, 'failed': 0, 'users': {}}
+        for user_id, future in futures.items():
+            try:
+                remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+                response = future.result(timeout=remaining)
+                report['users'][user_id] = {'ok': True, 'ts': response.get('ts'), 'error': None}
+                report['sent'] += 1
+            except SlackApiError as e:
+                report['users'][user_id] = {'ok': False, 'ts': None, 'error': e.response.get('error', str(e))}
+                report['failed'] += 1
+            except Exception as e:
+                report['users'][user_id] = {'ok': False, 'ts': None, 'error': str(e) or type(e).__name__}
+                report['failed'] += 1
+        report['seconds'] = time.monotonic() - start
+        return report
+
+    ### Workers ###
+    def _method_bucket(self, method):
+        bucket = self._method_buckets.get(method)
+        if bucket is None:
+            bucket = self._method_buckets[method] = TokenBucket(*METHOD_LIMITS.get(method, DEFAULT_LIMIT))
+        return bucket
+
+    def _channel_bucket(self, channel):
+        bucket = self._channel_buckets.get(channel)
+        if bucket is None:
+            if len(self._channel_buckets) > 1000:
+                for idle in [c for c, b in self._channel_buckets.items() if b.is_idle()]:
+                    del self._channel_buckets[idle]
+            bucket = self._channel_buckets[channel] = TokenBucket(*CHANNEL_POST_LIMIT)
+        return bucket
+
+    def _next_call(self, now):
+        """
+        Caller holds the lock. Returns (call, None) for the highest-priority
+        call that may go now, or (None, seconds to wait) if none can.
+        Only the oldest pending call of each channel is eligible, and not
+        while another call to that channel is in flight.
+        """
+        oldest = {}
+        for call in self._pending:
+            oldest.setdefault(call.order_key, call)
+        best, wake = None, None
+        for key, call in oldest.items():
+            if key in self._in_flight:
+                continue
+            wait = call.not_before - now
+            if call.method == 'chat.postMessage' and call.channel:
+                wait = max(wait, self._channel_bucket(call.channel).delay())
+            if wait > 0:
+                wake = wait if wake is None else min(wake, wait)
+            elif best is None or (call.priority, call.seq) < (best.priority, best.seq):
+                best = call
+        return best, wake
+
+    def _take(self, call):
+        """Caller holds the lock. Removes the call from the queue, folding in the posts that follow it."""
+        self._pending.remove(call)
+        for later in [c for c in self._pending if c.order_key == call.order_key]:
+            if not call.can_merge(later):
+                break
+            call.merge(later)
+            self._pending.remove(later)
+            self._stats['coalesced'] += 1
+        if call.method == 'chat.postMessage' and call.channel:
+            self._channel_bucket(call.channel).reserve()
+        self._in_flight.add(call.order_key)
+
+    def _work(self):
+        while True:
+            with self._cond:
+                while True:
+                    call, wake = self._next_call(time.monotonic())
+                    if call:
+                        break
+                    self._cond.wait(wake)
+                self._take(call)
+            self._send(call)
+
+    def _send(self, call):
+        bucket = self._method_bucket(call.method)
+        time.sleep(bucket.reserve())
+        call.attempts += 1
+        retry_after = None
+        try:
+            response = getattr(self.client, call.method.replace('.', '_'))(**call.kwargs)
+            error = None
+        except SlackApiError as e:
+            response, error = None, e
+            if e.response is not None and e.response.status_code == 429 and call.attempts <= MAX_RETRIES:
+                retry_after = float(e.response.headers.get('Retry-After', 1))
+        except Exception as e:
+            response, error = None, e
+
+        with self._cond:
+            self._in_flight.discard(call.order_key)
+            self._stats['api_calls'] += 1
+            if retry_after is not None:
+                # Slack rate limits per method, so hold every call of this method
+                bucket.pause(retry_after)
+                call.not_before = time.monotonic() + retry_after
+                bisect.insort(self._pending, call)
+                self._stats['rate_limited'] += 1
+                self._stats['retries'] += 1
+                print(f"[SLACK DISPATCH] {call.method} rate limited, retrying in {retry_after:.0f}s")
+            else:
+                done = time.monotonic()
+                for sent in [call] + call.merged:
+                    self._latencies.append(done - sent.submitted_at)
+                self._stats['sent' if error is None else 'failed'] += 1 + len(call.merged)
+            self._cond.notify_all()
+
+        if retry_after is None:
+            for sent in [call] + call.merged:
+                if error is None:
+                    sent.future.set_result(response)
+                else:
+                    sent.future.set_exception(error)
+            if error is not None:
+                print(f"[SLACK DISPATCH] {call.method} to {call.channel} failed: {error}")
+
+    ### Metrics ###
+    def queue_depth(self):
+        """Returns {lane name: calls waiting}."""
+        with self._cond:
+            depth = {name: 0 for name in LANES.values()}
+            for call in self._pending:
+                lane = LANES.get(call.priority, str(call.priority))
+                depth[lane] = depth.get(lane, 0) + 1
+            return depth
+
+    def stats(self):
+        """Returns a snapshot (dict) of counters, queue depth per lane and send latency (submit -> sent)."""
+        depth = self.queue_depth()
+        with self._cond:
+            stats = dict(self._stats)
+            stats['in_flight'] = len(self._in_flight)
+            latencies = sorted(self._latencies)
+        stats['queue_depth'] = depth
+        stats['avg_latency'] = sum(latencies) / len(latencies) if latencies else 0.0
+        stats['p95_latency'] = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] if latencies else 0.0
+        return stats
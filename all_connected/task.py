@@ -6,6 +6,7 @@ Description: All functions for the Task Generation Component.
 import random
 import json
 import helper_functions
+import schema_registry
 import task_parameters
 from datetime import datetime, timedelta, time, date
 import pandas as pd 
@@ -21,12 +22,15 @@ START_HOURS = task_parameters.START_HOURS
 END_HOURS = task_parameters.END_HOURS
 TASK_TIMEWINDOW = task_parameters.TASK_TIMEWINDOW # in minutes
 TASK_COMP = task_parameters.TASK_COMP # in points
+INSERT_CHUNK_SIZE = task_parameters.INSERT_CHUNK_SIZE # rows per INSERT statement
 
 TASK_LOCATION_FILE = f'data/task_locations.json' #json file in data folder with an array of "sorted" locations
 TASK_DESCRIPTION_FILE = f'data/task_descriptions.json' # file with an array of strings of task decriptions
 
 DB_NAME = os.environ.get('DB_NAME') # what does this do?
 
+TASK_COLUMNS = ('location', 'time_window', 'compensation', 'expired', 'description', 'start_time') # columns set by insert_tasks()
+
 ### ### HELPER FUNCTIONS ### ###
 def random_datetime(n):
     """
@@ -85,29 +89,19 @@ def create_task(locations, all_descriptions):
             'description': f'At {location} in the Science Center, {random.choice(all_descriptions)}'}
 
 
-def insert_tasks(db, tasks_list, start_times):
+def insert_tasks(db, tasks_list, start_times, chunk_size=None):
     """
      * Helper function for generate_tasks() *
-    Takes a list of tasks and database (obj).
-    Inserts the tasks into the database given. 
-    Returns nothing.
+    Takes a list of tasks and database (obj), optionally the rows per INSERT
+        (default task_parameters.INSERT_CHUNK_SIZE).
+    Inserts the tasks into the database given in one transaction. 
+    Returns the number of rows inserted.
     """
-    # Connect to database & a cursor object
-    cursor = db.cursor()
-    cursor.execute(f"SHOW COLUMNS FROM tasks FROM {DB_NAME}")
-    columns = cursor.fetchall()
-    #print("insert", start_times)
-    for i, task in enumerate(tasks_list):
-        #print("start time type:", type(start_times[i]))
-        # Create & execute query
-        query = f"INSERT INTO tasks (`location`, time_window, compensation, expired, `description`, start_time) \
-                    VALUES ('{task['location']}', {task['time_window']}, {task['compensation']}, \
-                    {task['expired']}, '{task['description']}', '{start_times[i]}')"
-        
-        cursor.execute(query)
-
-        # Commit the changes to the database
-        db.commit()
+    # Only insert keys that are real columns (checked against the in-memory schema)
+    columns = [col for col in TASK_COLUMNS if col in schema_registry.get_columns('tasks')]
+    query = schema_registry.insert_statement('tasks', tuple(columns))
+    rows = [[dict(task, start_time=start_times[i])[col] for col in columns] for i, task in enumerate(tasks_list)]
+    return helper_functions.insert_rows(db, query, rows, chunk_size or INSERT_CHUNK_SIZE)
 
 
 
@@ -119,9 +113,6 @@ def generate_tasks(num_tasks, db_name):
     Creates those tasks & inserts them into the Tasks database.
     Returns nothing.
     """
-    # Open database connection
-    db = helper_functions.connectDB(db_name)
-
     # Get list of possible locations
     with open(TASK_LOCATION_FILE, 'r') as infile:
         locations_list = json.load(infile)
@@ -134,11 +125,9 @@ def generate_tasks(num_tasks, db_name):
     all_tasks = [create_task(locations_list, all_descriptions) for _ in range(num_tasks)]
     start_times = random_datetime(num_tasks)
 
-    # Insert those tasks objects into the Task database
-    insert_tasks(db, all_tasks, start_times)
-
-    # Close database connection
-    db.close()
+    # Insert those tasks objects into the Task database (connection returned to the pool afterwards)
+    with helper_functions.connectDB(db_name) as db:
+        insert_tasks(db, all_tasks, start_times)
 
 
 if __name__ == '__main__':
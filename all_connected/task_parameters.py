@@ -33,6 +33,9 @@ MESSENGER_BOT_CYCLE = 60*60+2   #in seconds. cycle where the slack bot send the
                                 #Default: 1 hour and 2 seconds.
                                     #Again, making sure all tasks are matched before we send them to users.
 
+EXPIRY_CYCLE = 60   #in seconds. cycle where tasks past their time window are marked expired.
+                    #Default: every minute. Read paths check tasks.expires_at themselves.
+
 
 
 TASK_TIMEWINDOW = (1, 100) #in minutes. the length of time allowed for finishing one task
@@ -40,10 +43,21 @@ TASK_TIMEWINDOW = (1, 100) #in minutes. the length of time allowed for finishing
 TASK_COMP = (2, 6) #in points. the range of compensation participants can get for finishing each task
                                     #Default: from 2 to 6 points, not including 6
 
+INSERT_CHUNK_SIZE = 500 #rows per multi-row INSERT when writing generated tasks & assignments
+                        #Default: 500. Each cycle is still written in a single transaction.
+
 
 ##### #####
 MATCHING_ALGO = matching_assignments.algorithm_random   #random matching algorithm
 # MATCHING_ALGO = matching_assignments.algorithm_weighted   #weighted random matching algorithm
+# MATCHING_ALGO = matching_assignments.algorithm_random_np     #same as algorithm_random, vectorized with NumPy
+# MATCHING_ALGO = matching_assignments.algorithm_weighted_np   #same as algorithm_weighted, vectorized with NumPy
+# MATCHING_ALGO = matching_assignments.algorithm_capacity      #optimal matching with a cap on tasks per user (needs scipy)
+
+MATCHING_USER_CAPACITY = None       #max tasks per user per matching cycle, for algorithm_capacity
+                                    #Default: None = just enough for every task (tasks / users, rounded up)
+MATCHING_CANDIDATES_PER_TASK = 32   #users each task can be matched with in algorithm_capacity (keeps the graph sparse)
+MATCHING_RELIABILITY_LEVELS = 10    #algorithm_capacity fills users' slots from the most reliable of this many levels down
 
 
 ##### #####
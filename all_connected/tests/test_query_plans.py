@@ -0,0 +1,80 @@
+"""
+Date: 10/18/2026
+Description: EXPLAINs the hot queries listed in migrations.HOT_QUERIES and
+    fails if any of them reads one of its tables with a full table scan.
+    Runs against a scratch schema named by TEST_DB_NAME (never DB_NAME, the
+    bot's database): it is created from data/create_tables.sql, migrated,
+    checked and dropped again. Skipped when TEST_DB_NAME is unset or MySQL
+    is not reachable. Run from all_connected/: python -m pytest tests
+"""
+import os
+import re
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import helper_functions
+import migrations
+
+TEST_DB_NAME = os.environ.get('TEST_DB_NAME')
+CREATE_TABLES_SQL = os.path.join(os.path.dirname(migrations.__file__), 'data', 'create_tables.sql')
+
+
+def schema_statements(path=CREATE_TABLES_SQL):
+    """
+    Takes the path of a schema file written for the mysql client.
+    Returns its statements, honouring DELIMITER changes and leaving out the
+        DROP / CREATE DATABASE and USE lines (the caller picks the database).
+    """
+    with open(path) as infile:
+        sql = re.sub(r'/\*.*?\*/', '', infile.read(), flags=re.S)
+    statements, current, delimiter = [], [], ';'
+    for line in sql.splitlines():
+        stripped = line.strip()
+        if stripped.upper().startswith('DELIMITER'):
+            delimiter = stripped.split()[1]
+            continue
+        if not stripped or stripped.startswith('--'):
+            continue
+        current.append(line)
+        if stripped.endswith(delimiter):
+            statement = "\n".join(current).strip()[:-len(delimiter)].strip()
+            current = []
+            if not re.match(r'(DROP|CREATE)\s+DATABASE|USE\s', statement, re.I):
+                statements.append(statement)
+    return statements
+
+
+@pytest.fixture(scope='module')
+def query_plans():
+    if not TEST_DB_NAME:
+        pytest.skip("TEST_DB_NAME is not set, no scratch database to EXPLAIN against")
+    if TEST_DB_NAME == migrations.DB_NAME:
+        pytest.fail("TEST_DB_NAME must not be the bot's DB_NAME, the test drops it")
+    try:
+        server = helper_functions._open_connection(None)
+    except Exception as e:
+        pytest.skip(f"MySQL is not reachable: {e}")
+
+    with server.cursor() as cursor:
+        cursor.execute(f"DROP DATABASE IF EXISTS `{TEST_DB_NAME}`")
+        cursor.execute(f"CREATE DATABASE `{TEST_DB_NAME}`")
+    try:
+        scratch = helper_functions._open_connection(TEST_DB_NAME)
+        with scratch.cursor() as cursor:
+            for statement in schema_statements():
+                cursor.execute(statement)
+        scratch.commit()
+        scratch.close()
+        migrations.apply_migrations(TEST_DB_NAME)
+        yield migrations.check_query_plans(TEST_DB_NAME)
+    finally:
+        helper_functions.get_pool(TEST_DB_NAME).close_all()
+        with server.cursor() as cursor:
+            cursor.execute(f"DROP DATABASE IF EXISTS `{TEST_DB_NAME}`")
+        server.close()
+
+
+def test_hot_queries_use_indexes(query_plans):
+    full_scans = {name: tables for name, tables in query_plans.items() if tables}
+    assert not full_scans, f"full table scans: {full_scans}"
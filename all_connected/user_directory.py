@@ -0,0 +1,108 @@
+"""
+Date: 10/18/2026
+Description: In-memory directory of the workspace's Slack users, kept in step
+    with the `users` table. A full sync pages through users.list (cursor
+    pagination) at startup and every USER_SYNC_INTERVAL seconds; in between,
+    team_join / user_change events update single users, so a new member no
+    longer triggers a full users.list + re-insert of everyone.
+"""
+import os
+import threading
+import time
+from pathlib import Path
+from dotenv import load_dotenv
+env_path = Path(__file__).parent.parent / '.env'
+load_dotenv(env_path)
+
+import messenger
+
+### ### SETTINGS ### ###
+USER_SYNC_INTERVAL = float(os.environ.get('USER_SYNC_INTERVAL', 6 * 3600))  # seconds between full syncs
+USERS_PAGE_SIZE = 200                                                      # Slack recommends <= 200 per page
+
+
+class UserDirectory:
+    """
+    user id -> Slack user object for every non-deleted member. users()
+    serves the cached copy (running a full sync the first time); changes
+    are upserted into the users table through messenger.add_users().
+    """
+    def __init__(self, client, sync_interval=USER_SYNC_INTERVAL):
+        self.client = client
+        self.sync_interval = sync_interval
+        self._users = None
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stats = {'full_syncs': 0, 'pages': 0, 'events': 0, 'last_sync': None, 'last_sync_seconds': 0.0}
+
+    def fetch_all(self):
+        """Pages through users.list. Returns {user_id: user} for non-deleted users."""
+        users = {}
+        cursor = None
+        while True:
+            response = self.client.users_list(limit=USERS_PAGE_SIZE, cursor=cursor)
+            with self._lock:
+                self._stats['pages'] += 1
+            for user in response["members"]:
+                if not user.get('deleted'):
+                    users[user["id"]] = user
+            cursor = (response.get("response_metadata") or {}).get("next_cursor")
+            if not cursor:
+                return users
+
+    def full_sync(self):
+        """Reloads every user from Slack, upserts them into the users table. Returns the new {user_id: user}."""
+        start = time.perf_counter()
+        users = self.fetch_all()
+        result = messenger.add_users(users)
+        with self._lock:
+            self._users = users
+            self._stats['full_syncs'] += 1
+            self._stats['last_sync'] = time.time()
+            self._stats['last_sync_seconds'] = time.perf_counter() - start
+        print(f"[USER DIRECTORY] Synced {len(users)} users in {time.perf_counter() - start:.1f}s: {result}")
+        return dict(users)
+
+    def users(self):
+        """Returns {user_id: user} from memory (full sync on first use)."""
+        with self._lock:
+            users = self._users
+        if users is None:
+            return self.full_sync()
+        return dict(users)
+
+    def apply_user(self, user):
+        """
+        Takes the user object from a team_join / user_change event.
+        Updates that one user in memory and in the users table.
+        """
+        with self._lock:
+            self._stats['events'] += 1
+            if self._users is not None:
+                if user.get('deleted'):
+                    self._users.pop(user["id"], None)
+                else:
+                    self._users[user["id"]] = user
+        return messenger.add_users({user["id"]: user})
+
+    def start(self):
+        """Starts the periodic full sync thread (only once)."""
+        with self._lock:
+            if self._thread:
+                return
+            self._thread = threading.Thread(target=self._sync_loop, name="user-directory-sync", daemon=True)
+        self._thread.start()
+
+    def _sync_loop(self):
+        while True:
+            time.sleep(self.sync_interval)
+            try:
+                self.full_sync()
+            except Exception as e:
+                print(f"[USER DIRECTORY] Full sync failed: {e}")
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['users'] = len(self._users) if self._users is not None else 0
+        return stats
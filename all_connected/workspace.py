@@ -9,8 +9,8 @@ from dotenv import load_dotenv
 env_path = Path(__file__).parent.parent / '.env'
 load_dotenv(env_path)
 
-from messenger import update_tasks_expired, get_task_list
-from helper_functions import connectDB
+from messenger import get_report_tasks, get_report_tasks_batch
+from report_cache import reports
 
 DB_NAME = os.environ['DB_NAME']
 
@@ -22,47 +22,6 @@ with open('block_messages/headers.json', 'r') as infile:
     block_headers = json.load(infile)
 
 
-def get_accepted_tasks(user_id) -> list:
-    """
-    Takes a user id (int)
-    Finds that user's assignment data.
-    
-    """
-    update_tasks_expired()
-    conn = connectDB(DB_NAME)
-    cur = conn.cursor()
-    query = f'''SELECT DISTINCT assignments.task_id
-                FROM assignments INNER JOIN tasks
-                WHERE assignments.user_id = '{user_id}' AND assignments.`status` = 'accepted' AND tasks.expired = 0 AND img IS NULL'''
-    cur.execute(query)
-
-    task_list = [int(task_id[0]) for task_id in cur.fetchall()]
-    
-    conn.close()
-    return task_list
-
-
-def get_pending_tasks(user_id) -> list:
-    """
-    Takes a user id (int)
-    Finds that user's assignment data.
-    
-    """
-    conn = connectDB(DB_NAME)
-    cur = conn.cursor()
-    # query = f'''SELECT task_id FROM assignments 
-    #             WHERE user_id = '{user_id}' AND `status` = 'pending'
-    #         '''
-    query = f'''SELECT DISTINCT assignments.task_id 
-                FROM assignments INNER JOIN tasks
-                WHERE assignments.user_id = '{user_id}' AND assignments.`status` = 'pending' AND tasks.expired = 0
-            '''
-    cur.execute(query)
-    task_list = [item[0] for item in cur.fetchall()]
-    conn.close()
-    return task_list
-
-
 def compact_task(task_info) -> dict:
     """
     Takes a task_info list.
@@ -86,22 +45,49 @@ def compact_task(task_info) -> dict:
 			}
 		}
     
-def make_report_block(user_id) -> list:
+def make_report_block(user_id, report_tasks=None) -> list:
     """
-    Takes a user id (int? str?)
-    Formats a report block for the given user using their 
+    Takes a user id (str) and optionally that user's rows from
+        messenger.get_report_tasks().
+    Without rows, serves the user's report from report_cache (one version
+        lookup), building (one query) & caching it on a miss.
+    Returns a full formatted Slack block message (dict).
+    """
+    if report_tasks is not None:
+        return format_report_block(report_tasks)
+    version = reports.version(user_id)
+    blocks = reports.peek(user_id, version)
+    if blocks is None:
+        report_tasks = get_report_tasks(user_id)
+        blocks = format_report_block(report_tasks)
+        reports.store(user_id, blocks, version, report_expires_in(report_tasks))
+    return blocks
+
+def report_expires_in(report_tasks):
+    """
+    Takes report rows (messenger.get_report_tasks() format).
+    Returns the seconds until the first of those tasks expires (and drops out
+        of the report), or None if there are none.
+    """
+    if not report_tasks:
+        return None
+    first_expiry = min(task_list[4] + timedelta(minutes=task_list[5]) for task_list in report_tasks)
+    return (first_expiry - datetime.now()).total_seconds()
+
+def format_report_block(report_tasks) -> list:
+    """
+    Takes a user's report rows (messenger.get_report_tasks() format).
+    Formats a report block using their 
         active (accepted, unexpired, uncompleted) & 
         pending (pending, unexpired) tasks.
     Returns a full formatted Slack block message (dict).
     
     """
-    # A list of task_list lists for all accepted, unexpired, uncompleted tasks
-    active_ids = get_accepted_tasks(user_id)
-    all_active = [get_task_list(user_id, task_id) for task_id in active_ids]
+    # task_list rows (already sorted by start time) for all accepted, unexpired, uncompleted tasks
+    all_active = [task_list for task_list in report_tasks if task_list[7] == 'accepted']
   
-    # A list of task_list lists for all pending & unexpired tasks
-    pending_ids = get_pending_tasks(user_id)
-    all_pending = [get_task_list(user_id, task_id) for task_id in pending_ids]
+    # task_list rows for all pending & unexpired tasks
+    all_pending = [task_list for task_list in report_tasks if task_list[7] == 'pending']
 
     # Add appropriate active task information
     blocks = []
@@ -111,9 +97,7 @@ def make_report_block(user_id) -> list:
         blocks.append(block_headers['active_header'])
         blocks.append(block_headers['divider'])
         
-        # Sort active tasks by start time
-        sorted_active = sorted(all_active, key=lambda task_list: task_list[4]) 
-        for task_list in sorted_active:
+        for task_list in all_active:
             active_task = compact_task(task_list)
             blocks.append(active_task)
     else:
@@ -125,9 +109,7 @@ def make_report_block(user_id) -> list:
     if all_pending:
         blocks.append(block_headers['pending_header'])
         
-        # Sort pending tasks by start time
-        sorted_pending = sorted(all_pending, key=lambda task_list: task_list[4])
-        for task_list in sorted_pending:
+        for task_list in all_pending:
             if len(blocks) >= 47:
                 blocks.append(block_headers['too_many_pending_header'])
                 break
@@ -146,6 +128,24 @@ def make_report_block(user_id) -> list:
 
     return blocks
 
+def make_report_blocks(user_ids) -> dict:
+    """
+    Takes a list of user ids.
+    Serves cached reports (one version lookup) and builds all the missing ones
+        from a single query.
+    Returns {user id: report block (list)}.
+    """
+    versions = reports.versions(user_ids)
+    blocks = {user_id: reports.peek(user_id, versions[user_id]) for user_id in user_ids}
+    missing = [user_id for user_id, report in blocks.items() if report is None]
+    if missing:
+        report_tasks = get_report_tasks_batch(missing)
+        for user_id in missing:
+            user_tasks = report_tasks.get(user_id, [])
+            blocks[user_id] = format_report_block(user_tasks)
+            reports.store(user_id, blocks[user_id], versions[user_id], report_expires_in(user_tasks))
+    return blocks
+
     
 
 def generate_message(task_info, user_id):